@@ -1,6 +1,12 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from rest_framework import mixins
 
 from api.shared.compare.mixins import CompareViewSetMixin
+from api.shared.compare.streaming import astream, stream_comparison
+from services.comparison import Comparison
 
 from .serializers import ComparisonSerializer
 
@@ -10,3 +16,15 @@ class CompareViewSet(
     mixins.RetrieveModelMixin,
 ):
     serializer_class = ComparisonSerializer
+
+    def render_comparison(self, comparison: Comparison) -> HttpResponseBase:
+        if not settings.COMPARISON_STREAMING_ENABLED:
+            return super().render_comparison(comparison)
+
+        # comparisons of large pull requests are too big to build in memory
+        serializer = self.get_serializer(comparison)
+        content = stream_comparison(serializer)
+        if isinstance(self.request._request, ASGIRequest):
+            # see `astream`
+            content = astream(content)
+        return StreamingHttpResponse(content, content_type="application/json")
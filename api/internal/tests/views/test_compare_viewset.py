@@ -1,14 +1,19 @@
+import json
 from unittest.mock import PropertyMock, patch
 
+from asgiref.sync import async_to_sync
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 from shared.reports.resources import ReportFile
 from shared.reports.types import ReportTotals
+from shared.torngit.exceptions import TorngitClientGeneralError
 from shared.utils.merge import LineType
 
 import services.comparison as comparison
 from api.shared.commit.serializers import ReportTotalsSerializer
+from api.shared.compare.streaming import astream
 from codecov_auth.tests.factories import OwnerFactory
 from core.tests.factories import CommitFactory, PullFactory, RepositoryFactory
 from services.report import SerializableReport
@@ -225,6 +230,100 @@ class TestCompareViewSetRetrieve(APITestCase):
         assert response.data["files"] == self.expected_files
         assert response.data["has_unmerged_base_commits"] is True
 
+    @override_settings(COMPARISON_STREAMING_ENABLED=True)
+    def test_streams_the_same_comparison(
+        self, adapter_mock, base_report_mock, head_report_mock
+    ):
+        adapter_mock.return_value = self.mocked_compare_adapter
+        base_report_mock.return_value = self.base_report
+        head_report_mock.return_value = self.head_report
+
+        response = self._get_comparison()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/json"
+        streamed = json.loads(b"".join(response.streaming_content))
+
+        with override_settings(COMPARISON_STREAMING_ENABLED=False):
+            response = self._get_comparison()
+        assert not response.streaming
+        assert streamed == json.loads(response.content)
+        assert len(streamed["files"]) == 1
+
+    @override_settings(COMPARISON_STREAMING_ENABLED=True)
+    def test_streaming_returns_404_if_no_raw_reports(
+        self, adapter_mock, base_report_mock, head_report_mock
+    ):
+        base_report_mock.return_value = None
+        head_report_mock.side_effect = comparison.MissingComparisonReport(
+            "Missing head report"
+        )
+        adapter_mock.return_value = self.mocked_compare_adapter
+
+        response = self._get_comparison()
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @override_settings(COMPARISON_STREAMING_ENABLED=True)
+    @patch("api.shared.compare.serializers.ComparisonSerializer.iter_files")
+    def test_streaming_raises_errors_before_the_response_starts(
+        self, iter_files_mock, adapter_mock, base_report_mock, head_report_mock
+    ):
+        adapter_mock.return_value = self.mocked_compare_adapter
+        base_report_mock.return_value = self.base_report
+        head_report_mock.return_value = self.head_report
+
+        def files():
+            raise TorngitClientGeneralError(403, "response", "message")
+            yield
+
+        iter_files_mock.return_value = files()
+        response = self._get_comparison()
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not response.streaming
+
+    @override_settings(COMPARISON_STREAMING_ENABLED=True)
+    @patch("api.shared.compare.serializers.ComparisonSerializer.iter_files")
+    def test_streaming_reports_errors_in_the_response(
+        self, iter_files_mock, adapter_mock, base_report_mock, head_report_mock
+    ):
+        adapter_mock.return_value = self.mocked_compare_adapter
+        base_report_mock.return_value = self.base_report
+        head_report_mock.return_value = self.head_report
+
+        def files():
+            yield {"name": "first"}
+            raise ValueError("second")
+
+        iter_files_mock.return_value = files()
+        response = self._get_comparison()
+
+        assert response.status_code == status.HTTP_200_OK
+        with self.assertLogs("api.shared.compare.streaming", level="ERROR"):
+            streamed = json.loads(b"".join(response.streaming_content))
+        assert streamed["files"] == [{"name": "first"}]
+        assert streamed["error"] == {
+            "detail": "Failed to render all the files of the comparison."
+        }
+
+    @override_settings(COMPARISON_STREAMING_ENABLED=True)
+    def test_streaming_async(self, adapter_mock, base_report_mock, head_report_mock):
+        adapter_mock.return_value = self.mocked_compare_adapter
+        base_report_mock.return_value = self.base_report
+        head_report_mock.return_value = self.head_report
+
+        response = self._get_comparison()
+        parts = list(response.streaming_content)
+        assert len(parts) > 1
+
+        async def consume():
+            return [part async for part in astream(iter(parts))]
+
+        # small parts are sent together
+        assert async_to_sync(consume)() == [b"".join(parts)]
+
     def test_returns_404_if_base_or_head_references_not_found(
         self, adapter_mock, base_report_mock, head_report_mock
     ):
@@ -10,6 +10,7 @@ from rest_framework.response import Response
 from shared.reports.resources import Report
 from shared.utils.match import match
 
+import services.report as report_service
 from api.public.v2.report.serializers import (
     CoverageReportSerializer,
     FileReportSerializer,
@@ -310,7 +311,7 @@ class FileReportViewSet(
             raise ValidationError("walk_back must be <= 20")
 
         self.commit = self.get_commit()
-        report = self.commit.full_report
+        report = report_service.build_report_from_commit(self.commit, paths=[self.path])
 
         oldest_sha = self.request.query_params.get("oldest_sha")
 
@@ -330,7 +331,9 @@ class FileReportViewSet(
                 if not self.commit:
                     report = None
                     break
-                report = self.commit.full_report
+                report = report_service.build_report_from_commit(
+                    self.commit, paths=[self.path]
+                )
 
                 if oldest_sha and oldest_sha == self.commit.commitid:
                     break
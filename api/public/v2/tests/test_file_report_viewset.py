@@ -129,7 +129,9 @@ class FileReportViewSetTestCase(TestCase):
             "commit_file_url": f"{settings.CODECOV_DASHBOARD_URL}/{self.service}/{self.username}/{self.repo_name}/commit/{self.commit3.commitid}/blob/foo/file1.py",
         }
 
-        build_report_from_commit.assert_called_once_with(self.commit3)
+        build_report_from_commit.assert_called_once_with(
+            self.commit3, paths=["foo/file1.py"]
+        )
 
     @patch("services.report.build_report_from_commit")
     def test_file_report_no_walk_back(
@@ -141,7 +143,9 @@ class FileReportViewSetTestCase(TestCase):
         res = self._request_file_report(path="foo/file1.py")
         assert res.status_code == 404
 
-        build_report_from_commit.assert_called_once_with(self.commit3)
+        build_report_from_commit.assert_called_once_with(
+            self.commit3, paths=["foo/file1.py"]
+        )
 
     @patch("services.report.build_report_from_commit")
     def test_file_report_not_enough_walk_back(
@@ -154,7 +158,10 @@ class FileReportViewSetTestCase(TestCase):
         assert res.status_code == 404
 
         build_report_from_commit.assert_has_calls(
-            [call(self.commit3), call(self.commit2)]
+            [
+                call(self.commit3, paths=["foo/file1.py"]),
+                call(self.commit2, paths=["foo/file1.py"]),
+            ]
         )
 
     @patch("services.report.build_report_from_commit")
@@ -199,7 +206,11 @@ class FileReportViewSetTestCase(TestCase):
         }
 
         build_report_from_commit.assert_has_calls(
-            [call(self.commit3), call(self.commit2), call(self.commit1)]
+            [
+                call(self.commit3, paths=["foo/file1.py"]),
+                call(self.commit2, paths=["foo/file1.py"]),
+                call(self.commit1, paths=["foo/file1.py"]),
+            ]
         )
 
     @patch("services.report.build_report_from_commit")
@@ -216,7 +227,10 @@ class FileReportViewSetTestCase(TestCase):
 
         # does not walk back to commit1
         build_report_from_commit.assert_has_calls(
-            [call(self.commit3), call(self.commit2)]
+            [
+                call(self.commit3, paths=["foo/file1.py"]),
+                call(self.commit2, paths=["foo/file1.py"]),
+            ]
         )
 
     @patch("services.report.build_report_from_commit")
@@ -240,7 +254,11 @@ class FileReportViewSetTestCase(TestCase):
         assert res.status_code == 404
 
         build_report_from_commit.assert_has_calls(
-            [call(self.commit3), call(self.commit2), call(self.commit1)]
+            [
+                call(self.commit3, paths=["foo/file1.py"]),
+                call(self.commit2, paths=["foo/file1.py"]),
+                call(self.commit1, paths=["foo/file1.py"]),
+            ]
         )
 
     @patch("services.report.build_report_from_commit")
@@ -256,7 +274,9 @@ class FileReportViewSetTestCase(TestCase):
         res = self._request_file_report(path="foo/file1.py", walk_back=20)
         assert res.status_code == 404
 
-        build_report_from_commit.assert_has_calls([call(self.commit3)])
+        build_report_from_commit.assert_has_calls(
+            [call(self.commit3, paths=["foo/file1.py"])]
+        )
 
     @patch("services.report.build_report_from_commit")
     def test_file_report_walk_back_commit_not_complete(
@@ -307,7 +327,9 @@ class FileReportViewSetTestCase(TestCase):
             "commit_file_url": f"{settings.CODECOV_DASHBOARD_URL}/{self.service}/{self.username}/{self.repo_name}/commit/{self.commit3.commitid}/blob/foo/file1.py",
         }
 
-        build_report_from_commit.assert_has_calls([call(self.commit3)])
+        build_report_from_commit.assert_has_calls(
+            [call(self.commit3, paths=["foo/file1.py"])]
+        )
 
     @patch("services.report.build_report_from_commit")
     def test_file_report_walk_back_found(
@@ -320,7 +342,10 @@ class FileReportViewSetTestCase(TestCase):
         assert res.status_code == 200
 
         build_report_from_commit.assert_has_calls(
-            [call(self.commit3), call(self.commit2)]
+            [
+                call(self.commit3, paths=["foo/file1.py"]),
+                call(self.commit2, paths=["foo/file1.py"]),
+            ]
         )
 
     @patch("services.report.build_report_from_commit")
@@ -338,7 +363,11 @@ class FileReportViewSetTestCase(TestCase):
         assert res.status_code == 404
 
         build_report_from_commit.assert_has_calls(
-            [call(self.commit3), call(self.commit2), call(self.commit1)]
+            [
+                call(self.commit3, paths=["bar/file1.py"]),
+                call(self.commit2, paths=["bar/file1.py"]),
+                call(self.commit1, paths=["bar/file1.py"]),
+            ]
         )
 
     @patch("services.report.build_report_from_commit")
@@ -358,4 +387,6 @@ class FileReportViewSetTestCase(TestCase):
         res = self._request_file_report(path="bar/file1.py", walk_back=20)
         assert res.status_code == 404
 
-        build_report_from_commit.assert_has_calls([call(self.commit3)])
+        build_report_from_commit.assert_has_calls(
+            [call(self.commit3, paths=["bar/file1.py"])]
+        )
@@ -1,3 +1,4 @@
+from django.http.response import HttpResponseBase
 from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound, PermissionDenied
@@ -40,6 +41,8 @@ class CompareViewSetMixin(CompareSlugMixin, viewsets.GenericViewSet):
                 head_commit=compare_data["head"],
             )
 
+        # every action needs the reports and the git comparison
+        comparison.load()
         return comparison
 
     @torngit_safe
@@ -64,13 +67,15 @@ class CompareViewSetMixin(CompareSlugMixin, viewsets.GenericViewSet):
                     },
                     status=400,
                 )
-        serializer = self.get_serializer(comparison)
-
         try:
-            return Response(serializer.data)
+            return self.render_comparison(comparison)
         except MissingComparisonReport:
             raise NotFound("Raw report not found for base or head reference.")
 
+    def render_comparison(self, comparison: Comparison) -> HttpResponseBase:
+        serializer = self.get_serializer(comparison)
+        return Response(serializer.data)
+
     @action(
         detail=False,
         methods=["get"],
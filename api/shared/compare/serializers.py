@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterator, List
 
 from rest_framework import serializers
 
@@ -54,11 +54,16 @@ class ComparisonSerializer(serializers.Serializer):
         return {"git_commits": comparison.git_commits}
 
     def get_files(self, comparison: Comparison) -> List[dict]:
-        return [
-            FileComparisonSerializer(file).data
-            for file in comparison.files
-            if self._should_include_file(file)
-        ]
+        return list(self.iter_files(comparison))
+
+    def iter_files(self, comparison: Comparison) -> Iterator[dict]:
+        """
+        Serialized files of the comparison, one at a time (see
+        `api.shared.compare.streaming`).
+        """
+        for file in comparison.files:
+            if self._should_include_file(file):
+                yield FileComparisonSerializer(file).data
 
     def _should_include_file(self, file: FileComparison):
         if "has_diff" in self.context:
@@ -0,0 +1,93 @@
+import itertools
+import logging
+from typing import AsyncIterator, Iterator, List
+
+from rest_framework.renderers import JSONRenderer
+
+from codecov.db import sync_to_async
+
+from .serializers import ComparisonSerializer
+
+log = logging.getLogger(__name__)
+
+# the streamed comparison is sent in parts of at least this many bytes when served
+# asynchronously (see `astream`)
+ASYNC_PART_SIZE = 64 * 1024
+
+
+def stream_comparison(serializer: ComparisonSerializer) -> Iterator[bytes]:
+    """
+    Renders the comparison of `serializer` as JSON, the way `JSONRenderer` would
+    render `serializer.data`, but incrementally: the rest of the comparison is
+    rendered right away and its files one at a time as the returned iterator is
+    consumed, so only one `FileComparison` is held in memory at once.
+
+    Everything but the files, as well as the first file, is serialized before
+    returning, so errors there (e.g. `MissingComparisonReport` or errors from the
+    git provider) are raised to the caller rather than in the middle of the
+    response.  Once the response has started its status can't change anymore, so
+    later errors end the files early and add an `error` to the JSON instead.
+    """
+    comparison = serializer.instance
+    renderer = JSONRenderer()
+
+    envelope_serializer = serializer.__class__(comparison, context=serializer.context)
+    del envelope_serializer.fields["files"]
+    envelope = renderer.render(envelope_serializer.data)
+
+    files = serializer.iter_files(comparison)
+    first_file = next(files, None)
+    if first_file is not None:
+        files = itertools.chain([first_file], files)
+
+    def render() -> Iterator[bytes]:
+        # `envelope` is a non-empty JSON object: add the files before its `}`
+        yield envelope[:-1] + b',"files":['
+        try:
+            for index, file in enumerate(files):
+                if index > 0:
+                    yield b","
+                yield renderer.render(file)
+        except Exception:
+            log.error(
+                "Failed to stream the files of a comparison",
+                extra=dict(
+                    base_commit=comparison.base_commit.commitid,
+                    head_commit=comparison.head_commit.commitid,
+                ),
+                exc_info=True,
+            )
+            error = {"detail": "Failed to render all the files of the comparison."}
+            yield b'],"error":' + renderer.render(error) + b"}"
+            return
+        yield b"]}"
+
+    return render()
+
+
+def _next_part(parts: Iterator[bytes]) -> bytes:
+    chunks: List[bytes] = []
+    size = 0
+    for chunk in parts:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= ASYNC_PART_SIZE:
+            break
+    return b"".join(chunks)
+
+
+async def astream(parts: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Consumes `parts` (e.g. from `stream_comparison`) in a thread, one batch at a
+    time, for responses served under ASGI.
+
+    Django consumes the sync iterators of `StreamingHttpResponse`s served under
+    ASGI all at once (with `sync_to_async(list)`), which would hold the whole
+    comparison in memory before sending any of it.
+    """
+    next_part = sync_to_async(_next_part)
+    while True:
+        part = await next_part(parts)
+        if not part:
+            return
+        yield part
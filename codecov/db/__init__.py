@@ -1,37 +1,164 @@
+import functools
 import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Optional
 
 from asgiref.sync import SyncToAsync
 from django.conf import settings
-from django.db import close_old_connections
+from django.db import DatabaseError, close_old_connections, connections
 from django.db.models import Field, Lookup
+from shared.metrics import metrics
 
 log = logging.getLogger(__name__)
 
 
+class ReadYourWrites:
+    """
+    Whether reads should go to the primary databases because the current client
+    just wrote to them - see `DatabaseRouter` and `ReadYourWritesMiddleware`.
+    """
+
+    def __init__(self, pinned_until: float = 0.0):
+        # reads go to the primaries until then (a `time.time()`)
+        self.pinned_until = pinned_until
+        self.written = False
+
+    def record_write(self):
+        self.written = True
+        self.pinned_until = max(
+            self.pinned_until, time.time() + settings.DATABASE_READ_YOUR_WRITES_WINDOW
+        )
+
+    def is_pinned(self) -> bool:
+        return time.time() < self.pinned_until
+
+
+# set for each request by `codecov.middleware.ReadYourWritesMiddleware`
+read_your_writes: ContextVar[Optional[ReadYourWrites]] = ContextVar(
+    "read_your_writes", default=None
+)
+
+# seconds since the last replayed transaction, or 0 when the replica has
+# replayed everything it received
+REPLICATION_LAG_SQL = """
+    select case
+        when pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() then 0
+        else extract(epoch from now() - pg_last_xact_replay_timestamp())
+    end
+"""
+
+
+class ReplicationLagMonitor:
+    """
+    Measures how far behind the primary each read replica is, at most every
+    `DATABASE_REPLICA_LAG_CHECK_INTERVAL` seconds, so that reads can fail over
+    to the primary while a replica lags more than `DATABASE_REPLICA_MAX_LAG`
+    seconds.  Replicas whose lag can't be measured are considered lagging.
+
+    The lag is sent to statsd as `database.<alias>.replication_lag`.
+    """
+
+    def __init__(self):
+        # seconds, by alias
+        self.lag = {}
+        self.checked_at = {}
+        self.lock = threading.Lock()
+
+    def is_lagging(self, alias: str) -> bool:
+        max_lag = settings.DATABASE_REPLICA_MAX_LAG
+        if max_lag is None:
+            return False
+
+        checked_at = self.checked_at.get(alias)
+        now = time.monotonic()
+        due = (
+            checked_at is None
+            or now - checked_at >= settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL
+        )
+        # other threads keep using the last measurement in the meantime
+        if due and self.lock.acquire(blocking=False):
+            try:
+                self.checked_at[alias] = now
+                self.lag[alias] = self.measure(alias)
+                if self.lag[alias] > max_lag:
+                    log.warning(
+                        "Read replica is lagging, reading from the primary",
+                        extra=dict(alias=alias, lag=self.lag[alias]),
+                    )
+            finally:
+                self.lock.release()
+
+        lagging = self.lag.get(alias, 0) > max_lag
+        if lagging:
+            metrics.incr(f"database.{alias}.replication_lag.failover")
+        return lagging
+
+    def measure(self, alias: str) -> float:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(REPLICATION_LAG_SQL)
+                (lag,) = cursor.fetchone()
+        except DatabaseError:
+            log.warning(
+                "Failed to measure replication lag",
+                extra=dict(alias=alias),
+                exc_info=True,
+            )
+            return math.inf
+
+        lag = float(lag or 0)
+        metrics.gauge(f"database.{alias}.replication_lag", lag)
+        return lag
+
+
+replication_lag = ReplicationLagMonitor()
+
+
 class DatabaseRouter:
     """
     A router to control all database operations on models across multiple databases.
     https://docs.djangoproject.com/en/4.0/topics/db/multi-db/#automatic-database-routing
+
+    When read replicas are enabled, reads still go to the primary for
+    `DATABASE_READ_YOUR_WRITES_WINDOW` seconds after the current client writes
+    anything (see `ReadYourWrites`) and while the replica lags too much (see
+    `ReplicationLagMonitor`).
     """
 
     def db_for_read(self, model, **hints):
         if model._meta.app_label == "timeseries":
             if settings.TIMESERIES_DATABASE_READ_REPLICA_ENABLED:
-                return "timeseries_read"
+                return self._db_for_read("timeseries", "timeseries_read")
             else:
                 return "timeseries"
         else:
             if settings.DATABASE_READ_REPLICA_ENABLED:
-                return "default_read"
+                return self._db_for_read("default", "default_read")
             else:
                 return "default"
 
     def db_for_write(self, model, **hints):
+        writes = read_your_writes.get()
+        if writes is not None:
+            writes.record_write()
+
         if model._meta.app_label == "timeseries":
             return "timeseries"
         else:
             return "default"
 
+    def _db_for_read(self, primary: str, replica: str) -> str:
+        writes = read_your_writes.get()
+        if writes is not None and writes.is_pinned():
+            return primary
+        if replication_lag.is_lagging(replica):
+            return primary
+        return replica
+
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         if (
             db == "timeseries" or db == "timeseries_read"
@@ -71,12 +198,187 @@ class IsNot(Lookup):
         return "%s is not %s" % (lhs, rhs), params
 
 
+class ThreadHops:
+    """
+    Time spent by `sync_to_async` calls waiting for a thread to run in and for
+    the event loop to pick their result back up - see `thread_hops`.
+    """
+
+    def __init__(self, parent: Optional["ThreadHops"] = None):
+        self.count = 0
+        self.seconds = 0.0
+        # hops are also added to the parent (e.g. the hops of a whole request)
+        self.parent = parent
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        if self.parent is not None:
+            self.parent.add(seconds)
+
+
+# when set, the thread hops of the `sync_to_async` calls made in the current
+# context are added to it
+thread_hops: ContextVar[Optional[ThreadHops]] = ContextVar("thread_hops", default=None)
+
+# timestamps of the `sync_to_async` call being made (see `DatabaseSyncToAsync`)
+_call_timestamps: ContextVar[Optional[list]] = ContextVar(
+    "call_timestamps", default=None
+)
+
+
+class DatabaseExecutor(ThreadPoolExecutor):
+    """
+    Thread pool for database work whose threads keep their connections open
+    between calls instead of going through `close_old_connections` (which, with
+    the default `CONN_MAX_AGE` of 0, reconnects for every call).
+
+    Connections are only closed after a call that errored (or left a transaction
+    open) and before a call when they have been idle for `idle_timeout` seconds.
+    Connections idle for `health_check_interval` seconds are checked with
+    `is_usable()` before being reused.  Each thread holds one connection per
+    database it uses, so the pool size bounds the connections of the process.
+
+    The time spent connecting is sent to statsd as `database.<alias>.connect`.
+    """
+
+    def __init__(
+        self, max_workers: int, idle_timeout: float, health_check_interval: float
+    ):
+        super().__init__(
+            max_workers=max_workers,
+            thread_name_prefix="database",
+            initializer=self._initialize_thread,
+        )
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.local = threading.local()
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(self._run, fn, *args, **kwargs)
+
+    def _initialize_thread(self):
+        # when each connection of this thread was last used, by alias
+        self.local.last_used = {}
+        for alias in connections:
+            connection = connections[alias]
+            connection.connect = functools.partial(
+                self._timed_connect, connection.connect, alias
+            )
+
+    def _timed_connect(self, connect, alias):
+        start = time.perf_counter()
+        connect()
+        metrics.timing(
+            f"database.{alias}.connect", (time.perf_counter() - start) * 1000
+        )
+
+    def _run(self, fn, *args, **kwargs):
+        self._prepare_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._release_connections()
+
+    def _prepare_connections(self):
+        now = time.monotonic()
+        for connection in connections.all(initialized_only=True):
+            if connection.connection is None:
+                continue
+            idle = now - self.local.last_used.get(connection.alias, now)
+            if idle >= self.idle_timeout:
+                self._close(connection, "idle")
+            elif idle >= self.health_check_interval and not connection.is_usable():
+                self._close(connection, "unusable")
+
+    def _release_connections(self):
+        now = time.monotonic()
+        for connection in connections.all(initialized_only=True):
+            if connection.connection is None:
+                continue
+            if (
+                connection.errors_occurred
+                or connection.get_autocommit() != connection.settings_dict["AUTOCOMMIT"]
+            ):
+                self._close(connection, "error")
+            else:
+                self.local.last_used[connection.alias] = now
+
+    def _close(self, connection, reason: str):
+        metrics.incr(f"database.{connection.alias}.close.{reason}")
+        self.local.last_used.pop(connection.alias, None)
+        try:
+            connection.close()
+        except DatabaseError:
+            log.warning("Failed to close database connection", exc_info=True)
+
+
+_database_executor: Optional[DatabaseExecutor] = None
+_database_executor_lock = threading.Lock()
+
+
+def get_database_executor() -> DatabaseExecutor:
+    global _database_executor
+    with _database_executor_lock:
+        if _database_executor is None:
+            _database_executor = DatabaseExecutor(
+                max_workers=settings.DATABASE_EXECUTOR_MAX_WORKERS,
+                idle_timeout=settings.DATABASE_EXECUTOR_IDLE_TIMEOUT,
+                health_check_interval=settings.DATABASE_EXECUTOR_HEALTH_CHECK_INTERVAL,
+            )
+        return _database_executor
+
+
 class DatabaseSyncToAsync(SyncToAsync):
     """
     SyncToAsync version that cleans up old database connections.
+
+    With `DATABASE_EXECUTOR_ENABLED`, functions run in the `DatabaseExecutor`
+    instead, which keeps its connections open (see `get_database_executor`).
+    Since they no longer run in the thread of the caller, they don't see the
+    transactions it has open.
     """
 
+    def __init__(self, func, thread_sensitive=True, executor=None):
+        if thread_sensitive and executor is None and settings.DATABASE_EXECUTOR_ENABLED:
+            thread_sensitive, executor = False, get_database_executor()
+        super().__init__(func, thread_sensitive=thread_sensitive, executor=executor)
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            # runs in the thread, with a copy of the context of the caller
+            timestamps = _call_timestamps.get()
+            if timestamps is not None:
+                timestamps.append(time.perf_counter())
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if timestamps is not None:
+                    timestamps.append(time.perf_counter())
+
+        self.func = timed
+
+    async def __call__(self, *args, **kwargs):
+        hops = thread_hops.get()
+        if hops is None:
+            return await super().__call__(*args, **kwargs)
+
+        timestamps = [time.perf_counter()]
+        token = _call_timestamps.set(timestamps)
+        try:
+            return await super().__call__(*args, **kwargs)
+        finally:
+            _call_timestamps.reset(token)
+            timestamps.append(time.perf_counter())
+            if len(timestamps) == 4:
+                called, started, finished, resumed = timestamps
+                hops.add((started - called) + (resumed - finished))
+
     def thread_handler(self, loop, *args, **kwargs):
+        if isinstance(self._executor, DatabaseExecutor):
+            # the executor manages its own connections
+            return super().thread_handler(loop, *args, **kwargs)
+
         close_old_connections()
         try:
             return super().thread_handler(loop, *args, **kwargs)
@@ -0,0 +1,46 @@
+import functools
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import (
+    DatabaseCreation as PostgresDatabaseCreation,
+)
+
+from codecov.db.pool import ConnectionPool, close_pools, get_pool
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # idle pooled connections would keep the database from being dropped
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that checks connections out of a `ConnectionPool` shared
+    by all the threads of the process instead of opening a new one each time,
+    and returns them to the pool when they are closed - so with a `CONN_MAX_AGE`
+    of 0, the connections closed at the end of each request are reused.  The
+    pool of each database is configured by the `POOL` key of its settings.
+    """
+
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        return self.pool.getconn(
+            functools.partial(super().get_new_connection, conn_params)
+        )
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # the connection stays attached to this wrapper, so it can't be
+            # handed to another thread
+            self.pool.discard(self.connection)
+        else:
+            self.pool.putconn(self.connection)
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from shared.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections to one database (see the
+    `codecov.db.backends.postgresql_pool` backend).
+
+    - at most `max_size` connections are open at once, and checking out a
+      connection waits up to `timeout` seconds for one to be returned
+    - connections are closed once they are `max_lifetime` seconds old, or when
+      they have been idle for `max_idle` seconds as long as `min_size`
+      connections stay open
+    - connections idle for more than `health_check_interval` seconds are
+      checked with a `SELECT 1` before being checked out again
+
+    Checkout wait times, usage and timeouts are sent to statsd under
+    `database.<alias>.pool`.
+    """
+
+    def __init__(
+        self,
+        alias: str,
+        min_size: int = 0,
+        max_size: int = 10,
+        max_lifetime: float = 3600,
+        max_idle: float = 600,
+        health_check_interval: float = 30,
+        timeout: float = 10,
+    ):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        # idle connections and when they were returned, most recent last
+        self._idle = deque()
+        # when each open connection (idle or in use) was opened
+        self._opened_at = {}
+        # open connections plus the ones being opened
+        self.size = 0
+
+    @property
+    def in_use(self) -> int:
+        return self.size - len(self._idle)
+
+    def getconn(self, connect: Callable):
+        """
+        Checks out a connection, opening a new one with `connect` if none is idle
+        and the pool isn't full.
+        """
+        start = time.monotonic()
+        while True:
+            connection, check = self._checkout(start)
+            if connection is None:
+                connection = self._connect(connect)
+                break
+            if not self._is_expired(connection) and (
+                not check or self._is_usable(connection)
+            ):
+                break
+            self.discard(connection)
+
+        metrics.timing(
+            f"database.{self.alias}.pool.wait", (time.monotonic() - start) * 1000
+        )
+        self._send_usage()
+        return connection
+
+    def putconn(self, connection):
+        """
+        Returns a checked out connection to the pool, rolling back whatever
+        transaction it left open.
+        """
+        if connection.closed or self._is_expired(connection):
+            self.discard(connection)
+            return
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                self.discard(connection)
+                return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._close_idle()
+            self._condition.notify()
+        self._send_usage()
+
+    def closeall(self):
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._close(connection)
+
+    def _checkout(self, start: float) -> Tuple[Optional[Any], bool]:
+        # returns an idle connection and whether it should be checked, or no
+        # connection after making room for a new one
+        with self._condition:
+            while not self._idle and self.size >= self.max_size:
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    metrics.incr(f"database.{self.alias}.pool.timeout")
+                    raise PoolTimeout(
+                        f"Timed out waiting for a connection to {self.alias}"
+                    )
+                self._condition.wait(remaining)
+
+            if self._idle:
+                connection, returned_at = self._idle.pop()
+                idle = time.monotonic() - returned_at
+                return connection, idle >= self.health_check_interval
+
+            self.size += 1
+            return None, False
+
+    def _connect(self, connect: Callable):
+        start = time.monotonic()
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opened_at[connection] = time.monotonic()
+        metrics.timing(
+            f"database.{self.alias}.pool.connect", (time.monotonic() - start) * 1000
+        )
+        return connection
+
+    def _is_usable(self, connection) -> bool:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            log.info(
+                "Discarding unusable pooled connection", extra=dict(alias=self.alias)
+            )
+            return False
+
+    def _is_expired(self, connection) -> bool:
+        opened_at = self._opened_at.get(connection, 0)
+        return time.monotonic() - opened_at >= self.max_lifetime
+
+    def _close_idle(self):
+        # the connections idle for the longest are first
+        now = time.monotonic()
+        while (
+            self._idle
+            and self.size > self.min_size
+            and now - self._idle[0][1] >= self.max_idle
+        ):
+            connection, _ = self._idle.popleft()
+            self._close(connection)
+
+    def discard(self, connection):
+        """
+        Closes a checked out connection instead of returning it to the pool.
+        """
+        with self._condition:
+            self._close(connection)
+            self._condition.notify()
+
+    def _close(self, connection):
+        if self._opened_at.pop(connection, None) is not None:
+            self.size -= 1
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _send_usage(self):
+        metrics.gauge(f"database.{self.alias}.pool.in_use", self.in_use)
+        metrics.gauge(f"database.{self.alias}.pool.size", self.size)
+
+
+# pools by alias and database name
+_pools: Dict[Tuple[str, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, settings_dict: dict) -> ConnectionPool:
+    key = (alias, settings_dict["NAME"])
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(alias, **settings_dict.get("POOL", {}))
+        return _pools[key]
+
+
+def close_pools(name: str):
+    """
+    Closes the idle connections of the pools to the database `name`.
+    """
+    with _pools_lock:
+        pools = [pool for (_, pool_name), pool in _pools.items() if pool_name == name]
+    for pool in pools:
+        pool.closeall()
@@ -0,0 +1,87 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from shared.metrics import metrics
+
+from codecov.db import ReadYourWrites, read_your_writes
+from services.archive import start_archive_read_counter
+
+log = logging.getLogger(__name__)
+
+
+class ArchiveReadCountMiddleware(MiddlewareMixin):
+    """
+    Counts how many archive (storage) reads were performed to handle a request.
+    The counts are sent to statsd and logged for requests that did any reads.
+    """
+
+    async def __acall__(self, request):
+        # nothing here blocks, so there's no need to hop to a thread
+        self.process_request(request)
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_request(self, request):
+        request.archive_read_counter = start_archive_read_counter()
+
+    def process_response(self, request, response):
+        counter = getattr(request, "archive_read_counter", None)
+        if counter is not None and counter.reads > 0:
+            metrics.incr("archive.request.reads", counter.reads)
+            metrics.incr("archive.request.bytes", counter.bytes)
+            log.info(
+                "Archive reads performed for request",
+                extra=dict(
+                    path=request.path,
+                    archive_reads=counter.reads,
+                    archive_bytes=counter.bytes,
+                ),
+            )
+        return response
+
+
+class ReadYourWritesMiddleware(MiddlewareMixin):
+    """
+    Tracks the database writes of each request (see `codecov.db.ReadYourWrites`)
+    so that its reads, and the reads of the requests the same client makes for
+    the next `DATABASE_READ_YOUR_WRITES_WINDOW` seconds, go to the primary
+    databases instead of the read replicas.  The latter is remembered with a
+    cookie.
+    """
+
+    cookie_name = "db_primary_until"
+
+    def process_request(self, request):
+        request.read_your_writes = ReadYourWrites(self._pinned_until(request))
+        read_your_writes.set(request.read_your_writes)
+
+    def process_response(self, request, response):
+        writes = getattr(request, "read_your_writes", None)
+        window = settings.DATABASE_READ_YOUR_WRITES_WINDOW
+        if writes is not None and writes.written and window > 0:
+            response.set_cookie(
+                self.cookie_name,
+                str(writes.pinned_until),
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    async def __acall__(self, request):
+        # nothing here blocks, so there's no need to hop to a thread
+        self.process_request(request)
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def _pinned_until(self, request) -> float:
+        try:
+            pinned_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            return 0.0
+        # clients can't pin themselves for longer than a window
+        max_pinned_until = time.time() + settings.DATABASE_READ_YOUR_WRITES_WINDOW
+        return min(pinned_until, max_pinned_until)
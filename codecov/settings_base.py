@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "codecov.middleware.ReadYourWritesMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -59,6 +60,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "codecov_auth.middleware.CurrentOwnerMiddleware",
     "codecov_auth.middleware.ImpersonationMiddleware",
+    "codecov.middleware.ArchiveReadCountMiddleware",
 ]
 
 ROOT_URLCONF = "codecov.urls"
@@ -104,6 +106,18 @@ else:
 DATABASE_READ_REPLICA_ENABLED = get_config(
     "setup", "database", "read_replica_enabled", default=False
 )
+# reads go to the primary for this many seconds after a client writes anything
+# - see `codecov.db.DatabaseRouter`
+DATABASE_READ_YOUR_WRITES_WINDOW = get_config(
+    "setup", "database", "read_your_writes_window", default=0
+)
+# reads go to the primary while the replica lags more than this many seconds
+DATABASE_REPLICA_MAX_LAG = get_config(
+    "setup", "database", "replica_max_lag", default=None
+)
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = get_config(
+    "setup", "database", "replica_lag_check_interval", default=10
+)
 
 db_read_url = get_config("services", "database_read_url")
 if db_read_url:
@@ -192,49 +206,79 @@ else:
 # https://docs.djangoproject.com/en/3.1/ref/settings/#conn-max-age
 CONN_MAX_AGE = int(get_config("services", "database", "conn_max_age", default=0))
 
+# in-process connection pools, configured per database by `services.<database>.pool`
+# - see `codecov.db.pool.ConnectionPool`
+DATABASE_POOL_ENABLED = get_config("setup", "database", "pool_enabled", default=False)
+DATABASE_ENGINE = (
+    "codecov.db.backends.postgresql_pool"
+    if DATABASE_POOL_ENABLED
+    else "django.db.backends.postgresql"
+)
+
+# run `codecov.db.sync_to_async` calls in a pool of threads that keep their
+# database connections open - see `codecov.db.DatabaseExecutor`
+DATABASE_EXECUTOR_ENABLED = get_config(
+    "services", "database", "executor", "enabled", default=False
+)
+DATABASE_EXECUTOR_MAX_WORKERS = get_config(
+    "services", "database", "executor", "max_workers", default=8
+)
+DATABASE_EXECUTOR_IDLE_TIMEOUT = get_config(
+    "services", "database", "executor", "idle_timeout", default=300
+)
+DATABASE_EXECUTOR_HEALTH_CHECK_INTERVAL = get_config(
+    "services", "database", "executor", "health_check_interval", default=30
+)
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": DATABASE_ENGINE,
         "NAME": DATABASE_NAME,
         "USER": DATABASE_USER,
         "PASSWORD": DATABASE_PASSWORD,
         "HOST": DATABASE_HOST,
         "PORT": DATABASE_PORT,
         "CONN_MAX_AGE": CONN_MAX_AGE,
+        "POOL": get_config("services", "database", "pool", default={}),
     }
 }
 
 if DATABASE_READ_REPLICA_ENABLED:
     DATABASES["default_read"] = {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": DATABASE_ENGINE,
         "NAME": DATABASE_READ_NAME,
         "USER": DATABASE_READ_USER,
         "PASSWORD": DATABASE_READ_PASSWORD,
         "HOST": DATABASE_READ_HOST,
         "PORT": DATABASE_READ_PORT,
         "CONN_MAX_AGE": CONN_MAX_AGE,
+        "POOL": get_config("services", "database_read", "pool", default={}),
     }
 
 if TIMESERIES_ENABLED:
     DATABASES["timeseries"] = {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": DATABASE_ENGINE,
         "NAME": TIMESERIES_DATABASE_NAME,
         "USER": TIMESERIES_DATABASE_USER,
         "PASSWORD": TIMESERIES_DATABASE_PASSWORD,
         "HOST": TIMESERIES_DATABASE_HOST,
         "PORT": TIMESERIES_DATABASE_PORT,
         "CONN_MAX_AGE": CONN_MAX_AGE,
+        "POOL": get_config("services", "timeseries_database", "pool", default={}),
     }
 
     if TIMESERIES_DATABASE_READ_REPLICA_ENABLED:
         DATABASES["timeseries_read"] = {
-            "ENGINE": "django.db.backends.postgresql",
+            "ENGINE": DATABASE_ENGINE,
             "NAME": TIMESERIES_DATABASE_READ_NAME,
             "USER": TIMESERIES_DATABASE_READ_USER,
             "PASSWORD": TIMESERIES_DATABASE_READ_PASSWORD,
             "HOST": TIMESERIES_DATABASE_READ_HOST,
             "PORT": TIMESERIES_DATABASE_READ_PORT,
             "CONN_MAX_AGE": CONN_MAX_AGE,
+            "POOL": get_config(
+                "services", "timeseries_database_read", "pool", default={}
+            ),
         }
 
 DATABASE_ROUTERS = ["codecov.db.DatabaseRouter"]
@@ -448,6 +492,69 @@ CORS_ALLOWED_ORIGINS = []
 
 GRAPHQL_PLAYGROUND = False
 
+# parsed and validated GraphQL documents - see `graphql_api.execution.get_document`
+GRAPHQL_DOCUMENT_CACHE_ENABLED = get_config(
+    "setup", "graphql", "document_cache", "enabled", default=False
+)
+# by the length of the queries (their documents take a few times more)
+GRAPHQL_DOCUMENT_CACHE_MAX_BYTES = get_config(
+    "setup", "graphql", "document_cache", "max_bytes", default=4 * 1024 * 1024
+)
+# automatic persisted queries - see `graphql_api.execution.resolve_persisted_query`
+GRAPHQL_PERSISTED_QUERIES_ENABLED = get_config(
+    "setup", "graphql", "persisted_queries", "enabled", default=False
+)
+GRAPHQL_PERSISTED_QUERIES_LOCAL_MAX_BYTES = get_config(
+    "setup", "graphql", "persisted_queries", "local_max_bytes", default=4 * 1024 * 1024
+)
+GRAPHQL_PERSISTED_QUERIES_REDIS_TTL = get_config(
+    "setup", "graphql", "persisted_queries", "redis_ttl", default=30 * 24 * 60 * 60
+)
+GRAPHQL_PERSISTED_QUERIES_REDIS_MAX_BYTES = get_config(
+    "setup", "graphql", "persisted_queries", "redis_max_bytes", default=64 * 1024
+)
+# static cost of GraphQL operations - see `graphql_api.cost.QueryCostCalculator`
+GRAPHQL_QUERY_COST_WEIGHTS = get_config(
+    "setup",
+    "graphql",
+    "query_cost",
+    "weights",
+    default={
+        "pathContents": 100,
+        "coverageFile": 50,
+        "compareWithParent": 50,
+        "segments": 20,
+        "measurements": 20,
+    },
+)
+# operations costing more are rejected (costs are only logged when unset)
+GRAPHQL_QUERY_MAX_COST = get_config(
+    "setup", "graphql", "query_cost", "max_cost", default=None
+)
+# latency of resolvers - see `graphql_api.tracing.ResolverMetricsExtension`
+GRAPHQL_RESOLVER_METRICS_ENABLED = get_config(
+    "setup", "graphql", "resolver_metrics", "enabled", default=False
+)
+GRAPHQL_RESOLVER_METRICS_FLUSH_INTERVAL = get_config(
+    "setup", "graphql", "resolver_metrics", "flush_interval", default=60
+)
+GRAPHQL_RESOLVER_TRACES_SAMPLE_RATE = get_config(
+    "setup", "graphql", "resolver_metrics", "trace_sample_rate", default=0.0
+)
+# `totalCount` of connections - see `graphql_api.helpers.count.count_queryset`
+GRAPHQL_COUNT_ESTIMATE_THRESHOLD = get_config(
+    "setup", "graphql", "count", "estimate_threshold", default=None
+)
+GRAPHQL_COUNT_CACHE_ENABLED = get_config(
+    "setup", "graphql", "count", "cache_enabled", default=False
+)
+GRAPHQL_COUNT_CACHE_TTL = get_config(
+    "setup", "graphql", "count", "cache_ttl", default=60
+)
+GRAPHQL_COUNT_CACHE_LOCAL_MAX_BYTES = get_config(
+    "setup", "graphql", "count", "cache_local_max_bytes", default=1024 * 1024
+)
+
 UPLOAD_THROTTLING_ENABLED = True
 
 CANNY_SSO_PRIVATE_TOKEN = get_config("canny", "sso_private_token", default="")
@@ -469,6 +576,78 @@ SENTRY_OAUTH_CLIENT_SECRET = get_config("sentry", "client_secret") or get_config
 # TODO: we can eventually get rid of this once it's confirmed working well for many repos
 REPORT_BUILDER_REPO_IDS = get_config("setup", "report_builder", "repo_ids", default=[])
 
+# caching of built reports - see `services.report.build_report_from_commit`
+REPORT_CACHE_ENABLED = get_config("setup", "report_cache", "enabled", default=False)
+REPORT_CACHE_LOCAL_MAX_BYTES = get_config(
+    "setup", "report_cache", "local_max_bytes", default=256 * 1024 * 1024
+)
+REPORT_CACHE_REDIS_ENABLED = get_config(
+    "setup", "report_cache", "redis_enabled", default=True
+)
+REPORT_CACHE_REDIS_TTL = get_config(
+    "setup", "report_cache", "redis_ttl", default=6 * 60 * 60
+)
+REPORT_CACHE_REDIS_MAX_BYTES = get_config(
+    "setup", "report_cache", "redis_max_bytes", default=32 * 1024 * 1024
+)
+
+# caching of git provider comparisons - see `services.comparison.fetch_git_comparison`
+GIT_COMPARISON_CACHE_ENABLED = get_config(
+    "setup", "git_comparison_cache", "enabled", default=False
+)
+GIT_COMPARISON_CACHE_LOCAL_MAX_BYTES = get_config(
+    "setup", "git_comparison_cache", "local_max_bytes", default=64 * 1024 * 1024
+)
+GIT_COMPARISON_CACHE_REDIS_TTL = get_config(
+    "setup", "git_comparison_cache", "redis_ttl", default=7 * 24 * 60 * 60
+)
+GIT_COMPARISON_CACHE_REDIS_MAX_BYTES = get_config(
+    "setup", "git_comparison_cache", "redis_max_bytes", default=8 * 1024 * 1024
+)
+# caching of commit comparisons - see `services.comparison.ComparisonReport`
+COMPARISON_REPORT_CACHE_ENABLED = get_config(
+    "setup", "comparison_report_cache", "enabled", default=False
+)
+# by the size of the comparisons' JSON (the parsed ones take a few times more)
+COMPARISON_REPORT_CACHE_LOCAL_MAX_BYTES = get_config(
+    "setup", "comparison_report_cache", "local_max_bytes", default=32 * 1024 * 1024
+)
+COMPARISON_REPORT_CACHE_REDIS_ENABLED = get_config(
+    "setup", "comparison_report_cache", "redis_enabled", default=False
+)
+COMPARISON_REPORT_CACHE_REDIS_TTL = get_config(
+    "setup", "comparison_report_cache", "redis_ttl", default=24 * 60 * 60
+)
+COMPARISON_REPORT_CACHE_REDIS_MAX_BYTES = get_config(
+    "setup", "comparison_report_cache", "redis_max_bytes", default=16 * 1024 * 1024
+)
+
+# threads fetching base/head reports and git comparisons concurrently - see
+# `services.comparison.Comparison.load`
+COMPARISON_EXECUTOR_MAX_WORKERS = get_config(
+    "setup", "comparison_executor", "max_workers", default=16
+)
+
+# streaming of full comparisons - see `api.shared.compare.streaming`
+COMPARISON_STREAMING_ENABLED = get_config(
+    "setup", "comparison_streaming", "enabled", default=False
+)
+
+# caching of file contents from the git provider - see `services.source.fetch_source`
+SOURCE_CACHE_ENABLED = get_config("setup", "source_cache", "enabled", default=False)
+SOURCE_CACHE_LOCAL_MAX_BYTES = get_config(
+    "setup", "source_cache", "local_max_bytes", default=64 * 1024 * 1024
+)
+SOURCE_CACHE_REDIS_ENABLED = get_config(
+    "setup", "source_cache", "redis_enabled", default=True
+)
+SOURCE_CACHE_REDIS_TTL = get_config(
+    "setup", "source_cache", "redis_ttl", default=7 * 24 * 60 * 60
+)
+SOURCE_CACHE_REDIS_MAX_BYTES = get_config(
+    "setup", "source_cache", "redis_max_bytes", default=4 * 1024 * 1024
+)
+
 SENTRY_ENV = os.environ.get("CODECOV_ENV", False)
 SENTRY_DSN = os.environ.get("SERVICES__SENTRY__SERVER_DSN", None)
 if SENTRY_DSN is not None:
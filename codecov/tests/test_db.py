@@ -0,0 +1,162 @@
+import math
+import threading
+import time
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.db import DatabaseError, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from codecov.db import (
+    DatabaseExecutor,
+    DatabaseRouter,
+    DatabaseSyncToAsync,
+    ReadYourWrites,
+    ReplicationLagMonitor,
+    read_your_writes,
+)
+from core.models import Repository
+from timeseries.models import Measurement
+
+
+def connection_id():
+    with connections["default"].cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+def failing_query():
+    with connections["default"].cursor() as cursor:
+        cursor.execute("SELECT * FROM table_that_does_not_exist")
+
+
+class DatabaseExecutorTests(TransactionTestCase):
+    def executor(self, **kwargs):
+        executor = DatabaseExecutor(
+            **{
+                "max_workers": 1,
+                "idle_timeout": 300,
+                "health_check_interval": 30,
+                **kwargs,
+            }
+        )
+        self.addCleanup(executor.shutdown)
+        return executor
+
+    def test_connections_are_reused(self):
+        executor = self.executor()
+        first = executor.submit(connection_id).result()
+        assert executor.submit(connection_id).result() == first
+
+    @patch("codecov.db.metrics")
+    def test_connections_are_closed_after_errors(self, metrics):
+        executor = self.executor()
+        first = executor.submit(connection_id).result()
+        with self.assertRaises(DatabaseError):
+            executor.submit(failing_query).result()
+        assert executor.submit(connection_id).result() != first
+        metrics.incr.assert_called_once_with("database.default.close.error")
+
+    @patch("codecov.db.metrics")
+    def test_idle_connections_are_closed(self, metrics):
+        executor = self.executor(idle_timeout=0)
+        first = executor.submit(connection_id).result()
+        assert executor.submit(connection_id).result() != first
+        metrics.incr.assert_called_once_with("database.default.close.idle")
+
+    @patch("codecov.db.metrics")
+    def test_idle_connections_are_checked(self, metrics):
+        executor = self.executor(health_check_interval=0)
+        first = executor.submit(connection_id).result()
+        with patch.object(
+            connections["default"].__class__, "is_usable", return_value=False
+        ):
+            assert executor.submit(connection_id).result() != first
+        metrics.incr.assert_called_once_with("database.default.close.unusable")
+
+    @patch("codecov.db.metrics")
+    def test_connect_time(self, metrics):
+        executor = self.executor()
+        executor.submit(connection_id).result()
+        executor.submit(connection_id).result()
+        [call] = metrics.timing.mock_calls
+        assert call.args[0] == "database.default.connect"
+        assert call.args[1] > 0
+
+    @override_settings(DATABASE_EXECUTOR_ENABLED=True)
+    def test_sync_to_async(self):
+        executor = self.executor()
+        with patch("codecov.db.get_database_executor", return_value=executor):
+            thread_name = DatabaseSyncToAsync(lambda: threading.current_thread().name)
+            query = DatabaseSyncToAsync(connection_id)
+        assert async_to_sync(thread_name)().startswith("database")
+        assert async_to_sync(query)() == executor.submit(connection_id).result()
+
+
+@override_settings(
+    DATABASE_READ_REPLICA_ENABLED=True,
+    TIMESERIES_DATABASE_READ_REPLICA_ENABLED=True,
+    DATABASE_READ_YOUR_WRITES_WINDOW=5,
+    DATABASE_REPLICA_MAX_LAG=None,
+)
+class DatabaseRouterTests(TestCase):
+    def setUp(self):
+        self.router = DatabaseRouter()
+        self.writes = ReadYourWrites()
+        token = read_your_writes.set(self.writes)
+        self.addCleanup(read_your_writes.reset, token)
+
+    @override_settings(
+        DATABASE_READ_REPLICA_ENABLED=False,
+        TIMESERIES_DATABASE_READ_REPLICA_ENABLED=False,
+    )
+    def test_replicas_disabled(self):
+        assert self.router.db_for_read(Repository) == "default"
+        assert self.router.db_for_read(Measurement) == "timeseries"
+
+    def test_replicas(self):
+        assert self.router.db_for_read(Repository) == "default_read"
+        assert self.router.db_for_read(Measurement) == "timeseries_read"
+        assert self.router.db_for_write(Repository) == "default"
+        assert self.router.db_for_write(Measurement) == "timeseries"
+
+    def test_read_your_writes(self):
+        assert self.router.db_for_read(Repository) == "default_read"
+        self.router.db_for_write(Repository)
+        assert self.writes.written
+        assert self.router.db_for_read(Repository) == "default"
+        assert self.router.db_for_read(Measurement) == "timeseries"
+
+        with patch("codecov.db.time.time", return_value=time.time() + 6):
+            assert self.router.db_for_read(Repository) == "default_read"
+
+    @override_settings(DATABASE_READ_YOUR_WRITES_WINDOW=0)
+    def test_read_your_writes_disabled(self):
+        self.router.db_for_write(Repository)
+        assert self.router.db_for_read(Repository) == "default_read"
+
+    @override_settings(
+        DATABASE_REPLICA_MAX_LAG=10, DATABASE_REPLICA_LAG_CHECK_INTERVAL=60
+    )
+    @patch("codecov.db.replication_lag", new_callable=ReplicationLagMonitor)
+    def test_replica_lag(self, monitor):
+        with patch.object(monitor, "measure", return_value=30) as measure:
+            assert self.router.db_for_read(Repository) == "default"
+            assert self.router.db_for_read(Repository) == "default"
+        # measured once per interval
+        measure.assert_called_once_with("default_read")
+
+        monitor.lag["default_read"] = 5
+        assert self.router.db_for_read(Repository) == "default_read"
+
+    @override_settings(DATABASE_REPLICA_MAX_LAG=10)
+    @patch("codecov.db.metrics")
+    def test_measure_replica_lag(self, metrics):
+        monitor = ReplicationLagMonitor()
+        # not a replica
+        assert monitor.measure("default") == 0
+        metrics.gauge.assert_called_once_with("database.default.replication_lag", 0)
+
+        with patch("codecov.db.connections") as connections:
+            connections["default"].cursor.side_effect = DatabaseError
+            assert monitor.measure("default") == math.inf
@@ -0,0 +1,98 @@
+import time
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from codecov.db import read_your_writes
+from codecov.middleware import ArchiveReadCountMiddleware, ReadYourWritesMiddleware
+from services.archive import record_archive_read
+
+
+class ArchiveReadCountMiddlewareTest(TestCase):
+    def _view(self, request):
+        record_archive_read(10)
+        record_archive_read(5)
+        return HttpResponse()
+
+    @patch("codecov.middleware.metrics")
+    def test_counts_archive_reads(self, metrics):
+        request = RequestFactory().get("/")
+        middleware = ArchiveReadCountMiddleware(self._view)
+        middleware(request)
+
+        assert request.archive_read_counter.reads == 2
+        assert request.archive_read_counter.bytes == 15
+        metrics.incr.assert_any_call("archive.request.reads", 2)
+        metrics.incr.assert_any_call("archive.request.bytes", 15)
+
+    @patch("codecov.middleware.metrics")
+    def test_no_archive_reads(self, metrics):
+        request = RequestFactory().get("/")
+        middleware = ArchiveReadCountMiddleware(lambda request: HttpResponse())
+        middleware(request)
+
+        assert request.archive_read_counter.reads == 0
+        assert not metrics.incr.called
+
+    @patch("codecov.middleware.metrics")
+    async def test_counts_archive_reads_async(self, metrics):
+        async def view(request):
+            record_archive_read(10)
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        middleware = ArchiveReadCountMiddleware(view)
+        await middleware(request)
+
+        assert request.archive_read_counter.reads == 1
+        metrics.incr.assert_any_call("archive.request.reads", 1)
+        metrics.incr.assert_any_call("archive.request.bytes", 10)
+
+
+@override_settings(DATABASE_READ_YOUR_WRITES_WINDOW=5)
+class ReadYourWritesMiddlewareTest(TestCase):
+    def setUp(self):
+        token = read_your_writes.set(None)
+        self.addCleanup(read_your_writes.reset, token)
+
+    def test_reads_only(self):
+        request = RequestFactory().get("/")
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse())
+        response = middleware(request)
+
+        assert read_your_writes.get() is request.read_your_writes
+        assert not request.read_your_writes.is_pinned()
+        assert "db_primary_until" not in response.cookies
+
+    def test_writes_are_remembered(self):
+        def view(request):
+            read_your_writes.get().record_write()
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        middleware = ReadYourWritesMiddleware(view)
+        response = middleware(request)
+        cookie = response.cookies["db_primary_until"]
+        assert cookie["max-age"] == 5
+
+        request = RequestFactory().get("/")
+        request.COOKIES["db_primary_until"] = cookie.value
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse())
+        middleware(request)
+        assert request.read_your_writes.is_pinned()
+        assert not request.read_your_writes.written
+
+    def test_pinned_for_a_window_at_most(self):
+        request = RequestFactory().get("/")
+        request.COOKIES["db_primary_until"] = str(time.time() + 3600)
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse())
+        middleware(request)
+        assert request.read_your_writes.pinned_until <= time.time() + 5
+
+    def test_invalid_cookie(self):
+        request = RequestFactory().get("/")
+        request.COOKIES["db_primary_until"] = "invalid"
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse())
+        middleware(request)
+        assert not request.read_your_writes.is_pinned()
@@ -0,0 +1,134 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+from django.test import TestCase
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from codecov.db.pool import ConnectionPool, PoolTimeout, get_pool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = TRANSACTION_STATUS_IDLE
+        self.usable = True
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        cursor = MagicMock()
+        if not self.usable:
+            cursor.__enter__.return_value.execute.side_effect = (
+                psycopg2.OperationalError
+            )
+        return cursor
+
+
+@patch("codecov.db.pool.metrics")
+class ConnectionPoolTests(TestCase):
+    def pool(self, **kwargs):
+        return ConnectionPool("default", **kwargs)
+
+    def test_connections_are_reused(self, metrics):
+        pool = self.pool()
+        connect = MagicMock(side_effect=FakeConnection)
+        connection = pool.getconn(connect)
+        pool.putconn(connection)
+        assert pool.getconn(connect) is connection
+        assert connect.call_count == 1
+        assert pool.size == 1
+        assert pool.in_use == 1
+        metrics.gauge.assert_any_call("database.default.pool.in_use", 1)
+
+    def test_open_transactions_are_rolled_back(self, metrics):
+        pool = self.pool()
+        connection = pool.getconn(FakeConnection)
+        connection.status = TRANSACTION_STATUS_INTRANS
+        pool.putconn(connection)
+        assert connection.status == TRANSACTION_STATUS_IDLE
+        assert pool.getconn(FakeConnection) is connection
+
+    def test_closed_connections_are_discarded(self, metrics):
+        pool = self.pool()
+        connection = pool.getconn(FakeConnection)
+        connection.close()
+        pool.putconn(connection)
+        assert pool.size == 0
+        assert pool.getconn(FakeConnection) is not connection
+
+    def test_max_lifetime(self, metrics):
+        pool = self.pool(max_lifetime=0)
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+        assert connection.closed
+        assert pool.size == 0
+
+    def test_health_check(self, metrics):
+        pool = self.pool(health_check_interval=0)
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+        assert pool.getconn(FakeConnection) is connection
+        pool.putconn(connection)
+
+        connection.usable = False
+        assert pool.getconn(FakeConnection) is not connection
+        assert connection.closed
+        assert pool.size == 1
+
+    def test_max_idle(self, metrics):
+        pool = self.pool(min_size=1, max_idle=0)
+        first = pool.getconn(FakeConnection)
+        second = pool.getconn(FakeConnection)
+        pool.putconn(first)
+        pool.putconn(second)
+        # the pool keeps `min_size` connections
+        assert first.closed
+        assert not second.closed
+        assert pool.size == 1
+
+    def test_timeout(self, metrics):
+        pool = self.pool(max_size=1, timeout=0.01)
+        pool.getconn(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection)
+        metrics.incr.assert_called_once_with("database.default.pool.timeout")
+
+    def test_waits_for_a_connection(self, metrics):
+        pool = self.pool(max_size=1, timeout=5)
+        connection = pool.getconn(FakeConnection)
+
+        def return_connection():
+            time.sleep(0.05)
+            pool.putconn(connection)
+
+        thread = threading.Thread(target=return_connection)
+        thread.start()
+        assert pool.getconn(FakeConnection) is connection
+        thread.join()
+
+        wait_ms = metrics.timing.mock_calls[-1].args[1]
+        assert metrics.timing.mock_calls[-1].args[0] == "database.default.pool.wait"
+        assert wait_ms >= 50
+
+    def test_failed_connects_free_their_slot(self, metrics):
+        pool = self.pool(max_size=1, timeout=0.01)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn(MagicMock(side_effect=psycopg2.OperationalError))
+        assert pool.size == 0
+        assert pool.getconn(FakeConnection)
+
+    def test_get_pool(self, metrics):
+        settings_dict = {"NAME": "codecov", "POOL": {"max_size": 3}}
+        pool = get_pool("test_get_pool", settings_dict)
+        assert pool.max_size == 3
+        assert get_pool("test_get_pool", settings_dict) is pool
+        assert get_pool("test_get_pool", {"NAME": "other"}) is not pool
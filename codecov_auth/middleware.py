@@ -6,6 +6,7 @@ from django.urls import resolve
 from django.utils.deprecation import MiddlewareMixin
 from rest_framework import exceptions
 
+from codecov.db import sync_to_async
 from codecov_auth.models import Owner, Service
 from utils.services import get_long_service_name
 
@@ -37,6 +38,9 @@ class CurrentOwnerMiddleware(MiddlewareMixin):
     This middleware is preferrable to accessing the session directly in views since
     we can load the `Owner` once and reuse it anywhere needed (without having to perform
     additional database queries).
+
+    When served over ASGI, the `Owner` is loaded with `codecov.db.sync_to_async`
+    and the rest of the request stays on the event loop.
     """
 
     def process_request(self, request):
@@ -59,12 +63,20 @@ class CurrentOwnerMiddleware(MiddlewareMixin):
 
         request.current_owner = current_owner
 
+    async def __acall__(self, request):
+        await sync_to_async(self.process_request)(request)
+        return await self.get_response(request)
+
 
 class ImpersonationMiddleware(MiddlewareMixin):
     """
     Allows staff users to impersonate other users for debugging.
     """
 
+    async def __acall__(self, request):
+        await sync_to_async(self.process_request)(request)
+        return await self.get_response(request)
+
     def process_request(self, request):
         current_user = request.user
 
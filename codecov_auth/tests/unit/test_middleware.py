@@ -0,0 +1,34 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from codecov_auth.middleware import CurrentOwnerMiddleware
+from codecov_auth.tests.factories import OwnerFactory, UserFactory
+
+
+class CurrentOwnerMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        OwnerFactory(service="gitlab", user=self.user)
+        self.owner = OwnerFactory(service="github", user=self.user)
+
+    def request(self):
+        request = RequestFactory().get("/graphql/gh")
+        request.user = self.user
+        request.session = {}
+        return request
+
+    def test_current_owner(self):
+        request = self.request()
+        middleware = CurrentOwnerMiddleware(lambda request: HttpResponse())
+        middleware(request)
+        assert request.current_owner == self.owner
+
+    async def test_current_owner_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        request = self.request()
+        middleware = CurrentOwnerMiddleware(get_response)
+        response = await middleware(request)
+        assert response.status_code == 200
+        assert request.current_owner == self.owner
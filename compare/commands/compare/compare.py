@@ -6,3 +6,8 @@ from .interactors.fetch_impacted_files import FetchImpactedFiles
 class CompareCommands(BaseCommand):
     def fetch_impacted_files(self, comparsion, filters):
         return self.get_interactor(FetchImpactedFiles).execute(comparsion, filters)
+
+    def paginate_impacted_files(self, comparison, filters, **kwargs):
+        return self.get_interactor(FetchImpactedFiles).paginate(
+            comparison, filters, **kwargs
+        )
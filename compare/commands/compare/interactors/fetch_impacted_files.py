@@ -1,7 +1,10 @@
 import enum
+import functools
+from typing import Sequence
 
 from codecov.commands.base import BaseInteractor
-from services.comparison import ImpactedFile
+from graphql_api.helpers.connection import sequence_to_connection
+from services.comparison import ComparisonReport, ImpactedFile
 
 
 class ImpactedFileParameter(enum.Enum):
@@ -12,16 +15,25 @@ class ImpactedFileParameter(enum.Enum):
     PATCH_COVERAGE = "patch_coverage"
 
 
-class FetchImpactedFiles(BaseInteractor):
-    def _apply_filters(self, impacted_files, filters):
-        parameter = filters.get("ordering", {}).get("parameter")
-        direction = filters.get("ordering", {}).get("direction")
-        if parameter and direction:
-            impacted_files = self.sort_impacted_files(
-                impacted_files, parameter, direction
-            )
-        return impacted_files
+@functools.total_ordering
+class Descending:
+    """
+    Wraps a value to sort it in descending order within an ascending sort key.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
 
+
+class FetchImpactedFiles(BaseInteractor):
     def get_attribute(
         self, impacted_file: ImpactedFile, parameter: ImpactedFileParameter
     ):
@@ -41,42 +53,89 @@ class FetchImpactedFiles(BaseInteractor):
         else:
             raise ValueError(f"invalid impacted file parameter: {parameter}")
 
-    def sort_impacted_files(self, impacted_files, parameter, direction):
+    def sort_keys(self, comparison_report: ComparisonReport, filters) -> Sequence:
         """
-        Sorts the impacted files by any provided parameter and slides items with None values to the end
+        A sort key for every file of `comparison_report.files` (by position)
+        according to the ordering in `filters`.  Files without a value for the
+        ordering parameter go last and ties keep the order of the files.
+
+        The keys are computed once per comparison and ordering.
         """
-        # Separate impacted files with None values for the specified parameter value
-        files_with_coverage = []
-        files_without_coverage = []
-        for file in impacted_files:
-            if self.get_attribute(file, parameter) is not None:
-                files_with_coverage.append(file)
-            else:
-                files_without_coverage.append(file)
-
-        # Sort impacted_files list based on parameter value
-        is_reversed = direction.value == "descending"
-        files_with_coverage = sorted(
-            files_with_coverage,
-            key=lambda x: self.get_attribute(x, parameter),
-            reverse=is_reversed,
+        parameter = filters.get("ordering", {}).get("parameter")
+        direction = filters.get("ordering", {}).get("direction")
+        if not parameter or not direction:
+            return range(len(comparison_report.files))
+
+        def compute():
+            descending = direction.value == "descending"
+            keys = []
+            for position, file in enumerate(comparison_report.files):
+                value = self.get_attribute(file, parameter)
+                if value is None:
+                    keys.append((1, 0, position))
+                elif descending:
+                    keys.append((0, Descending(value), position))
+                else:
+                    keys.append((0, value, position))
+            return tuple(keys)
+
+        return comparison_report.memoize(
+            f"impacted_files/sort_keys/{parameter}/{direction}", compute
         )
 
-        # Merge both lists together
-        return files_with_coverage + files_without_coverage
+    def positions(self, comparison_report: ComparisonReport, filters) -> Sequence[int]:
+        """
+        Positions in `comparison_report.files` of the files matching `filters`.
+        """
+        has_unintended_changes = filters.get("has_unintended_changes")
+        if has_unintended_changes is None:
+            return range(len(comparison_report.files))
+
+        def compute():
+            return [
+                position
+                for position, file in enumerate(comparison_report.files)
+                if (
+                    file.has_changes
+                    if has_unintended_changes
+                    else file.has_diff or not file.has_changes
+                )
+            ]
+
+        return comparison_report.memoize(
+            f"impacted_files/has_unintended_changes/{has_unintended_changes}", compute
+        )
 
     def execute(self, comparison_report, filters):
         if filters is None:
             return comparison_report.impacted_files
 
-        has_unintended_changes = filters.get("has_unintended_changes")
-        if has_unintended_changes is not None:
-            impacted_files = (
-                comparison_report.impacted_files_with_unintended_changes
-                if has_unintended_changes
-                else comparison_report.impacted_files_with_direct_changes
-            )
-        else:
-            impacted_files = comparison_report.impacted_files
+        files = comparison_report.files
+        keys = self.sort_keys(comparison_report, filters)
+        positions = sorted(
+            self.positions(comparison_report, filters), key=keys.__getitem__
+        )
+        return [files[position] for position in positions]
 
-        return self._apply_filters(impacted_files, filters)
+    def paginate(
+        self,
+        comparison_report,
+        filters,
+        first=None,
+        after=None,
+        last=None,
+        before=None,
+    ):
+        """
+        Same as `execute` but only returns a page of the files, as a connection.
+        """
+        filters = filters or {}
+        return sequence_to_connection(
+            comparison_report.files,
+            keys=self.sort_keys(comparison_report, filters),
+            positions=self.positions(comparison_report, filters),
+            first=first,
+            after=after,
+            last=last,
+            before=before,
+        )
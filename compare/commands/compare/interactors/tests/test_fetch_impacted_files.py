@@ -466,3 +466,49 @@ class FetchImpactedFilesTest(TransactionTestCase):
         }
         impacted_files = self.execute(None, self.comparison, filters)
         assert [file.head_name for file in impacted_files] == ["fileA", "fileB"]
+
+    @patch("services.archive.ArchiveService.read_file")
+    def test_paginate_impacted_files(self, read_file):
+        read_file.return_value = mocked_files_with_direct_and_indirect_changes
+        interactor = FetchImpactedFiles(None, "github")
+        filters = {
+            "ordering": {
+                "direction": OrderingDirection.DESC,
+                "parameter": ImpactedFileParameter.FILE_NAME,
+            },
+        }
+        connection = interactor.paginate(self.comparison, filters, first=2)
+        assert [edge["node"].head_name for edge in connection.edges] == [
+            "fileC",
+            "fileB",
+        ]
+        assert connection.total_count() == 3
+
+        connection = interactor.paginate(
+            self.comparison,
+            filters,
+            first=2,
+            after=connection.page_info()["end_cursor"],
+        )
+        assert [edge["node"].head_name for edge in connection.edges] == ["fileA"]
+        assert connection.page_info()["has_next_page"] is False
+
+        assert [
+            file.head_name for file in interactor.execute(self.comparison, filters)
+        ] == ["fileC", "fileB", "fileA"]
+
+    @patch("services.archive.ArchiveService.read_file")
+    def test_sort_keys_computed_once(self, read_file):
+        read_file.return_value = mock_data_from_archive
+        interactor = FetchImpactedFiles(None, "github")
+        filters = {
+            "ordering": {
+                "direction": OrderingDirection.ASC,
+                "parameter": ImpactedFileParameter.MISSES_COUNT,
+            },
+        }
+        with patch.object(FetchImpactedFiles, "get_attribute", return_value=1) as mock:
+            interactor.paginate(self.comparison, filters, first=1)
+            interactor.paginate(self.comparison, filters, first=1)
+            interactor.execute(self.comparison, filters)
+        assert mock.call_count == 2
@@ -1,7 +1,11 @@
 import logging
 
+from django.conf import settings
+
 from codecov.commands.base import BaseInteractor
+from codecov.db import sync_to_async
 from services.repo_providers import RepoProviderService
+from services.source import fetch_source
 
 log = logging.getLogger(__name__)
 
@@ -12,6 +16,10 @@ class GetFileContentInteractor(BaseInteractor):
             repository_service = RepoProviderService().get_adapter(
                 owner=self.current_owner, repo=commit.repository
             )
+            if settings.SOURCE_CACHE_ENABLED:
+                return await sync_to_async(fetch_source)(
+                    repository_service, commit.repository_id, commit.commitid, path
+                )
             content = await repository_service.get_source(path, commit.commitid)
             return content.get("content").decode("utf-8")
         # TODO raise this to the API so we can handle it.
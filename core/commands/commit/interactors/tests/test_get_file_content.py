@@ -1,14 +1,16 @@
 import asyncio
 from unittest.mock import patch
 
+import fakeredis
 import pytest
 from asgiref.sync import async_to_sync
 from django.contrib.auth.models import AnonymousUser
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from shared.torngit.exceptions import TorngitObjectNotFoundError
 
 from codecov_auth.tests.factories import OwnerFactory
 from core.tests.factories import CommitFactory, RepositoryFactory
+from services.cache import TwoTierCache
 
 from ..get_file_content import GetFileContentInteractor
 
@@ -23,6 +25,15 @@ class MockedProviderAdapter:
         }
 
 
+class CountingProviderAdapter:
+    def __init__(self):
+        self.calls = []
+
+    async def get_source(self, path, commitid):
+        self.calls.append((path, commitid))
+        return {"content": b"def function_1:\n    pass\n"}
+
+
 class GetFileContentInteractorTest(TransactionTestCase):
     def setUp(self):
         self.owner = OwnerFactory(username="codecov-user")
@@ -56,3 +67,25 @@ class GetFileContentInteractorTest(TransactionTestCase):
         )
         file_content = await self.execute(None, self.commit, "path")
         assert file_content == None
+
+    @patch("services.repo_providers.RepoProviderService.get_adapter")
+    @async_to_sync
+    async def test_when_source_cache_enabled(self, mock_provider_adapter):
+        adapter = CountingProviderAdapter()
+        mock_provider_adapter.return_value = adapter
+
+        cache = TwoTierCache(
+            name="source",
+            local_max_bytes=1024 * 1024,
+            redis_ttl=60,
+            redis_max_bytes=1024 * 1024,
+            redis_connection=fakeredis.FakeStrictRedis(),
+        )
+        with override_settings(SOURCE_CACHE_ENABLED=True), patch(
+            "services.source.source_cache", cache
+        ):
+            for _ in range(2):
+                file_content = await self.execute(None, self.commit, "path/to/file")
+                assert file_content == "def function_1:\n    pass\n"
+
+        assert adapter.calls == [("path/to/file", self.commit.commitid)]
@@ -0,0 +1,135 @@
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandParser
+from shared.reports.resources import Report, ReportFile
+from shared.utils.merge import line_type
+from shared.utils.sessions import Session
+
+from services.columnar import ColumnarReportFile
+from services.comparison import CreateChangeSummaryVisitor
+
+
+def random_line(rng: random.Random, sessions: int) -> list:
+    session_coverages = [
+        [session_id, rng.choice([0, 1, 1, 1, "1/2"])]
+        for session_id in rng.sample(range(sessions), rng.randint(1, sessions))
+    ]
+    coverages = [coverage for _, coverage in session_coverages]
+    if any(coverage == 1 for coverage in coverages):
+        coverage = 1
+    elif "1/2" in coverages:
+        coverage = "1/2"
+    else:
+        coverage = 0
+    return [coverage, None, session_coverages, None, None]
+
+
+def measure(fn):
+    """
+    Returns `(result, seconds, peak allocated bytes)` of calling `fn`.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the memory and CPU of the per-line report objects with "
+        "`services.columnar.ColumnarReportFile` on a synthetic report file"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--lines", type=int, default=100_000)
+        parser.add_argument("--sessions", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        num_lines, num_sessions = options["lines"], options["sessions"]
+
+        head_lines = [random_line(rng, num_sessions) for _ in range(num_lines)]
+        base_lines = [random_line(rng, num_sessions) for _ in range(num_lines)]
+        patch = rng.sample(range(1, num_lines + 1), num_lines // 10)
+
+        report = Report()
+        for session_id in range(num_sessions):
+            report.add_session(Session(flags=[f"flag-{session_id}"]))
+        report.append(ReportFile("file.py", lines=head_lines))
+        base_file = ReportFile("file.py", lines=base_lines)
+
+        results = []
+
+        def run(name, objects_fn, columnar_fn):
+            _, objects_time, objects_memory = measure(objects_fn)
+            _, columnar_time, columnar_memory = measure(columnar_fn)
+            results.append(
+                (name, objects_time, columnar_time, objects_memory, columnar_memory)
+            )
+
+        head_file = report.get("file.py")
+        run(
+            "build",
+            lambda: list(head_file.lines),
+            lambda: ColumnarReportFile.from_report_file(head_file),
+        )
+        head_columnar = ColumnarReportFile.from_report_file(head_file)
+        base_columnar = ColumnarReportFile.from_report_file(base_file)
+
+        run(
+            "totals",
+            lambda: ReportFile("file.py", lines=head_lines).totals,
+            lambda: head_columnar.totals,
+        )
+        run(
+            "flag filter",
+            lambda: report.filter(flags=["flag-0"]).get("file.py").totals,
+            lambda: head_columnar.filter([0]).totals,
+        )
+
+        def objects_patch_totals():
+            counts = Counter()
+            for ln in patch:
+                line = head_file.get(ln)
+                if line is not None:
+                    counts[line_type(line.coverage)] += 1
+            return counts
+
+        run(
+            "patch totals",
+            objects_patch_totals,
+            lambda: head_columnar.patch_totals(patch),
+        )
+
+        def objects_change_summary():
+            visitor = CreateChangeSummaryVisitor(
+                ReportFile("file.py", lines=base_lines),
+                ReportFile("file.py", lines=head_lines),
+            )
+            for ln in range(1, num_lines + 1):
+                visitor(ln, ln, " ", False)
+            return visitor.summary
+
+        run(
+            "line comparison",
+            objects_change_summary,
+            lambda: head_columnar.change_summary(base_columnar),
+        )
+
+        self.stdout.write(
+            f"{num_lines} lines, {num_sessions} sessions\n"
+            f"{'operation':<16}{'objects (ms)':>14}{'columnar (ms)':>15}"
+            f"{'objects (KiB)':>15}{'columnar (KiB)':>16}"
+        )
+        for name, objects_time, columnar_time, objects_mem, columnar_mem in results:
+            self.stdout.write(
+                f"{name:<16}{objects_time * 1000:>14.1f}{columnar_time * 1000:>15.1f}"
+                f"{objects_mem / 1024:>15.0f}{columnar_mem / 1024:>16.0f}"
+            )
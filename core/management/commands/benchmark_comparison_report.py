@@ -0,0 +1,136 @@
+import json
+import random
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.test import override_settings
+
+from services.cache import LocalLRUCache
+from services.comparison import (
+    ComparisonReport,
+    ImpactedFile,
+    raw_comparison_report_cache,
+)
+
+# same fields as `ImpactedFile` but without `__slots__`
+UnslottedImpactedFile = make_dataclass(
+    "UnslottedImpactedFile",
+    [(f.name, f.type, f) for f in fields(ImpactedFile)],
+)
+
+
+def random_totals(rng: random.Random) -> dict:
+    return {
+        "hits": rng.randint(0, 500),
+        "misses": rng.randint(0, 100),
+        "partials": rng.randint(0, 20),
+        "branches": 0,
+        "sessions": 0,
+        "complexity": 0,
+        "complexity_total": 0,
+        "methods": 0,
+    }
+
+
+def random_file(rng: random.Random, index: int) -> dict:
+    coverages = ["h", "m", "p"]
+    added_lines = sorted(rng.sample(range(1, 1000), rng.randint(0, 40)))
+    return {
+        "head_name": f"src/module_{index // 100}/file_{index}.py",
+        "base_name": f"src/module_{index // 100}/file_{index}.py",
+        "file_was_added_by_diff": False,
+        "file_was_removed_by_diff": False,
+        "head_coverage": random_totals(rng),
+        "base_coverage": random_totals(rng),
+        "added_diff_coverage": [[ln, rng.choice(coverages)] for ln in added_lines],
+        "unexpected_line_changes": [],
+    }
+
+
+def measure(fn):
+    """
+    Returns `(result, seconds, peak allocated bytes)` of calling `fn`.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class FakeCommitComparison:
+    report_storage_path = "v4/benchmark.json"
+    updated_at = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the memory of the impacted files of a synthetic commit comparison "
+        "and the time it takes to look them up (with a new `ComparisonReport` "
+        "each time, as in separate requests) with and without its cache"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--files", type=int, default=5000)
+        parser.add_argument("--lookups", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        num_files = options["files"]
+        data = json.dumps(
+            {"files": [random_file(rng, index) for index in range(num_files)]}
+        )
+        paths = [
+            f"src/module_{index // 100}/file_{index}.py"
+            for index in rng.choices(range(num_files), k=options["lookups"])
+        ]
+
+        raw_files = json.loads(data)["files"]
+
+        def create(cls):
+            return [
+                cls(
+                    **{
+                        **file,
+                        "base_coverage": ImpactedFile.Totals(**file["base_coverage"]),
+                        "head_coverage": ImpactedFile.Totals(**file["head_coverage"]),
+                    }
+                )
+                for file in raw_files
+            ]
+
+        _, _, unslotted_memory = measure(lambda: create(UnslottedImpactedFile))
+        _, _, slotted_memory = measure(lambda: create(ImpactedFile))
+
+        def lookups():
+            # one `ComparisonReport` per request
+            for path in paths:
+                ComparisonReport(FakeCommitComparison()).impacted_file(path)
+
+        with patch(
+            "services.comparison.ComparisonReport._fetch_raw_comparison_data",
+            lambda self: json.loads(data),
+        ), patch(
+            "services.comparison.comparison_report_cache",
+            LocalLRUCache(max_bytes=len(data), sizeof=lambda parsed: parsed.size),
+        ), patch.object(
+            raw_comparison_report_cache, "redis_enabled", False
+        ):
+            with override_settings(COMPARISON_REPORT_CACHE_ENABLED=False):
+                _, uncached_time, _ = measure(lookups)
+            with override_settings(COMPARISON_REPORT_CACHE_ENABLED=True):
+                _, cached_time, _ = measure(lookups)
+
+        self.stdout.write(
+            f"{num_files} impacted files\n"
+            f"memory without __slots__: {unslotted_memory / 1024:.0f} KiB\n"
+            f"memory with __slots__:    {slotted_memory / 1024:.0f} KiB\n"
+            f"{len(paths)} lookups without cache: {uncached_time * 1000:.1f} ms\n"
+            f"{len(paths)} lookups with cache:    {cached_time * 1000:.1f} ms"
+        )
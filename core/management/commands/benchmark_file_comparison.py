@@ -0,0 +1,85 @@
+import random
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from services.comparison import FileComparison
+from services.tests.helper import synthetic_file_pair
+
+
+def measure(fn):
+    """
+    Returns `(result, seconds, peak allocated bytes)` of calling `fn`.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares traversing a synthetic file comparison line by line with "
+        "skipping the lines outside of the diff in bulk "
+        "(`FileComparisonTraverseManager.unchanged_lines`)"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--lines", type=int, default=20_000)
+        parser.add_argument("--hunks", type=int, default=20)
+        parser.add_argument("--changes", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        base_file, head_file, segments, src = synthetic_file_pair(
+            rng, options["lines"], options["hunks"], options["changes"]
+        )
+
+        operations = {
+            # what's computed for the files of a comparison
+            "change summary": lambda: FileComparison(
+                base_file=base_file, head_file=head_file
+            ).change_summary,
+            # what's computed for a single file comparison
+            "segments": lambda: FileComparison(
+                base_file=base_file,
+                head_file=head_file,
+                diff_data={"segments": segments},
+                src=src,
+                bypass_max_diff=True,
+            ).segments,
+        }
+
+        results = []
+        for name, fn in operations.items():
+            with patch(
+                "services.comparison.FileComparisonTraverseManager.unchanged_lines",
+                lambda self: 0,
+            ):
+                per_line, per_line_time, per_line_memory = measure(fn)
+            bulk, bulk_time, bulk_memory = measure(fn)
+            if name == "segments":
+                per_line = [[line.number for line in s.lines] for s in per_line]
+                bulk = [[line.number for line in s.lines] for s in bulk]
+            assert per_line == bulk, f"different {name}"
+            results.append(
+                (name, per_line_time, bulk_time, per_line_memory, bulk_memory)
+            )
+
+        self.stdout.write(
+            f"{options['lines']} lines, {len(segments)} segments, "
+            f"{options['changes']} coverage changes\n"
+            f"{'operation':<16}{'per line (ms)':>15}{'bulk (ms)':>11}"
+            f"{'per line (KiB)':>16}{'bulk (KiB)':>12}"
+        )
+        for name, per_line_time, bulk_time, per_line_mem, bulk_mem in results:
+            self.stdout.write(
+                f"{name:<16}{per_line_time * 1000:>15.1f}{bulk_time * 1000:>11.1f}"
+                f"{per_line_mem / 1024:>16.0f}{bulk_mem / 1024:>12.0f}"
+            )
@@ -1,5 +1,7 @@
 from codecov_auth.models import Owner
 from core.models import Repository
+from graphql_api.helpers.lookahead import lookahead_all
+from graphql_api.types.enums import RepositoryOrdering
 
 
 def apply_filters_to_queryset(queryset, filters):
@@ -20,24 +22,67 @@ def apply_filters_to_queryset(queryset, filters):
     return queryset
 
 
-def list_repository_for_owner(current_owner: Owner, owner: Owner, filters):
-    queryset = (
-        Repository.objects.viewable_repos(current_owner)
-        .with_recent_coverage()
-        .with_latest_commit_at()
-        .filter(author=owner)
-    )
+def apply_annotations_to_queryset(
+    queryset, with_recent_coverage=True, with_latest_commit_at=True
+):
+    if with_recent_coverage:
+        queryset = queryset.with_recent_coverage()
+    if with_latest_commit_at:
+        queryset = queryset.with_latest_commit_at()
+    return queryset
+
+
+def list_repository_for_owner(
+    current_owner: Owner,
+    owner: Owner,
+    filters,
+    with_recent_coverage=True,
+    with_latest_commit_at=True,
+):
+    queryset = apply_annotations_to_queryset(
+        Repository.objects.viewable_repos(current_owner),
+        with_recent_coverage=with_recent_coverage,
+        with_latest_commit_at=with_latest_commit_at,
+    ).filter(author=owner)
     queryset = apply_filters_to_queryset(queryset, filters)
     return queryset
 
 
-def search_repos(current_owner, filters):
+def search_repos(
+    current_owner, filters, with_recent_coverage=True, with_latest_commit_at=True
+):
     authors_from = [current_owner.ownerid] + (current_owner.organizations or [])
-    queryset = (
-        Repository.objects.viewable_repos(current_owner)
-        .with_recent_coverage()
-        .with_latest_commit_at()
-        .filter(author__ownerid__in=authors_from)
-    )
+    queryset = apply_annotations_to_queryset(
+        Repository.objects.viewable_repos(current_owner),
+        with_recent_coverage=with_recent_coverage,
+        with_latest_commit_at=with_latest_commit_at,
+    ).filter(author__ownerid__in=authors_from)
     queryset = apply_filters_to_queryset(queryset, filters)
     return queryset
+
+
+# fields of `Repository` resolved from the annotations of `with_recent_coverage`
+RECENT_COVERAGE_FIELDS = ("coverage", "coverageSha", "hits", "misses", "lines")
+# fields of `Repository` resolved from the annotations of `with_latest_commit_at`
+LATEST_COMMIT_AT_FIELDS = ("latestCommitAt",)
+
+
+def repository_annotations(info, ordering: RepositoryOrdering) -> dict:
+    """
+    Selects the annotations of a connection of repositories (see
+    `list_repository_for_owner`) that are needed by its ordering and by the fields
+    requested on its nodes.  Each of them adds correlated subqueries over the
+    commits for every repository.
+    """
+    # the nodes can be selected several times (ex. in different fragments)
+    nodes = lookahead_all(info, ("edges", "node"))
+
+    def requested(fields):
+        return any(node[field] for node in nodes for field in fields)
+
+    return dict(
+        with_recent_coverage=ordering == RepositoryOrdering.COVERAGE
+        or requested(RECENT_COVERAGE_FIELDS),
+        with_latest_commit_at=ordering == RepositoryOrdering.COMMIT_DATE
+        or requested(LATEST_COMMIT_AT_FIELDS),
+    )
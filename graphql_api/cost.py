@@ -0,0 +1,179 @@
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+from django.conf import settings
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLField,
+    GraphQLNamedType,
+    GraphQLSchema,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    get_named_type,
+    is_leaf_type,
+)
+from graphql.execution.values import get_argument_values
+from graphql.utilities import get_operation_ast
+
+from codecov.commands.exceptions import BaseException
+
+log = logging.getLogger(__name__)
+
+# size of a page when neither `first` nor `last` are given
+# (see `graphql_api.helpers.connection`)
+DEFAULT_PAGE_SIZE = 25
+
+
+class QueryTooExpensive(BaseException):
+    def __init__(self, cost: int, max_cost: int):
+        super().__init__(cost, max_cost)
+        self.cost = cost
+        self.max_cost = max_cost
+
+    @property
+    def message(self):
+        return (
+            f"Query cost of {self.cost} exceeds the maximum of {self.max_cost}, "
+            "request fewer items or fields"
+        )
+
+
+class QueryCostCalculator:
+    """
+    Statically computes the cost of an operation from its document, before it's
+    executed.
+
+    The cost of a field is its weight plus the cost of its selections, times the
+    size of the page it returns (its `first` or `last` argument) for paginated
+    fields.  Weights are looked up by `Type.field` and then by field name, and
+    default to 1 for fields of an object type and 0 for scalars.  All the
+    fragments of a selection are counted, so the cost of a selection on a union
+    or interface is an upper bound.
+    """
+
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        variables: Optional[Mapping[str, Any]] = None,
+        weights: Optional[Mapping[str, int]] = None,
+    ):
+        self.schema = schema
+        self.variables = variables or {}
+        self.weights = weights or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        # costs of the fragments by name (see `fragment_cost`)
+        self.fragment_costs: Dict[str, int] = {}
+
+    def operation_cost(self, operation: OperationDefinitionNode) -> int:
+        root_type = self.schema.get_root_type(operation.operation)
+        return self.selection_set_cost(operation.selection_set, root_type)
+
+    def selection_set_cost(
+        self, selection_set: SelectionSetNode, parent_type: GraphQLNamedType
+    ) -> int:
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost += self.field_cost(selection, parent_type)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.schema.get_type(
+                        selection.type_condition.name.value
+                    )
+                cost += self.selection_set_cost(selection.selection_set, fragment_type)
+            elif isinstance(selection, FragmentSpreadNode):
+                cost += self.fragment_cost(selection.name.value)
+        return cost
+
+    def fragment_cost(self, name: str) -> int:
+        # fragments can be spread many times (including within other fragments)
+        # so their cost is only computed once
+        if name not in self.fragment_costs:
+            # fragment cycles are rejected when the document is validated
+            fragment = self.fragments[name]
+            fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+            self.fragment_costs[name] = self.selection_set_cost(
+                fragment.selection_set, fragment_type
+            )
+        return self.fragment_costs[name]
+
+    def field_cost(self, node: FieldNode, parent_type: GraphQLNamedType) -> int:
+        field = getattr(parent_type, "fields", {}).get(node.name.value)
+        if field is None:
+            # meta fields like `__typename`
+            return 0
+
+        field_type = get_named_type(field.type)
+        weight = self.weights.get(
+            f"{parent_type.name}.{node.name.value}",
+            self.weights.get(node.name.value, 0 if is_leaf_type(field_type) else 1),
+        )
+        if node.selection_set is None:
+            return weight
+        return weight + self.page_size(field, node) * self.selection_set_cost(
+            node.selection_set, field_type
+        )
+
+    def page_size(self, field: GraphQLField, node: FieldNode) -> int:
+        if "first" not in field.args and "last" not in field.args:
+            return 1
+        try:
+            args = get_argument_values(field, node, self.variables)
+        except GraphQLError:
+            # invalid variables are reported when the operation is executed
+            args = {}
+        page_size = args.get("first") or args.get("last") or DEFAULT_PAGE_SIZE
+        return max(page_size, 0)
+
+
+def query_cost(
+    schema: GraphQLSchema,
+    document: DocumentNode,
+    variables: Optional[Mapping[str, Any]] = None,
+    operation_name: Optional[str] = None,
+) -> int:
+    """
+    Returns the cost of the operation to execute in `document` with the weights
+    in `GRAPHQL_QUERY_COST_WEIGHTS` (see `QueryCostCalculator`).
+    """
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        # reported when the operation is executed
+        return 0
+    calculator = QueryCostCalculator(
+        schema, document, variables, weights=settings.GRAPHQL_QUERY_COST_WEIGHTS
+    )
+    return calculator.operation_cost(operation)
+
+
+def check_query_cost(
+    schema: GraphQLSchema, document: DocumentNode, data: Mapping[str, Any]
+) -> int:
+    """
+    Logs the cost of the operation in `data` and raises a `GraphQLError` when it
+    exceeds `GRAPHQL_QUERY_MAX_COST` (if set).
+    """
+    cost = query_cost(
+        schema, document, data.get("variables"), data.get("operationName")
+    )
+    log.info(
+        "GraphQL query cost",
+        extra=dict(cost=cost, operation_name=data.get("operationName")),
+    )
+
+    max_cost = settings.GRAPHQL_QUERY_MAX_COST
+    if max_cost is not None and cost > max_cost:
+        error = QueryTooExpensive(cost, max_cost)
+        raise GraphQLError(error.message, original_error=error)
+    return cost
@@ -0,0 +1,37 @@
+from typing import Optional
+
+from shared.reports.resources import Report
+
+import services.report as report_service
+from codecov.db import sync_to_async
+from core.models import Commit
+
+from .loader import BaseLoader
+
+
+class ReportLoader(BaseLoader):
+    """
+    Loads the reports of commits (see `Commit.full_report`), keyed by commit id, so
+    that all the resolvers of a request share a single report per commit.  The
+    `CommitReport`s of the commits loaded together are fetched in a single query.
+    """
+
+    def __init__(self, info, *args, **kwargs):
+        # the commits being loaded, by id
+        self.commits = {}
+        super().__init__(info, *args, **kwargs)
+
+    async def load_report(self, commit: Commit) -> Optional[Report]:
+        self.commits.setdefault(commit.pk, commit)
+        report = await self.load(commit.pk)
+        # other instances of the same commit share the report too
+        vars(commit).setdefault("full_report", report)
+        return report
+
+    @sync_to_async
+    def batch_load_fn(self, keys):
+        commits = [self.commits[key] for key in keys]
+        report_service.prefetch_commit_reports(
+            [commit for commit in commits if "full_report" not in vars(commit)]
+        )
+        return [commit.full_report for commit in commits]
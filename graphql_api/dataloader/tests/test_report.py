@@ -0,0 +1,66 @@
+import asyncio
+from unittest.mock import patch
+
+from django.test import TransactionTestCase
+
+from core.models import Commit
+from core.tests.factories import CommitWithReportFactory
+from graphql_api.dataloader.report import ReportLoader
+
+
+class GraphQLResolveInfo:
+    def __init__(self):
+        self.context = {}
+
+
+class ReportLoaderTestCase(TransactionTestCase):
+    def setUp(self):
+        self.commit = CommitWithReportFactory(commitid="abf6d4d")
+        # another instance of the same commit
+        self.same_commit = Commit.objects.get(pk=self.commit.pk)
+        self.other_commit = CommitWithReportFactory(commitid="cde5f1a")
+        self.info = GraphQLResolveInfo()
+
+    @patch("services.report.build_report_from_commit")
+    async def test_one_report_per_commit(self, build_report_mock):
+        build_report_mock.side_effect = lambda commit: object()
+
+        loader = ReportLoader.loader(self.info)
+        assert ReportLoader.loader(self.info) is loader
+
+        reports = await asyncio.gather(
+            loader.load_report(self.commit),
+            loader.load_report(self.same_commit),
+            loader.load_report(self.other_commit),
+        )
+        assert reports[0] is reports[1]
+        assert reports[0] is not reports[2]
+        assert await loader.load_report(self.commit) is reports[0]
+        assert build_report_mock.call_count == 2
+
+        # resolvers using `Commit.full_report` get the same report
+        assert self.commit.full_report is reports[0]
+        assert self.same_commit.full_report is reports[0]
+        assert self.other_commit.full_report is reports[2]
+
+    @patch("services.report.build_report_from_commit")
+    @patch("services.report.prefetch_commit_reports")
+    async def test_commit_reports_are_fetched_together(
+        self, prefetch_mock, build_report_mock
+    ):
+        loader = ReportLoader.loader(self.info)
+        await asyncio.gather(
+            loader.load_report(self.commit), loader.load_report(self.other_commit)
+        )
+        prefetch_mock.assert_called_once_with([self.commit, self.other_commit])
+
+    @patch("services.report.build_report_from_commit")
+    @patch("services.report.prefetch_commit_reports")
+    async def test_commit_with_report(self, prefetch_mock, build_report_mock):
+        report = self.commit.full_report
+
+        loader = ReportLoader.loader(self.info)
+        assert await loader.load_report(self.commit) is report
+        assert build_report_mock.call_count == 1
+        # its commit report isn't fetched again
+        prefetch_mock.assert_called_once_with([])
@@ -0,0 +1,233 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from inspect import isawaitable
+from typing import Any, List, Optional, Sequence, Tuple
+
+from ariadne import format_error
+from ariadne.extensions import ExtensionManager
+from ariadne.graphql import (
+    handle_graphql_errors,
+    handle_query_result,
+    parse_query,
+    validate_data,
+    validate_query,
+)
+from ariadne.types import GraphQLResult
+from django.conf import settings
+from graphql import DocumentNode, GraphQLError, GraphQLSchema, execute
+from shared.metrics import metrics
+
+from codecov.commands.exceptions import BaseException
+from codecov.db import sync_to_async
+from services.cache import LocalLRUCache, TwoTierCache
+
+from .cost import check_query_cost
+
+
+class PersistedQueryNotFound(BaseException):
+    # the message Apollo clients look for to send the query along with its hash
+    message = "PersistedQueryNotFound"
+
+
+class PersistedQueryNotSupported(BaseException):
+    message = "PersistedQueryNotSupported"
+
+
+class PersistedQueryHashMismatch(BaseException):
+    message = "provided sha does not match query"
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+# registry of persisted queries, by the sha256 hash of their text
+persisted_queries = TwoTierCache(
+    name="graphql_persisted_query",
+    local_max_bytes=settings.GRAPHQL_PERSISTED_QUERIES_LOCAL_MAX_BYTES,
+    redis_ttl=settings.GRAPHQL_PERSISTED_QUERIES_REDIS_TTL,
+    redis_max_bytes=settings.GRAPHQL_PERSISTED_QUERIES_REDIS_MAX_BYTES,
+)
+
+
+async def resolve_persisted_query(data: Any) -> Tuple[Any, Optional[str]]:
+    """
+    Supports the (Apollo) automatic persisted queries protocol: clients send the
+    sha256 hash of their query in `extensions.persistedQuery.sha256Hash` and
+    only send the query itself when the server doesn't know it yet.
+
+    Returns the data of the operation, with its query, and the hash to register
+    the query under once it's validated (if it's not registered yet).
+    """
+    if not isinstance(data, dict):
+        return data, None
+    persisted_query = (data.get("extensions") or {}).get("persistedQuery")
+    if not persisted_query:
+        return data, None
+    if not settings.GRAPHQL_PERSISTED_QUERIES_ENABLED:
+        raise GraphQLError(
+            PersistedQueryNotSupported.message,
+            original_error=PersistedQueryNotSupported(),
+        )
+
+    sha256_hash = persisted_query.get("sha256Hash")
+    query = data.get("query")
+    if query is None:
+        query = await sync_to_async(persisted_queries.get)(str(sha256_hash))
+        if query is None:
+            raise GraphQLError(
+                PersistedQueryNotFound.message, original_error=PersistedQueryNotFound()
+            )
+        return {**data, "query": query.decode()}, None
+
+    if not isinstance(query, str) or query_hash(query) != sha256_hash:
+        raise GraphQLError(
+            PersistedQueryHashMismatch.message,
+            original_error=PersistedQueryHashMismatch(),
+        )
+    return data, sha256_hash
+
+
+@dataclass(frozen=True)
+class CachedDocument:
+    document: DocumentNode
+    # the document was validated against this schema, which is kept alive so
+    # its `id` in the cache key can't be reused by another one
+    schema: GraphQLSchema
+    # how long it took to parse and validate the document
+    seconds: float
+    # length of the query, which the size of the document is proportional to
+    size: int
+
+
+# parsed and validated documents, by schema and query (see `get_document`)
+document_cache = LocalLRUCache(
+    max_bytes=settings.GRAPHQL_DOCUMENT_CACHE_MAX_BYTES,
+    sizeof=lambda cached: cached.size,
+)
+
+
+def get_document(
+    schema: GraphQLSchema,
+    query: str,
+    validation_rules: Optional[Sequence] = None,
+    introspection: bool = True,
+) -> Tuple[DocumentNode, List[GraphQLError]]:
+    """
+    Parses and validates `query`, returning its document and validation errors.
+
+    When `GRAPHQL_DOCUMENT_CACHE_ENABLED` is set, documents without validation
+    errors are cached so the same query isn't lexed, parsed and validated again.
+    Hits, misses and the time saved are sent to statsd under
+    `graphql.document_cache`.
+    """
+    key = None
+    if settings.GRAPHQL_DOCUMENT_CACHE_ENABLED:
+        key = "/".join(
+            (
+                str(id(schema)),
+                str(introspection),
+                str(hash(tuple(validation_rules or ()))),
+                query_hash(query),
+            )
+        )
+        cached = document_cache.get(key)
+        if cached is not None and cached.schema is schema:
+            metrics.incr("graphql.document_cache.hit")
+            metrics.timing("graphql.document_cache.time_saved", cached.seconds * 1000)
+            return cached.document, []
+        metrics.incr("graphql.document_cache.miss")
+
+    start = time.perf_counter()
+    document = parse_query(None, None, {"query": query})
+    errors = validate_query(
+        schema, document, validation_rules, enable_introspection=introspection
+    )
+    seconds = time.perf_counter() - start
+
+    if key is not None and not errors:
+        document_cache.set(
+            key, CachedDocument(document, schema, seconds, size=len(query))
+        )
+    return document, errors
+
+
+async def graphql(
+    schema: GraphQLSchema,
+    data: Any,
+    *,
+    context_value: Optional[Any] = None,
+    root_value: Optional[Any] = None,
+    validation_rules: Optional[Sequence] = None,
+    debug: bool = False,
+    introspection: bool = True,
+    logger=None,
+    error_formatter=format_error,
+    extensions=None,
+    middleware=None,
+) -> GraphQLResult:
+    """
+    Executes a GraphQL operation like `ariadne.graphql.graphql`, with persisted
+    queries (see `resolve_persisted_query`), documents that are only parsed
+    and validated once (see `get_document`) and a limit on the cost of the
+    operation (see `check_query_cost`).  Unlike ariadne, `root_value` and
+    `validation_rules` can't be callables.
+    """
+    extension_manager = ExtensionManager(extensions, context_value)
+
+    with extension_manager.request():
+        try:
+            data, sha256_hash = await resolve_persisted_query(data)
+            validate_data(data)
+
+            document, validation_errors = get_document(
+                schema,
+                data["query"],
+                validation_rules=validation_rules,
+                introspection=introspection,
+            )
+            if validation_errors:
+                return handle_graphql_errors(
+                    validation_errors,
+                    logger=logger,
+                    error_formatter=error_formatter,
+                    debug=debug,
+                    extension_manager=extension_manager,
+                )
+
+            if sha256_hash is not None:
+                await sync_to_async(persisted_queries.set)(
+                    sha256_hash, data["query"].encode()
+                )
+
+            # depends on the variables so it's not cached with the document
+            check_query_cost(schema, document, data)
+
+            result = execute(
+                schema,
+                document,
+                root_value=root_value,
+                context_value=context_value,
+                variable_values=data.get("variables"),
+                operation_name=data.get("operationName"),
+                middleware=extension_manager.as_middleware_manager(middleware),
+            )
+            if isawaitable(result):
+                result = await result
+        except GraphQLError as error:
+            return handle_graphql_errors(
+                [error],
+                logger=logger,
+                error_formatter=error_formatter,
+                debug=debug,
+                extension_manager=extension_manager,
+            )
+
+        return handle_query_result(
+            result,
+            logger=logger,
+            error_formatter=error_formatter,
+            debug=debug,
+            extension_manager=extension_manager,
+        )
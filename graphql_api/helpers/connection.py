@@ -1,13 +1,19 @@
 import enum
+import heapq
+from base64 import b64decode, b64encode
 from dataclasses import dataclass
 from functools import cached_property
+from typing import Iterable, Optional, Sequence
 
 from cursor_pagination import CursorPage, CursorPaginator
 from django.db.models import QuerySet
 
+from codecov.commands.exceptions import ValidationError
 from codecov.db import sync_to_async
 from graphql_api.types.enums import OrderingDirection
 
+from .count import Count, count_queryset
+
 
 def build_connection_graphql(connection_name, type_node):
     edge_name = connection_name + "Edge"
@@ -15,6 +21,7 @@ def build_connection_graphql(connection_name, type_node):
         type {connection_name} {{
           edges: [{edge_name}]
           totalCount: Int!
+          isTotalCountExact: Boolean!
           pageInfo: PageInfo!
         }}
 
@@ -46,9 +53,17 @@ class Connection:
             for pos, node in enumerate(self.page)
         ]
 
+    @cached_property
+    def count(self) -> Count:
+        return count_queryset(self.queryset)
+
     @sync_to_async
     def total_count(self, *args, **kwargs):
-        return self.queryset.count()
+        return self.count.value
+
+    @sync_to_async
+    def is_total_count_exact(self, *args, **kwargs):
+        return self.count.exact
 
     @cached_property
     def start_cursor(self):
@@ -93,3 +108,117 @@ def queryset_to_connection_sync(
 @sync_to_async
 def queryset_to_connection(*args, **kwargs):
     return queryset_to_connection_sync(*args, **kwargs)
+
+
+@dataclass
+class ArrayConnection:
+    """
+    A page of an in-memory sequence - see `sequence_to_connection`.
+    """
+
+    edges: list
+    total: int
+    has_next_page: bool
+    has_previous_page: bool
+
+    def total_count(self, *args, **kwargs):
+        return self.total
+
+    def is_total_count_exact(self, *args, **kwargs):
+        return True
+
+    def page_info(self, *args, **kwargs):
+        return {
+            "has_next_page": self.has_next_page,
+            "has_previous_page": self.has_previous_page,
+            "start_cursor": self.edges[0]["cursor"] if self.edges else None,
+            "end_cursor": self.edges[-1]["cursor"] if self.edges else None,
+        }
+
+
+def encode_array_cursor(position: int) -> str:
+    return b64encode(f"arrayconnection:{position}".encode()).decode()
+
+
+def decode_array_cursor(cursor: str) -> int:
+    try:
+        prefix, position = b64decode(cursor).decode().split(":")
+        if prefix != "arrayconnection":
+            raise ValueError(prefix)
+        return int(position)
+    except ValueError:
+        raise ValidationError("Invalid cursor")
+
+
+def sequence_to_connection(
+    nodes: Sequence,
+    *,
+    keys: Sequence,
+    positions: Optional[Iterable[int]] = None,
+    first=None,
+    after=None,
+    last=None,
+    before=None,
+) -> ArrayConnection:
+    """
+    Pages through `nodes` (or only those at `positions`) in the order of their
+    `keys`, which must be unique.  Cursors point at a position in `nodes` and
+    pages start right after (or before) the key of that node, so they stay
+    stable as long as the keys do.
+
+    Pages are selected with a heap rather than by sorting: the first `n` of `N`
+    nodes take O(N log n).
+    """
+    if not first and not last:
+        first = 25
+
+    def key(position):
+        return keys[position]
+
+    positions = list(range(len(nodes)) if positions is None else positions)
+    total = len(positions)
+    has_previous_page = has_next_page = False
+
+    for cursor, is_after in ((after, True), (before, False)):
+        if cursor is None:
+            continue
+        cursor_position = decode_array_cursor(cursor)
+        if not 0 <= cursor_position < len(nodes):
+            raise ValidationError("Invalid cursor")
+        cursor_key = keys[cursor_position]
+        remaining = [
+            position
+            for position in positions
+            if (key(position) > cursor_key if is_after else key(position) < cursor_key)
+        ]
+        if len(remaining) < len(positions):
+            if is_after:
+                has_previous_page = True
+            else:
+                has_next_page = True
+        positions = remaining
+
+    if first:
+        page = heapq.nsmallest(first + 1, positions, key=key)
+        if len(page) > first:
+            has_next_page = True
+            page = page[:first]
+        if last and len(page) > last:
+            has_previous_page = True
+            page = page[-last:]
+    else:
+        page = heapq.nlargest(last + 1, positions, key=key)
+        if len(page) > last:
+            has_previous_page = True
+            page = page[:last]
+        page.reverse()
+
+    return ArrayConnection(
+        edges=[
+            {"cursor": encode_array_cursor(position), "node": nodes[position]}
+            for position in page
+        ],
+        total=total,
+        has_next_page=has_next_page,
+        has_previous_page=has_previous_page,
+    )
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+
+from services.cache import TwoTierCache
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Count:
+    value: int
+    # whether `value` is an estimate from the query planner
+    exact: bool = True
+
+
+# recent counts, by queryset (see `count_queryset`)
+count_cache = TwoTierCache(
+    name="graphql_count",
+    local_max_bytes=settings.GRAPHQL_COUNT_CACHE_LOCAL_MAX_BYTES,
+    redis_ttl=settings.GRAPHQL_COUNT_CACHE_TTL,
+    redis_max_bytes=1024,
+)
+
+
+def queryset_signature(queryset: QuerySet) -> str:
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    return hashlib.sha256(f"{queryset.db}\n{sql}\n{params!r}".encode()).hexdigest()
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Number of rows the query planner expects `queryset` to return (from the
+    table statistics, e.g. `reltuples`), or `None` if it can't tell.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format="json"))
+    except IndexError:
+        # querysets that can't match anything (e.g. `none()`) aren't explained
+        return 0
+    except (DatabaseError, ValueError):
+        log.warning("Failed to estimate the size of a queryset", exc_info=True)
+        return None
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_queryset(queryset: QuerySet) -> Count:
+    """
+    Counts the rows of `queryset`.
+
+    When `GRAPHQL_COUNT_ESTIMATE_THRESHOLD` is set, querysets the planner
+    expects to have at least that many rows aren't counted and their estimated
+    size is returned instead, since an exact count has to go through all of them.
+
+    When `GRAPHQL_COUNT_CACHE_ENABLED` is set, counts are cached for
+    `GRAPHQL_COUNT_CACHE_TTL` seconds by the SQL of the queryset.
+    """
+    key = None
+    if settings.GRAPHQL_COUNT_CACHE_ENABLED:
+        try:
+            key = queryset_signature(queryset)
+        except EmptyResultSet:
+            # querysets that can't match anything (e.g. `none()`) have no SQL
+            return Count(0)
+        cached = count_cache.get(key)
+        if cached is not None:
+            value, exact, counted_at = json.loads(cached)
+            # the local tier doesn't expire entries
+            if time.time() - counted_at < settings.GRAPHQL_COUNT_CACHE_TTL:
+                return Count(value, exact)
+
+    count = None
+    threshold = settings.GRAPHQL_COUNT_ESTIMATE_THRESHOLD
+    if threshold is not None:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= threshold:
+            count = Count(estimate, exact=False)
+    if count is None:
+        count = Count(queryset.count())
+
+    if key is not None:
+        value = json.dumps([count.value, count.exact, time.time()])
+        count_cache.set(key, value.encode())
+    return count
@@ -1,7 +1,8 @@
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional
 
 from graphql.language.ast import (
     FragmentSpreadNode,
+    InlineFragmentNode,
     Node,
     SelectionSetNode,
     VariableNode,
@@ -47,16 +48,30 @@ class LookaheadNode:
                 if selection.name.value == name:
                     return LookaheadNode(selection, self.info)
 
+    def children(self, name: str) -> List["LookaheadNode"]:
+        """
+        Get all the child nodes with the given name (a field can be selected several
+        times, ex. in different fragments)
+        """
+        if not self.node.selection_set:
+            return []
+        return [
+            LookaheadNode(selection, self.info)
+            for selection in self._flatten_selections(self.node.selection_set)
+            if selection.name.value == name
+        ]
+
     def _flatten_selections(self, selection_set: SelectionSetNode) -> Iterable[Node]:
         """
-        Expand fragments into flat list of selections
+        Expand (possibly nested and inline) fragments into flat list of selections
         """
         selections = []
         for selection in selection_set.selections:
             if isinstance(selection, FragmentSpreadNode):
                 fragment = self.info.fragments[selection.name.value]
-                for selection in fragment.selection_set.selections:
-                    selections.append(selection)
+                selections += self._flatten_selections(fragment.selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                selections += self._flatten_selections(selection.selection_set)
             else:
                 selections.append(selection)
         return selections
@@ -75,3 +90,17 @@ def lookahead(info: GraphQLResolveInfo, path: Iterable[str]) -> Optional[Lookahe
             return None
 
     return node
+
+
+def lookahead_all(info: GraphQLResolveInfo, path: Iterable[str]) -> List[LookaheadNode]:
+    """
+    Traverse the GraphQL AST and return all the lookahead nodes at the given `path`,
+    following every selection of each field along it (unlike `lookahead`, which only
+    follows the first one)
+    """
+    nodes = [LookaheadNode(field_node, info) for field_node in info.field_nodes]
+
+    for item in path:
+        nodes = [child for node in nodes for child in node.children(item)]
+
+    return nodes
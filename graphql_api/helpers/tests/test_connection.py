@@ -1,5 +1,5 @@
 from asgiref.sync import async_to_sync
-from django.test import TransactionTestCase
+from django.test import TestCase, TransactionTestCase
 
 from core.models import Repository
 from core.tests.factories import RepositoryFactory
@@ -65,3 +65,60 @@ class RepositoryQuerySetTests(TransactionTestCase):
 
         count = async_to_sync(connection.total_count)()
         assert count == 3
+
+
+class SequenceToConnectionTests(TestCase):
+    nodes = ["e", "b", "d", "a", "c"]
+
+    def connection(self, **kwargs):
+        from graphql_api.helpers.connection import sequence_to_connection
+
+        return sequence_to_connection(self.nodes, keys=self.nodes, **kwargs)
+
+    def test_pages_forward(self):
+        connection = self.connection(first=2)
+        assert [edge["node"] for edge in connection.edges] == ["a", "b"]
+        assert connection.total_count() == 5
+        page_info = connection.page_info()
+        assert page_info["has_next_page"] is True
+        assert page_info["has_previous_page"] is False
+
+        connection = self.connection(first=2, after=page_info["end_cursor"])
+        assert [edge["node"] for edge in connection.edges] == ["c", "d"]
+        assert connection.page_info()["has_previous_page"] is True
+
+        connection = self.connection(
+            first=2, after=connection.page_info()["end_cursor"]
+        )
+        assert [edge["node"] for edge in connection.edges] == ["e"]
+        assert connection.page_info()["has_next_page"] is False
+
+    def test_pages_backward(self):
+        connection = self.connection(last=2)
+        assert [edge["node"] for edge in connection.edges] == ["d", "e"]
+        assert connection.page_info()["has_previous_page"] is True
+
+        connection = self.connection(
+            last=2, before=connection.page_info()["start_cursor"]
+        )
+        assert [edge["node"] for edge in connection.edges] == ["b", "c"]
+        assert connection.page_info()["has_next_page"] is True
+
+    def test_positions(self):
+        connection = self.connection(positions=[0, 2, 4])
+        assert [edge["node"] for edge in connection.edges] == ["c", "d", "e"]
+        assert connection.total_count() == 3
+
+    def test_empty(self):
+        connection = self.connection(positions=[])
+        assert connection.edges == []
+        assert connection.page_info()["start_cursor"] is None
+
+    def test_invalid_cursor(self):
+        from codecov.commands.exceptions import ValidationError
+        from graphql_api.helpers.connection import encode_array_cursor
+
+        with self.assertRaises(ValidationError):
+            self.connection(after="not a cursor")
+        with self.assertRaises(ValidationError):
+            self.connection(after=encode_array_cursor(5))
@@ -0,0 +1,97 @@
+from unittest.mock import patch
+
+import fakeredis
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase, override_settings
+
+from core.models import Repository
+from core.tests.factories import OwnerFactory, RepositoryFactory
+from graphql_api.helpers.connection import queryset_to_connection
+from graphql_api.helpers.count import Count, count_queryset, estimate_count
+from graphql_api.types.enums import OrderingDirection
+from services.cache import TwoTierCache
+
+
+class CountQuerysetTests(TransactionTestCase):
+    def setUp(self):
+        self.owner = OwnerFactory()
+        for name in ("a", "b", "c"):
+            RepositoryFactory(author=self.owner, name=name)
+        self.queryset = Repository.objects.filter(author=self.owner)
+
+        cache_patcher = patch(
+            "graphql_api.helpers.count.count_cache",
+            TwoTierCache(
+                name="graphql_count",
+                local_max_bytes=1024 * 1024,
+                redis_ttl=60,
+                redis_max_bytes=1024,
+                redis_connection=fakeredis.FakeStrictRedis(),
+            ),
+        )
+        self.cache = cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+    def test_count(self):
+        assert count_queryset(self.queryset) == Count(3, exact=True)
+
+    def test_estimate_count(self):
+        assert isinstance(estimate_count(self.queryset), int)
+        assert estimate_count(self.queryset.none()) == 0
+
+    @override_settings(GRAPHQL_COUNT_ESTIMATE_THRESHOLD=1000)
+    @patch("graphql_api.helpers.count.estimate_count")
+    def test_estimated_count(self, estimate_count_mock):
+        estimate_count_mock.return_value = 5000
+        assert count_queryset(self.queryset) == Count(5000, exact=False)
+
+        # small querysets are counted
+        estimate_count_mock.return_value = 10
+        assert count_queryset(self.queryset) == Count(3, exact=True)
+
+        # estimates aren't available
+        estimate_count_mock.return_value = None
+        assert count_queryset(self.queryset) == Count(3, exact=True)
+
+    @override_settings(GRAPHQL_COUNT_CACHE_ENABLED=True, GRAPHQL_COUNT_CACHE_TTL=60)
+    def test_cached_count(self):
+        assert count_queryset(self.queryset) == Count(3, exact=True)
+        RepositoryFactory(author=self.owner, name="d")
+        with self.assertNumQueries(0):
+            assert count_queryset(self.queryset) == Count(3, exact=True)
+
+        # other querysets are counted separately
+        queryset = self.queryset.filter(name="a")
+        assert count_queryset(queryset) == Count(1, exact=True)
+
+    @override_settings(GRAPHQL_COUNT_CACHE_ENABLED=True, GRAPHQL_COUNT_CACHE_TTL=60)
+    def test_cached_count_empty_queryset(self):
+        with self.assertNumQueries(0):
+            assert count_queryset(self.queryset.none()) == Count(0, exact=True)
+            assert count_queryset(self.queryset.filter(pk__in=[])) == Count(0)
+
+    @override_settings(GRAPHQL_COUNT_CACHE_ENABLED=True, GRAPHQL_COUNT_CACHE_TTL=60)
+    def test_cached_count_expires(self):
+        with patch("graphql_api.helpers.count.time.time", return_value=1000):
+            assert count_queryset(self.queryset) == Count(3, exact=True)
+        RepositoryFactory(author=self.owner, name="d")
+        with patch("graphql_api.helpers.count.time.time", return_value=1030):
+            assert count_queryset(self.queryset) == Count(3, exact=True)
+        with patch("graphql_api.helpers.count.time.time", return_value=1061):
+            assert count_queryset(self.queryset) == Count(4, exact=True)
+
+    @override_settings(GRAPHQL_COUNT_ESTIMATE_THRESHOLD=1000)
+    @patch("graphql_api.helpers.count.estimate_count")
+    def test_connection_total_count(self, estimate_count_mock):
+        estimate_count_mock.return_value = 5000
+        connection = async_to_sync(queryset_to_connection)(
+            self.queryset,
+            ordering=("name",),
+            ordering_direction=OrderingDirection.ASC,
+            first=2,
+        )
+        assert async_to_sync(connection.total_count)() == 5000
+        assert async_to_sync(connection.is_total_count_exact)() is False
+        assert len(connection.edges) == 2
+        # the queryset is only estimated once
+        assert estimate_count_mock.call_count == 1
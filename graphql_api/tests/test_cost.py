@@ -0,0 +1,156 @@
+from ariadne import make_executable_schema
+from django.test import TestCase, override_settings
+from graphql import GraphQLError, parse
+
+from ..cost import (
+    DEFAULT_PAGE_SIZE,
+    QueryCostCalculator,
+    QueryTooExpensive,
+    check_query_cost,
+    query_cost,
+)
+
+type_defs = """
+    type Query {
+        owner: Owner
+    }
+
+    type Owner {
+        username: String
+        repositories(first: Int, last: Int): RepositoryConnection
+    }
+
+    type RepositoryConnection {
+        edges: [RepositoryEdge]
+    }
+
+    type RepositoryEdge {
+        node: Repository
+    }
+
+    type Repository {
+        name: String
+        commit: Commit
+    }
+
+    type Commit {
+        commitid: String
+        pathContents(path: String): PathContentsResult
+    }
+
+    type PathContents {
+        results: [String]
+    }
+
+    type MissingHeadReport {
+        message: String
+    }
+
+    union PathContentsResult = PathContents | MissingHeadReport
+"""
+
+schema = make_executable_schema(type_defs)
+
+query = """
+    query Repositories($first: Int) {
+        owner {
+            username
+            repositories(first: $first) {
+                edges {
+                    node {
+                        name
+                        ...Contents
+                    }
+                }
+            }
+        }
+    }
+
+    fragment Contents on Repository {
+        commit {
+            pathContents(path: "src") {
+                __typename
+                ... on PathContents { results }
+            }
+        }
+    }
+"""
+
+
+class QueryCostCalculatorTests(TestCase):
+    def cost(self, query, variables=None, weights=None):
+        document = parse(query)
+        calculator = QueryCostCalculator(schema, document, variables, weights)
+        return calculator.operation_cost(document.definitions[0])
+
+    def test_scalars_are_free(self):
+        assert self.cost("{ owner { username } }") == 1
+
+    def test_pages_multiply_their_selections(self):
+        # owner + repositories + first * (edges + node + commit + pathContents)
+        assert self.cost(query, {"first": 10}) == 2 + 10 * 4
+
+    def test_default_page_size(self):
+        assert self.cost(query) == 2 + DEFAULT_PAGE_SIZE * 4
+        assert self.cost(query, {"first": 0}) == 2 + DEFAULT_PAGE_SIZE * 4
+
+    def test_last(self):
+        query = "{ owner { repositories(last: 5) { edges { node { name } } } } }"
+        assert self.cost(query) == 2 + 5 * 2
+
+    def test_weights(self):
+        weights = {"pathContents": 100, "Repository.commit": 5}
+        assert self.cost(query, {"first": 10}, weights) == 2 + 10 * (2 + 5 + 100)
+
+    def test_nested_pages_fan_out(self):
+        weights = {"pathContents": 100}
+        cheap = self.cost(query, {"first": 1}, weights)
+        expensive = self.cost(query, {"first": 100}, weights)
+        assert expensive == 2 + 100 * (cheap - 2)
+
+    def test_nested_fragments(self):
+        # each fragment spreads the previous one twice
+        fragments = ["fragment F0 on Owner { username }"] + [
+            f"fragment F{i} on Owner {{ ...F{i - 1} ...F{i - 1} }}"
+            for i in range(1, 41)
+        ]
+        query = "\n".join(["{ owner { ...F40 } }", *fragments])
+        document = parse(query)
+        calculator = QueryCostCalculator(schema, document, weights={"username": 1})
+        assert calculator.operation_cost(document.definitions[0]) == 1 + 2**40
+        assert len(calculator.fragment_costs) == 41
+
+
+class CheckQueryCostTests(TestCase):
+    @override_settings(GRAPHQL_QUERY_COST_WEIGHTS={"pathContents": 100})
+    def test_query_cost(self):
+        document = parse(query)
+        assert query_cost(schema, document, {"first": 10}) == 2 + 10 * 103
+        assert query_cost(schema, document, operation_name="Other") == 0
+
+    @override_settings(
+        GRAPHQL_QUERY_COST_WEIGHTS={"pathContents": 100}, GRAPHQL_QUERY_MAX_COST=None
+    )
+    def test_no_limit(self):
+        data = {"query": query, "variables": {"first": 100}}
+        with self.assertLogs("graphql_api.cost", level="INFO") as logs:
+            assert check_query_cost(schema, parse(query), data) == 2 + 100 * 103
+        assert logs.records[0].cost == 2 + 100 * 103
+        assert logs.records[0].operation_name is None
+
+    @override_settings(
+        GRAPHQL_QUERY_COST_WEIGHTS={"pathContents": 100}, GRAPHQL_QUERY_MAX_COST=5000
+    )
+    def test_over_budget(self):
+        data = {"query": query, "variables": {"first": 10}}
+        assert check_query_cost(schema, parse(query), data) == 2 + 10 * 103
+
+        data = {"query": query, "variables": {"first": 100}}
+        with self.assertRaises(GraphQLError) as context:
+            check_query_cost(schema, parse(query), data)
+        error = context.exception.original_error
+        assert isinstance(error, QueryTooExpensive)
+        assert error.message == (
+            "Query cost of 10302 exceeds the maximum of 5000, "
+            "request fewer items or fields"
+        )
@@ -59,6 +59,49 @@ query ImpactedFiles(
     }
 """
 
+query_impacted_files_connection = """
+query ImpactedFiles(
+    $org: String!
+    $repo: String!
+    $commit: String!
+    $after: String
+) {
+    owner(username: $org) {
+        repository(name: $repo) {
+            ... on Repository {
+                commit(id: $commit) {
+                    compareWithParent {
+                        ... on Comparison {
+                            impactedFilesConnection(
+                                first: 1
+                                after: $after
+                                filters: {
+                                    ordering: {
+                                        parameter: FILE_NAME
+                                        direction: DESC
+                                    }
+                                }
+                            ) {
+                                totalCount
+                                edges {
+                                    node {
+                                        headName
+                                    }
+                                }
+                                pageInfo {
+                                    hasNextPage
+                                    endCursor
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
 query_direct_changed_files_count = """
 query ImpactedFiles(
     $org: String!
@@ -252,6 +295,30 @@ class TestImpactedFile(GraphQLTestHelper, TransactionTestCase):
         self.base_report.return_value = None
         self.addCleanup(self.base_report_patcher.stop)
 
+    @patch("services.archive.ArchiveService.read_file")
+    def test_fetch_impacted_files_connection(self, read_file):
+        read_file.return_value = mock_data_from_archive
+        variables = {
+            "org": self.org.username,
+            "repo": self.repo.name,
+            "commit": self.commit.commitid,
+        }
+        data = self.gql_request(query_impacted_files_connection, variables=variables)
+        connection = data["owner"]["repository"]["commit"]["compareWithParent"][
+            "impactedFilesConnection"
+        ]
+        assert connection["totalCount"] == 2
+        assert connection["edges"] == [{"node": {"headName": "fileB"}}]
+        assert connection["pageInfo"]["hasNextPage"] is True
+
+        variables["after"] = connection["pageInfo"]["endCursor"]
+        data = self.gql_request(query_impacted_files_connection, variables=variables)
+        connection = data["owner"]["repository"]["commit"]["compareWithParent"][
+            "impactedFilesConnection"
+        ]
+        assert connection["edges"] == [{"node": {"headName": "fileA"}}]
+        assert connection["pageInfo"]["hasNextPage"] is False
+
     @patch("services.archive.ArchiveService.read_file")
     def test_fetch_impacted_files(self, read_file):
         read_file.return_value = mock_data_from_archive
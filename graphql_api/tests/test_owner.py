@@ -13,6 +13,7 @@ from codecov_auth.tests.factories import (
     UserFactory,
 )
 from core.tests.factories import CommitFactory, OwnerFactory, RepositoryFactory
+from graphql_api.actions.repository import list_repository_for_owner
 from plan.constants import PlanName, TrialStatus
 from reports.tests.factories import CommitReportFactory, UploadFactory
 
@@ -136,6 +137,62 @@ class TestOwnerType(GraphQLTestHelper, TransactionTestCase):
         repos = paginate_connection(data["owner"]["repositories"])
         assert repos == [{"name": "b"}, {"name": "a"}]
 
+    @patch(
+        "graphql_api.types.owner.owner.list_repository_for_owner",
+        wraps=list_repository_for_owner,
+    )
+    def test_fetching_repositories_only_needed_annotations(self, list_mock):
+        query = query_repositories % (self.owner.username, "", "")
+        self.gql_request(query, owner=self.owner)
+        assert list_mock.call_args.kwargs == {
+            "with_recent_coverage": False,
+            "with_latest_commit_at": False,
+        }
+
+        query = query_repositories % (self.owner.username, "(ordering: COVERAGE)", "")
+        data = self.gql_request(query, owner=self.owner)
+        assert list_mock.call_args.kwargs == {
+            "with_recent_coverage": True,
+            "with_latest_commit_at": False,
+        }
+        assert len(paginate_connection(data["owner"]["repositories"])) == 2
+
+        query = """{
+            owner(username: "%s") {
+                repositories {
+                    edges { node { name ...dates } }
+                }
+            }
+        }
+        fragment dates on Repository { latestCommitAt }
+        """
+        self.gql_request(query % self.owner.username, owner=self.owner)
+        assert list_mock.call_args.kwargs == {
+            "with_recent_coverage": False,
+            "with_latest_commit_at": True,
+        }
+
+        # `edges` and `node` are selected in several fragments
+        query = """{
+            owner(username: "%s") {
+                repositories { ...names }
+                repositories { ...coverage }
+            }
+        }
+        fragment names on RepositoryConnection { edges { node { name } } }
+        fragment coverage on RepositoryConnection {
+            edges { node { coverage latestCommitAt } }
+        }
+        """
+        data = self.gql_request(query % self.owner.username, owner=self.owner)
+        assert list_mock.call_args.kwargs == {
+            "with_recent_coverage": True,
+            "with_latest_commit_at": True,
+        }
+        repos = paginate_connection(data["owner"]["repositories"])
+        assert len(repos) == 2
+        assert all("coverage" in repo for repo in repos)
+
     def test_fetching_repositories_inactive_repositories(self):
         query = query_repositories % (
             self.owner.username,
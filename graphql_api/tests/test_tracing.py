@@ -1,10 +1,22 @@
+import time
+from unittest.mock import patch
+
 import ddtrace
 import opentracing
+from ariadne import ObjectType, graphql, graphql_sync, make_executable_schema
 from ariadne.contrib.tracing.apollotracing import ApolloTracingExtension
 from ariadne.contrib.tracing.opentracing import OpenTracingExtension
 from django.test import TestCase, override_settings
 
-from ..tracing import MyTracer, get_tracer_extension
+from codecov.db import sync_to_async
+
+from ..tracing import (
+    Histogram,
+    MyTracer,
+    ResolverMetrics,
+    ResolverMetricsExtension,
+    get_tracer_extension,
+)
 
 
 class MyTracerTestCase(TestCase):
@@ -24,3 +36,111 @@ class MyTracerTestCase(TestCase):
         extension = get_tracer_extension()
         assert extension is OpenTracingExtension
         assert isinstance(opentracing.tracer, MyTracer)
+
+
+class HistogramTestCase(TestCase):
+    def test_percentile(self):
+        histogram = Histogram()
+        for ms in [0.5] * 90 + [30] * 9 + [2000]:
+            histogram.observe(ms)
+
+        assert histogram.count == 100
+        assert histogram.percentile(50) == 1
+        assert histogram.percentile(95) == 50
+        assert histogram.percentile(99) == 50
+        assert histogram.percentile(100) == 2000
+        assert histogram.max == 2000
+
+    def test_empty(self):
+        assert Histogram().percentile(99) == 0
+
+
+class ResolverMetricsTestCase(TestCase):
+    @patch("graphql_api.tracing.metrics")
+    def test_flush(self, metrics):
+        resolver_metrics = ResolverMetrics(flush_interval=60)
+        resolver_metrics.observe("Query", "owner", 20, 1)
+        resolver_metrics.observe("Query", "owner", 40, 3)
+
+        resolver_metrics.flush_if_due()
+        assert metrics.mock_calls == []
+
+        resolver_metrics.flush()
+        metrics.incr.assert_called_once_with("graphql.resolvers.Query.owner.count", 2)
+        metrics.gauge.assert_any_call("graphql.resolvers.Query.owner.wall.p50", 25)
+        metrics.gauge.assert_any_call("graphql.resolvers.Query.owner.wall.max", 40)
+        metrics.gauge.assert_any_call("graphql.resolvers.Query.owner.thread_hop.p99", 3)
+        assert resolver_metrics.histograms == {}
+
+
+class ResolverMetricsExtensionTestCase(TestCase):
+    def setUp(self):
+        query = ObjectType("Query")
+
+        @sync_to_async
+        def sleep():
+            time.sleep(0.01)
+            return "hello"
+
+        @query.field("hello")
+        async def resolve_hello(*_):
+            return await sleep()
+
+        @query.field("version")
+        def resolve_version(*_):
+            return "1.0"
+
+        self.schema = make_executable_schema(
+            "type Query { hello: String, name: String, version: String }", query
+        )
+
+    @patch("graphql_api.tracing.resolver_metrics")
+    async def test_resolver_metrics(self, resolver_metrics):
+        success, result = await graphql(
+            self.schema,
+            {"query": "{ hello name }"},
+            root_value={"name": "codecov"},
+            extensions=[ResolverMetricsExtension],
+        )
+        assert success
+        assert result == {"data": {"hello": "hello", "name": "codecov"}}
+
+        # default resolvers aren't measured
+        [observed] = resolver_metrics.observe.mock_calls
+        type_name, field_name, wall_ms, hops_ms = observed.args
+        assert (type_name, field_name) == ("Query", "hello")
+        assert wall_ms >= 10
+        assert 0 < hops_ms < wall_ms
+        resolver_metrics.flush_if_due.assert_called_once()
+
+    @patch("graphql_api.tracing.resolver_metrics")
+    def test_sync_resolvers_stay_sync(self, resolver_metrics):
+        success, result = graphql_sync(
+            self.schema,
+            {"query": "{ version }"},
+            extensions=[ResolverMetricsExtension],
+        )
+        assert success
+        assert result == {"data": {"version": "1.0"}}
+
+        [observed] = resolver_metrics.observe.mock_calls
+        type_name, field_name, _, hops_ms = observed.args
+        assert (type_name, field_name) == ("Query", "version")
+        assert hops_ms == 0
+
+    @override_settings(GRAPHQL_RESOLVER_TRACES_SAMPLE_RATE=1.0)
+    @patch("graphql_api.tracing.resolver_metrics")
+    async def test_sampled_trace(self, resolver_metrics):
+        with self.assertLogs("graphql_api.tracing", level="INFO") as logs:
+            await graphql(
+                self.schema,
+                {"query": "{ hello }"},
+                extensions=[ResolverMetricsExtension],
+            )
+
+        [trace] = logs.records[0].resolvers
+        assert trace["path"] == ["hello"]
+        assert trace["type"] == "Query"
+        assert trace["field"] == "hello"
+        assert trace["wall_ms"] >= 10
+        assert trace["thread_hops"] == 1
@@ -1,11 +1,15 @@
 import json
+from unittest.mock import patch
 
+import fakeredis
 from ariadne import ObjectType, make_executable_schema
 from django.test import RequestFactory, TestCase, override_settings
 from django.urls import ResolverMatch
 
 from codecov.commands.exceptions import Unauthorized
+from services.cache import LocalLRUCache, TwoTierCache
 
+from ..execution import parse_query, query_hash
 from ..views import AsyncGraphqlView
 from .helper import GraphQLTestHelper
 
@@ -25,11 +29,29 @@ def generate_schema_that_raise_with(exception):
     return make_executable_schema(types, query_bindable)
 
 
+def generate_schema_that_says_hello():
+    types = """
+    type Query {
+        hello: String
+    }
+    """
+    query_bindable = ObjectType("Query")
+
+    @query_bindable.field("hello")
+    def hello_bindable(*_):
+        return "world"
+
+    return make_executable_schema(types, query_bindable)
+
+
 class ArianeViewTestCase(GraphQLTestHelper, TestCase):
     async def do_query(self, schema, query="{ failing }"):
+        return await self.do_request(schema, {"query": query})
+
+    async def do_request(self, schema, data):
         view = AsyncGraphqlView.as_view(schema=schema)
         request = RequestFactory().post(
-            "/graphql/gh", {"query": query}, content_type="application/json"
+            "/graphql/gh", data, content_type="application/json"
         )
         match = ResolverMatch(func=lambda: None, args=(), kwargs={"service": "github"})
 
@@ -39,6 +61,24 @@ class ArianeViewTestCase(GraphQLTestHelper, TestCase):
         res = await view(request, service="gh")
         return json.loads(res.content)
 
+    async def test_only_json_and_multipart_bodies_are_accepted(self):
+        view = AsyncGraphqlView.as_view(schema=generate_schema_that_says_hello())
+        for content_type in ("text/plain", "application/x-www-form-urlencoded"):
+            request = RequestFactory().post(
+                "/graphql/gh", '{"query": "{ hello }"}', content_type=content_type
+            )
+            request.user = None
+            res = await view(request, service="gh")
+            assert res.status_code == 400
+
+        request = RequestFactory().post(
+            "/graphql/gh", "{", content_type="application/json"
+        )
+        request.user = None
+        res = await view(request, service="gh")
+        assert res.status_code == 400
+        assert res.content == b"Request body is not a valid JSON"
+
     @override_settings(DEBUG=True)
     async def test_when_debug_is_true(self):
         schema = generate_schema_that_raise_with(Exception("hello"))
@@ -74,3 +114,101 @@ class ArianeViewTestCase(GraphQLTestHelper, TestCase):
             data["errors"][0]["message"]
             == "Cannot query field 'fieldThatDoesntExist' on type 'Query'."
         )
+
+    @override_settings(GRAPHQL_DOCUMENT_CACHE_ENABLED=True)
+    @patch(
+        "graphql_api.execution.document_cache",
+        LocalLRUCache(max_bytes=1024, sizeof=lambda cached: cached.size),
+    )
+    @patch("graphql_api.execution.parse_query", wraps=parse_query)
+    async def test_documents_are_parsed_once(self, parse_query_mock):
+        schema = generate_schema_that_says_hello()
+        for _ in range(2):
+            data = await self.do_query(schema, "{ hello }")
+            assert data == {"data": {"hello": "world"}}
+        assert parse_query_mock.call_count == 1
+
+        # a document is validated against each schema
+        await self.do_query(generate_schema_that_says_hello(), "{ hello }")
+        assert parse_query_mock.call_count == 2
+
+    @override_settings(GRAPHQL_DOCUMENT_CACHE_ENABLED=True)
+    @patch(
+        "graphql_api.execution.document_cache",
+        LocalLRUCache(max_bytes=1024, sizeof=lambda cached: cached.size),
+    )
+    @patch("graphql_api.execution.parse_query", wraps=parse_query)
+    async def test_invalid_documents_are_not_cached(self, parse_query_mock):
+        schema = generate_schema_that_says_hello()
+        for _ in range(2):
+            data = await self.do_query(schema, "{ fieldThatDoesntExist }")
+            assert data["errors"] is not None
+        assert parse_query_mock.call_count == 2
+
+    async def test_persisted_queries_not_supported(self):
+        data = await self.do_request(
+            generate_schema_that_says_hello(),
+            {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "abc"}}},
+        )
+        assert data["errors"][0]["message"] == "PersistedQueryNotSupported"
+
+    @override_settings(GRAPHQL_PERSISTED_QUERIES_ENABLED=True)
+    async def test_persisted_queries(self):
+        schema = generate_schema_that_says_hello()
+        query = "{ hello }"
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+        cache = TwoTierCache(
+            name="graphql_persisted_query",
+            local_max_bytes=1024,
+            redis_ttl=60,
+            redis_max_bytes=1024,
+            redis_connection=fakeredis.FakeStrictRedis(),
+        )
+
+        with patch("graphql_api.execution.persisted_queries", cache):
+            data = await self.do_request(schema, {"extensions": extensions})
+            assert data["errors"][0]["message"] == "PersistedQueryNotFound"
+            assert data["errors"][0]["type"] == "PersistedQueryNotFound"
+
+            data = await self.do_request(
+                schema, {"query": query, "extensions": extensions}
+            )
+            assert data == {"data": {"hello": "world"}}
+
+            data = await self.do_request(schema, {"extensions": extensions})
+            assert data == {"data": {"hello": "world"}}
+
+    @override_settings(GRAPHQL_PERSISTED_QUERIES_ENABLED=True)
+    async def test_persisted_query_hash_mismatch(self):
+        data = await self.do_request(
+            generate_schema_that_says_hello(),
+            {
+                "query": "{ hello }",
+                "extensions": {"persistedQuery": {"version": 1, "sha256Hash": "abc"}},
+            },
+        )
+        assert data["errors"][0]["message"] == "provided sha does not match query"
+
+    @override_settings(DEBUG=False, GRAPHQL_QUERY_MAX_COST=0)
+    async def test_query_too_expensive(self):
+        schema = generate_schema_that_says_hello()
+        data = await self.do_query(schema, "{ hello }")
+        assert data == {"data": {"hello": "world"}}
+
+        with override_settings(GRAPHQL_QUERY_COST_WEIGHTS={"hello": 10}):
+            data = await self.do_query(schema, "{ hello }")
+        assert data["errors"][0]["message"] == (
+            "Query cost of 10 exceeds the maximum of 0, request fewer items or fields"
+        )
+        assert data["errors"][0]["type"] == "QueryTooExpensive"
+
+    @patch("graphql_api.views.metrics")
+    async def test_thread_hops_metrics(self, metrics):
+        schema = generate_schema_that_says_hello()
+        data = await self.do_query(schema, "{ hello }")
+        assert data == {"data": {"hello": "world"}}
+
+        timings = {call.args[0]: call.args[1] for call in metrics.timing.mock_calls}
+        # fetching the user
+        assert timings["graphql.request.thread_hops"] == 1
+        assert timings["graphql.request.thread_hop_time"] > 0
@@ -1,10 +1,28 @@
+import logging
+import math
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from inspect import isawaitable
+from typing import Any
+
 import ddtrace
 import opentracing
 from ariadne.contrib.tracing.apollotracing import ApolloTracingExtension
 from ariadne.contrib.tracing.opentracing import OpenTracingExtension
+from ariadne.contrib.tracing.utils import format_path, should_trace
+from ariadne.types import ContextValue, Extension, Resolver
 from ddtrace.opentracer import Tracer
 from django.conf import settings
+from graphql import GraphQLResolveInfo
 from opentracing.scope_managers import ThreadLocalScopeManager
+from shared.metrics import metrics
+
+from codecov.db import ThreadHops, thread_hops
+
+log = logging.getLogger(__name__)
 
 
 class MyTracer(Tracer):
@@ -24,3 +42,165 @@ def get_tracer_extension():
     # setting it be as a singleton so the OpenTracingExtension can use it
     opentracing.tracer = tracer
     return OpenTracingExtension
+
+
+# upper bounds of the buckets of `Histogram`, in milliseconds
+HISTOGRAM_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """
+    Counts of observed durations (in milliseconds) by bucket of `HISTOGRAM_BUCKETS`.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(HISTOGRAM_BUCKETS, ms)] += 1
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Upper bound of the bucket of the given percentile (or the maximum
+        observed duration if it's lower).
+        """
+        rank = max(math.ceil(self.count * percent / 100), 1)
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class ResolverMetrics:
+    """
+    In-process histograms of the wall time and `sync_to_async` thread hops of
+    resolvers, by type and field.  They're sent to statsd (under
+    `graphql.resolvers`) and reset by `flush_if_due`, which is called at the end
+    of every request so they're flushed at most every `flush_interval` seconds.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        # (wall time, thread hops) by (type, field)
+        self.histograms = defaultdict(lambda: (Histogram(), Histogram()))
+        self.last_flush = time.monotonic()
+        # requests can be served by several threads (each with its event loop)
+        self.lock = threading.Lock()
+
+    def observe(self, type_name: str, field_name: str, wall_ms: float, hops_ms: float):
+        with self.lock:
+            wall, hops = self.histograms[(type_name, field_name)]
+            wall.observe(wall_ms)
+            hops.observe(hops_ms)
+
+    def flush_if_due(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            histograms = self.histograms
+            self.histograms = defaultdict(lambda: (Histogram(), Histogram()))
+            self.last_flush = time.monotonic()
+
+        for (type_name, field_name), (wall, hops) in histograms.items():
+            prefix = f"graphql.resolvers.{type_name}.{field_name}"
+            metrics.incr(f"{prefix}.count", wall.count)
+            for name, histogram in (("wall", wall), ("thread_hop", hops)):
+                for percent in (50, 95, 99):
+                    metrics.gauge(
+                        f"{prefix}.{name}.p{percent}", histogram.percentile(percent)
+                    )
+                metrics.gauge(f"{prefix}.{name}.max", histogram.max)
+
+
+resolver_metrics = ResolverMetrics(
+    flush_interval=settings.GRAPHQL_RESOLVER_METRICS_FLUSH_INTERVAL
+)
+
+
+class ResolverMetricsExtension(Extension):
+    """
+    Lightweight alternative to the tracing extensions, which records the latency
+    of every (non-default) resolver in `resolver_metrics`.
+
+    A `GRAPHQL_RESOLVER_TRACES_SAMPLE_RATE` fraction of the requests also logs
+    the timings of each of its resolvers.
+    """
+
+    def __init__(self):
+        self.start = 0.0
+        self.trace = None
+
+    def request_started(self, context: ContextValue):
+        self.start = time.perf_counter()
+        if random.random() < settings.GRAPHQL_RESOLVER_TRACES_SAMPLE_RATE:
+            self.trace = []
+
+    def resolve(self, next_: Resolver, obj: Any, info: GraphQLResolveInfo, **kwargs):
+        # only async resolvers are awaited, so that sync ones stay sync
+        if not should_trace(info):
+            return next_(obj, info, **kwargs)
+
+        hops = ThreadHops(parent=thread_hops.get())
+        start = time.perf_counter()
+        token = thread_hops.set(hops)
+        try:
+            result = next_(obj, info, **kwargs)
+        except Exception:
+            self.observe(info, start, hops)
+            raise
+        finally:
+            thread_hops.reset(token)
+
+        if isawaitable(result):
+            return self.resolve_async(result, info, start, hops)
+        self.observe(info, start, hops)
+        return result
+
+    async def resolve_async(
+        self, result: Any, info: GraphQLResolveInfo, start: float, hops: ThreadHops
+    ):
+        # the hops of the resolver happen while it's awaited
+        token = thread_hops.set(hops)
+        try:
+            return await result
+        finally:
+            thread_hops.reset(token)
+            self.observe(info, start, hops)
+
+    def observe(self, info: GraphQLResolveInfo, start: float, hops: ThreadHops):
+        wall_ms = (time.perf_counter() - start) * 1000
+        hops_ms = hops.seconds * 1000
+        resolver_metrics.observe(
+            info.parent_type.name, info.field_name, wall_ms, hops_ms
+        )
+        if self.trace is not None:
+            self.trace.append(
+                {
+                    "path": format_path(info.path),
+                    "type": info.parent_type.name,
+                    "field": info.field_name,
+                    "start_ms": (start - self.start) * 1000,
+                    "wall_ms": wall_ms,
+                    "thread_hop_ms": hops_ms,
+                    "thread_hops": hops.count,
+                }
+            )
+
+    def request_finished(self, context: ContextValue):
+        if self.trace is not None:
+            log.info(
+                "GraphQL resolvers trace",
+                extra=dict(
+                    duration_ms=(time.perf_counter() - self.start) * 1000,
+                    resolvers=self.trace,
+                ),
+            )
+        resolver_metrics.flush_if_due()
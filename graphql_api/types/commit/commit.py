@@ -14,6 +14,7 @@ from graphql_api.actions.path_contents import sort_path_contents
 from graphql_api.dataloader.commit import CommitLoader
 from graphql_api.dataloader.comparison import ComparisonLoader
 from graphql_api.dataloader.owner import OwnerLoader
+from graphql_api.dataloader.report import ReportLoader
 from graphql_api.helpers.connection import (
     queryset_to_connection,
     queryset_to_connection_sync,
@@ -26,7 +27,6 @@ from services.comparison import Comparison, ComparisonReport
 from services.components import Component
 from services.path import ReportPaths
 from services.profiling import CriticalFile, ProfilingSummary
-from services.report import ReadOnlyReport
 from services.yaml import YamlStates, get_yaml_state
 
 commit_bindable = ObjectType("Commit")
@@ -39,7 +39,10 @@ commit_bindable.set_alias("branchName", "branch")
 @commit_bindable.field("coverageFile")
 @sync_to_async
 def resolve_file(commit, info, path, flags=None):
-    commit_report = commit.full_report.filter(flags=flags)
+    # only fetch the chunks for the requested file
+    commit_report = report_service.build_report_from_commit(
+        commit, paths=[path]
+    ).filter(flags=flags)
     file_report = commit_report.get(path)
 
     return {
@@ -130,9 +133,9 @@ async def resolve_compare_with_parent(commit: Commit, info, **kwargs):
 
 
 @commit_bindable.field("flagNames")
-@sync_to_async
-def resolve_flags(commit, info, **kwargs):
-    return commit.full_report.flags.keys()
+async def resolve_flags(commit, info, **kwargs):
+    report = await ReportLoader.loader(info).load_report(commit)
+    return report.flags.keys()
 
 
 @commit_bindable.field("criticalFiles")
@@ -144,29 +147,33 @@ def resolve_critical_files(commit: Commit, info, **kwargs) -> List[CriticalFile]
     The results of this resolver could be different than that of the
     `repository.criticalFiles` resolver.
     """
-    profiling_summary = ProfilingSummary(commit.repository, commit_sha=commit.commitid)
+    profiling_summary = ProfilingSummary(
+        commit.repository, commit_sha=commit.commitid, commit=commit
+    )
     return profiling_summary.critical_files
 
 
 @commit_bindable.field("pathContents")
 @convert_kwargs_to_snake_case
-@sync_to_async
-def resolve_path_contents(commit: Commit, info, path: str = None, filters=None):
+async def resolve_path_contents(commit: Commit, info, path: str = None, filters=None):
     """
     The file directory tree is a list of all the files and directories
     extracted from the commit report of the latest, head commit.
     The is resolver results in a list that represent the tree with files
     and nested directories.
     """
-    current_owner = info.context["request"].current_owner
-
     # TODO: Might need to add reports here filtered by flags in the future
-    commit_report = report_service.build_report_from_commit(
-        commit, report_class=ReadOnlyReport
-    )
+    commit_report = await ReportLoader.loader(info).load_report(commit)
     if not commit_report:
         return MissingHeadReport()
 
+    return await path_contents(commit, info, commit_report, path, filters)
+
+
+@sync_to_async
+def path_contents(commit: Commit, info, commit_report, path: str, filters):
+    current_owner = info.context["request"].current_owner
+
     if filters is None:
         filters = {}
     search_value = filters.get("search_value")
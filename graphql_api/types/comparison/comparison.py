@@ -41,6 +41,16 @@ def resolve_impacted_files(
     return command.fetch_impacted_files(comparison, filters)
 
 
+@comparison_bindable.field("impactedFilesConnection")
+@convert_kwargs_to_snake_case
+@sync_to_async
+def resolve_impacted_files_connection(
+    comparison: ComparisonReport, info, filters=None, **kwargs
+):
+    command = info.context["executor"].get_command("compare")
+    return command.paginate_impacted_files(comparison, filters, **kwargs)
+
+
 @comparison_bindable.field("impactedFilesCount")
 @sync_to_async
 def resolve_impacted_files_count(comparison: ComparisonReport, info):
@@ -9,7 +9,7 @@ from graphql_api.actions.owner import (
     get_user_tokens,
     search_my_owners,
 )
-from graphql_api.actions.repository import search_repos
+from graphql_api.actions.repository import repository_annotations, search_repos
 from graphql_api.helpers.ariadne import ariadne_load_local_graphql
 from graphql_api.helpers.connection import (
     build_connection_graphql,
@@ -42,13 +42,15 @@ def resolve_owner(user, _):
 @convert_kwargs_to_snake_case
 def resolve_viewable_repositories(
     current_user,
-    _,
+    info,
     filters=None,
     ordering=RepositoryOrdering.ID,
     ordering_direction=OrderingDirection.ASC,
     **kwargs,
 ):
-    queryset = search_repos(current_user, filters)
+    queryset = search_repos(
+        current_user, filters, **repository_annotations(info, ordering)
+    )
     return queryset_to_connection(
         queryset,
         ordering=(ordering, RepositoryOrdering.ID),
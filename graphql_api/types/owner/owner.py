@@ -11,7 +11,10 @@ from codecov.db import sync_to_async
 from codecov_auth.helpers import current_user_part_of_org
 from codecov_auth.models import Owner
 from core.models import Repository
-from graphql_api.actions.repository import list_repository_for_owner
+from graphql_api.actions.repository import (
+    list_repository_for_owner,
+    repository_annotations,
+)
 from graphql_api.helpers.ariadne import ariadne_load_local_graphql
 from graphql_api.helpers.connection import (
     build_connection_graphql,
@@ -41,7 +44,9 @@ def resolve_repositories(
     **kwargs
 ):
     current_owner = info.context["request"].current_owner
-    queryset = list_repository_for_owner(current_owner, owner, filters)
+    queryset = list_repository_for_owner(
+        current_owner, owner, filters, **repository_annotations(info, ordering)
+    )
     return queryset_to_connection(
         queryset,
         ordering=(ordering, RepositoryOrdering.ID),
@@ -1,20 +1,23 @@
-import json
 import logging
 import socket
 from asyncio import iscoroutine
 
 from ariadne import format_error
+from ariadne.exceptions import HttpBadRequestError
 from ariadne_django.views import GraphQLAsyncView
 from django.conf import settings
-from django.http import HttpResponseNotAllowed
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
 from sentry_sdk import capture_exception
+from shared.metrics import metrics
 
 from codecov.commands.exceptions import BaseException
 from codecov.commands.executor import get_executor_from_request
-from codecov.db import sync_to_async
+from codecov.db import ThreadHops, sync_to_async, thread_hops
 from services import ServiceException
 
+from .execution import graphql
 from .schema import schema
+from .tracing import ResolverMetricsExtension
 
 log = logging.getLogger(__name__)
 
@@ -30,26 +33,49 @@ class AsyncGraphqlView(GraphQLAsyncView):
         return HttpResponseNotAllowed(["POST"])
 
     async def post(self, request, *args, **kwargs):
+        hops = ThreadHops()
+        token = thread_hops.set(hops)
+        try:
+            return await self._post(request, *args, **kwargs)
+        finally:
+            thread_hops.reset(token)
+            metrics.timing("graphql.request.thread_hops", hops.count)
+            metrics.timing("graphql.request.thread_hop_time", hops.seconds * 1000)
+
+    async def _post(self, request, *args, **kwargs):
         await self._get_user(request)
 
-        # get request body information
-        req_body = json.loads(request.body.decode("utf-8")) if request.body else {}
+        # get request body information (only JSON and multipart bodies are accepted)
+        try:
+            req_body = self.extract_data_from_request(request)
+        except HttpBadRequestError as error:
+            return HttpResponseBadRequest(error.message)
 
         # clean up graphql query to remove new lines and extra spaces
-        req_body["query"] = req_body["query"].replace("\n", " ")
-        req_body["query"] = req_body["query"].replace("  ", "").strip()
+        log_body = req_body
+        if isinstance(req_body, dict) and isinstance(req_body.get("query"), str):
+            query = req_body["query"].replace("\n", " ")
+            log_body = {**req_body, "query": query.replace("  ", "").strip()}
 
         # put everything together for log
         log_data = {
             "server_hostname": socket.gethostname(),
             "request_method": request.method,
             "request_path": request.get_full_path(),
-            "request_body": req_body,
+            "request_body": log_body,
         }
         log.info("GraphQL Request", extra=log_data)
 
         # request.user = await get_user(request) or AnonymousUser()
-        return await super().post(request, *args, **kwargs)
+        success, result = await graphql(
+            self.schema, req_body, **self.get_kwargs_graphql(request)
+        )
+        return JsonResponse(result, status=200 if success else 400)
+
+    def get_extensions_for_request(self, request, context):
+        if settings.GRAPHQL_RESOLVER_METRICS_ENABLED:
+            return [*self.extensions, ResolverMetricsExtension]
+        return self.extensions
 
     def context_value(self, request):
         return {
@@ -1,10 +1,16 @@
 #!/bin/sh
 
 # Starts the production gunicorn server (no --reload)
+# Set SERVER_MODE=asgi to serve codecov.asgi with uvicorn workers instead
 echo "Starting gunicorn in production mode"
 prefix=""
 if [ -f "/usr/local/bin/berglas" ]; then
   prefix="berglas exec --"
 fi
+application="codecov.wsgi:application"
+if [ "$SERVER_MODE" = "asgi" ]; then
+  echo "Serving ASGI application"
+  application="codecov.asgi:application --worker-class uvicorn.workers.UvicornWorker"
+fi
 
-$prefix gunicorn codecov.wsgi:application --workers=2 --bind 0.0.0.0:8000 --access-logfile '-' --statsd-host ${STATSD_HOST}:${STATSD_PORT} --timeout "${GUNICORN_TIMEOUT:-600}"
+$prefix gunicorn $application --workers=2 --bind 0.0.0.0:8000 --access-logfile '-' --statsd-host ${STATSD_HOST}:${STATSD_PORT} --timeout "${GUNICORN_TIMEOUT:-600}"
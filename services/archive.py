@@ -1,13 +1,19 @@
+import gzip
 import json
 import logging
+import threading
 from base64 import b16encode
+from contextvars import ContextVar
 from enum import Enum
 from hashlib import md5
+from typing import List, Optional
 from uuid import uuid4
 
+import zstandard
 from django.conf import settings
 from django.utils import timezone
 from minio import Minio
+from shared.storage.exceptions import FileNotInStorageError
 from shared.utils.ReportEncoder import ReportEncoder
 
 from services.storage import StorageService
@@ -15,9 +21,13 @@ from utils.config import get_config
 
 log = logging.getLogger(__name__)
 
+END_OF_CHUNK = "\n<<<<< end_of_chunk >>>>>\n"
+END_OF_HEADER = "\n<<<<< end_of_header >>>>>\n"
+
 
 class MinioEndpoints(Enum):
     chunks = "{version}/repos/{repo_hash}/commits/{commitid}/chunks.txt"
+    chunks_index = "{version}/repos/{repo_hash}/commits/{commitid}/chunks_index.json"
     json_data = "{version}/repos/{repo_hash}/commits/{commitid}/json_data/{table}/{field}/{external_id}.json"
     json_data_no_commit = (
         "{version}/repos/{repo_hash}/json_data/{table}/{field}/{external_id}.json"
@@ -37,6 +47,90 @@ class MinioEndpoints(Enum):
         return self.value.format(**kwaargs)
 
 
+class ArchiveReadCounter:
+    """
+    Counts the archive reads (and bytes read) performed while handling a request.
+    See `codecov.middleware.ArchiveReadCountMiddleware`.
+    """
+
+    def __init__(self):
+        self.reads = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, size: int):
+        with self._lock:
+            self.reads += 1
+            self.bytes += size
+
+
+_archive_read_counter: ContextVar[Optional[ArchiveReadCounter]] = ContextVar(
+    "archive_read_counter", default=None
+)
+
+
+def start_archive_read_counter() -> ArchiveReadCounter:
+    counter = ArchiveReadCounter()
+    _archive_read_counter.set(counter)
+    return counter
+
+
+def record_archive_read(size: int):
+    counter = _archive_read_counter.get()
+    if counter is not None:
+        counter.record(size)
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def is_compressed(data: bytes) -> bool:
+    return data[:2] == GZIP_MAGIC or data[:4] == ZSTD_MAGIC
+
+
+def decompress(data: bytes) -> bytes:
+    """
+    Decompresses gzip and zstd payloads (detected by their magic bytes).
+    Anything else is returned as is.
+    """
+    if data[:2] == GZIP_MAGIC:
+        return gzip.decompress(data)
+    if data[:4] == ZSTD_MAGIC:
+        # `decompressobj` also handles frames written without a content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def build_chunks_index(data: bytes, etag: str) -> dict:
+    """
+    Builds the byte offsets of the header and of each chunk in a chunks file.
+    The position of a chunk in `chunks` is the `file_index` of the corresponding
+    file in the report. The `etag` is the one of the indexed chunks file and is
+    used to detect stale indexes.
+    """
+    end_of_chunk = END_OF_CHUNK.encode()
+    end_of_header = END_OF_HEADER.encode()
+
+    header = None
+    start = 0
+    header_end = data.find(end_of_header)
+    if header_end != -1:
+        header = [0, header_end]
+        start = header_end + len(end_of_header)
+
+    chunks = []
+    while True:
+        end = data.find(end_of_chunk, start)
+        if end == -1:
+            chunks.append([start, len(data)])
+            break
+        chunks.append([start, end])
+        start = end + len(end_of_chunk)
+
+    return {"etag": etag, "header": header, "chunks": chunks}
+
+
 def get_minio_client():
     return Minio(
         settings.MINIO_LOCATION,
@@ -212,9 +306,15 @@ class ArchiveService(object):
     Generic method to read a file from the archive
     """
 
-    def read_file(self, path):
+    def read_file(self, path) -> bytes:
+        """
+        Returns the raw (decompressed) bytes of the file so that callers can
+        pass them straight to `json.loads` without an intermediate `str` copy.
+        Use `.decode()` if a `str` is really needed.
+        """
         contents = self.storage.read_file(self.root, path)
-        return contents.decode()
+        record_archive_read(len(contents))
+        return decompress(contents)
 
     """
     Generic method to delete a file from the archive.
@@ -242,7 +342,96 @@ class ArchiveService(object):
             version="v4", repo_hash=self.storage_hash, commitid=commit_sha
         )
         log.info("Downloading chunks from path %s for commit %s", path, commit_sha)
-        return self.read_file(path)
+        # the report parser in `shared` only works on `str`
+        return self.read_file(path).decode()
+
+    """
+    Convenience method to read the chunks of only some files from the archive.
+    Uses the sidecar chunks index to fetch the requested byte ranges; the index
+    is built (and written next to the chunks) on first use.
+
+    Returns a chunks string with the header and the chunks for `file_indexes`,
+    in that order.
+    """
+
+    def read_chunks_for_files(self, commit_sha, file_indexes: List[int]) -> str:
+        path = MinioEndpoints.chunks.get_path(
+            version="v4", repo_hash=self.storage_hash, commitid=commit_sha
+        )
+        stat = self.storage.get_file_stat(self.root, path)
+
+        index = None
+        if not stat.metadata.get("Content-Encoding"):
+            index = self.read_chunks_index(commit_sha)
+
+        if index is not None and index["etag"] == stat.etag:
+
+            def read_range(start, end):
+                contents = self.storage.read_file_range(
+                    self.root, path, start, end - start
+                )
+                record_archive_read(len(contents))
+                return contents
+
+        else:
+            log.info("Downloading chunks from path %s for commit %s", path, commit_sha)
+            data = self.storage.read_file(self.root, path)
+            record_archive_read(len(data))
+            # byte ranges can't be used on compressed objects
+            indexable = not stat.metadata.get("Content-Encoding") and not is_compressed(
+                data
+            )
+            data = decompress(data)
+            index = build_chunks_index(data, stat.etag)
+            if indexable:
+                self.write_chunks_index(commit_sha, index)
+
+            def read_range(start, end):
+                return data[start:end]
+
+        chunks = []
+        for file_index in file_indexes:
+            if file_index < len(index["chunks"]):
+                chunks.append(read_range(*index["chunks"][file_index]).decode())
+            else:
+                chunks.append("")
+
+        contents = END_OF_CHUNK.join(chunks)
+        if index["header"] is not None:
+            header = read_range(*index["header"]).decode()
+            contents = header + END_OF_HEADER + contents
+        return contents
+
+    """
+    Reads the sidecar chunks index, returns None if there is none yet.
+    """
+
+    def read_chunks_index(self, commit_sha) -> Optional[dict]:
+        path = MinioEndpoints.chunks_index.get_path(
+            version="v4", repo_hash=self.storage_hash, commitid=commit_sha
+        )
+        try:
+            return json.loads(self.read_file(path))
+        except FileNotInStorageError:
+            return None
+
+    """
+    Writes the sidecar chunks index. This is a best-effort optimization so
+    failures are logged and ignored.
+    """
+
+    def write_chunks_index(self, commit_sha, index: dict):
+        path = MinioEndpoints.chunks_index.get_path(
+            version="v4", repo_hash=self.storage_hash, commitid=commit_sha
+        )
+        try:
+            self.write_file(path, json.dumps(index))
+        except Exception:
+            log.warning(
+                "Failed to write chunks index",
+                extra=dict(commit=commit_sha, path=path),
+                exc_info=True,
+            )
 
     """
     Delete a chunk file from the archive
@@ -253,6 +442,11 @@ class ArchiveService(object):
 
         self.delete_file(path)
 
+        index_path = MinioEndpoints.chunks_index.get_path(
+            version="v4", repo_hash=self.storage_hash, commitid=commit_sha
+        )
+        self.delete_file(index_path)
+
     def create_presigned_put(self, path):
         return self.storage.create_presigned_put(self.root, path, self.ttl)
 
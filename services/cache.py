@@ -0,0 +1,236 @@
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+from shared.metrics import metrics
+
+from services.redis_configuration import get_redis_connection
+
+log = logging.getLogger(__name__)
+
+
+class LocalLRUCache:
+    """
+    A thread-safe, in-process LRU cache of `bytes` values bounded by the
+    total size of the values it holds (rather than by number of entries).
+
+    Other values can be cached by passing a `sizeof` function that estimates
+    their size in bytes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        on_evict: Optional[Callable] = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.on_evict = on_evict
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            # would evict everything else and still not fit
+            return
+
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= self.sizeof(previous)
+            self._entries[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted_value = self._entries.popitem(last=False)
+                self.current_bytes -= self.sizeof(evicted_value)
+                evicted += 1
+
+        if evicted and self.on_evict:
+            self.on_evict(evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self.current_bytes -= self.sizeof(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single call: the first
+    caller runs the function and every caller that arrives while it's in flight
+    waits for (and shares) its result or exception.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class TwoTierCache:
+    """
+    Cache of serialized `bytes` values with an in-process LRU tier in front
+    of a shared Redis tier. Values are stored zlib-compressed in Redis and
+    uncompressed in the local tier.
+
+    Redis errors are logged and treated as cache misses - the cache should
+    never be the reason a request fails.
+
+    Hits, misses and evictions are sent to statsd under `services.cache.<name>`
+    and are also kept in `self.stats` for the lifetime of the process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        local_max_bytes: int,
+        redis_ttl: int,
+        redis_max_bytes: int,
+        redis_enabled: bool = True,
+        redis_connection: Optional[Redis] = None,
+    ):
+        self.name = name
+        self.redis_ttl = redis_ttl
+        self.redis_max_bytes = redis_max_bytes
+        self.redis_enabled = redis_enabled
+        self._redis = redis_connection
+        self.local = LocalLRUCache(local_max_bytes, on_evict=self._record_evictions)
+        self.single_flight = SingleFlight()
+        self.stats = {
+            "local.hit": 0,
+            "redis.hit": 0,
+            "miss": 0,
+            "eviction": 0,
+        }
+
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache/{self.name}/{key}"
+
+    def _incr(self, stat: str, count: int = 1):
+        self.stats[stat] += count
+        metrics.incr(f"services.cache.{self.name}.{stat}", count)
+
+    def _record_evictions(self, count: int):
+        self._incr("eviction", count)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is not None:
+            self._incr("local.hit")
+            return value
+
+        if self.redis_enabled:
+            try:
+                compressed = self.redis.get(self._redis_key(key))
+            except RedisError:
+                log.warning(
+                    "Error reading from cache",
+                    extra=dict(cache=self.name, key=key),
+                    exc_info=True,
+                )
+                compressed = None
+            if compressed is not None:
+                value = zlib.decompress(compressed)
+                self.local.set(key, value)
+                self._incr("redis.hit")
+                return value
+
+        self._incr("miss")
+        return None
+
+    def set(self, key: str, value: bytes):
+        self.local.set(key, value)
+
+        if self.redis_enabled:
+            compressed = zlib.compress(value)
+            if len(compressed) > self.redis_max_bytes:
+                return
+            try:
+                self.redis.set(self._redis_key(key), compressed, ex=self.redis_ttl)
+            except RedisError:
+                log.warning(
+                    "Error writing to cache",
+                    extra=dict(cache=self.name, key=key),
+                    exc_info=True,
+                )
+
+    def get_or_set(self, key: str, compute: Callable[[], bytes]) -> bytes:
+        """
+        Returns the cached value for `key`, computing and caching it on a miss.
+        Concurrent misses for the same key in this process share one `compute()`.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def compute_and_set() -> bytes:
+            # another caller may have just finished computing it
+            value = self.local.get(key)
+            if value is None:
+                value = compute()
+                self.set(key, value)
+            return value
+
+        return self.single_flight.do(key, compute_and_set)
@@ -0,0 +1,310 @@
+import json
+from array import array
+from collections import Counter
+from typing import Iterable, Iterator, Optional
+
+from shared.reports.resources import ReportLine
+from shared.reports.types import ReportTotals
+from shared.utils.merge import LineType, line_type
+
+COVERAGE_TYPES = (LineType.hit, LineType.miss, LineType.partial)
+
+
+def line_numbers_to_mask(line_numbers: Iterable[int]) -> int:
+    """
+    Bitmap with bit `n` set for every line number `n`.
+    """
+    line_numbers = list(line_numbers)
+    if not line_numbers:
+        return 0
+    bitmap = bytearray(max(line_numbers) // 8 + 1)
+    for ln in line_numbers:
+        bitmap[ln >> 3] |= 1 << (ln & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+def popcount(mask: int) -> int:
+    """
+    Number of bits set in `mask` (`int.bit_count` requires python 3.10).
+    """
+    return bin(mask).count("1")
+
+
+def mask_to_line_numbers(mask: int) -> array:
+    """
+    Sorted line numbers of the bits set in `mask`.
+    """
+    bits = bin(mask)[:1:-1]
+    return array("I", [ln for ln, bit in enumerate(bits) if bit == "1"])
+
+
+def coverage_ratio(hits: int, lines: int) -> str:
+    if hits == lines:
+        return "100"
+    if hits == 0 or lines == 0:
+        return "0"
+    return "%.5f" % round(100 * hits / lines, 5)
+
+
+def raw_lines(report_file) -> Iterator[tuple]:
+    """
+    Yields `(line number, coverage, [(session id, coverage), ...])` for every line
+    of `report_file` without instantiating `ReportLine`s for lines still in their
+    serialized form (same idea as `FileComparisonVisitor._get_line`).
+    """
+    lines = getattr(report_file, "_lines", None)
+    if lines is None:
+        for ln, line in report_file.lines:
+            sessions = [(session.id, session.coverage) for session in line.sessions]
+            yield ln, line.coverage, sessions
+        return
+
+    for index, line in enumerate(lines):
+        if not line:
+            continue
+        if isinstance(line, ReportLine):
+            sessions = [
+                (session.id, session.coverage) for session in line.sessions or []
+            ]
+            yield index + 1, line.coverage, sessions
+            continue
+        if type(line) is not list:
+            line = json.loads(line)
+        sessions = line[2] if len(line) > 2 and line[2] else []
+        yield index + 1, line[0], [(session[0], session[1]) for session in sessions]
+
+
+def line_coverages(report_file) -> Iterator[tuple]:
+    """
+    Yields `(line number, coverage)` for every line of `report_file` - a cheaper
+    `raw_lines` for when the sessions aren't needed.
+    """
+    lines = getattr(report_file, "_lines", None)
+    if lines is None:
+        for ln, line in report_file.lines:
+            yield ln, line.coverage
+        return
+
+    for index, line in enumerate(lines):
+        if not line:
+            continue
+        if type(line) is list:
+            yield index + 1, line[0]
+        elif isinstance(line, ReportLine):
+            yield index + 1, line.coverage
+        else:
+            yield index + 1, json.loads(line)[0]
+
+
+def line_type_masks(report_file) -> dict[LineType, int]:
+    """
+    Bitmaps of the lines of `report_file` by their `LineType` (lines without a
+    line type are left out).  `{}` when there's no file.
+    """
+    if report_file is None:
+        return {}
+    line_numbers, coverage_types = {}, {}
+    for ln, coverage in line_coverages(report_file):
+        # there are only a few distinct coverages (e.g. 0, 1 and "1/2")
+        key = (type(coverage), coverage)
+        coverage_type = coverage_types.get(key, False)
+        if coverage_type is False:
+            coverage_type = coverage_types[key] = line_type(coverage)
+        if coverage_type is not None:
+            line_numbers.setdefault(coverage_type, []).append(ln)
+    return {
+        coverage_type: line_numbers_to_mask(lns)
+        for coverage_type, lns in line_numbers.items()
+    }
+
+
+def shift_mask(mask: int, offset: int) -> int:
+    """
+    Moves every line of `mask` by `offset` lines.
+    """
+    return mask << offset if offset >= 0 else mask >> -offset
+
+
+class ColumnarReportFile:
+    """
+    Column-oriented representation of the lines of a `ReportFile`.
+
+    Coverage types are kept as bitmaps indexed by line number (`hits`, `misses`
+    and `partials`) and so is the coverage of every session (`sessions`), which
+    makes totals, session filtering, patch totals and line comparisons bitwise
+    operations over whole files.  The line numbers, coverage types and the number
+    of sessions hitting each line are also available as `array` columns.
+
+    Lines without coverage (skipped lines or lines with only messages) are
+    left out, as they are from the report totals.
+    """
+
+    __slots__ = (
+        "name",
+        "hits",
+        "misses",
+        "partials",
+        "sessions",
+        "line_numbers",
+        "coverage_types",
+        "hit_counts",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        hits: int,
+        misses: int,
+        partials: int,
+        sessions: dict[int, tuple[int, int, int]],
+    ):
+        self.name = name
+        self.hits = hits
+        self.misses = misses
+        self.partials = partials
+        # session id -> (hits, misses, partials) bitmaps
+        self.sessions = sessions
+
+        self.line_numbers = mask_to_line_numbers(self.coverage_mask)
+        width = self.coverage_mask.bit_length()
+        hit_bits = format(hits, "b").zfill(width)[::-1]
+        partial_bits = format(partials, "b").zfill(width)[::-1]
+        self.coverage_types = array(
+            "b",
+            [
+                LineType.hit.value
+                if hit_bits[ln] == "1"
+                else LineType.partial.value
+                if partial_bits[ln] == "1"
+                else LineType.miss.value
+                for ln in self.line_numbers
+            ],
+        )
+        hit_counts = Counter()
+        for session_hits, _, _ in sessions.values():
+            hit_counts.update(mask_to_line_numbers(session_hits))
+        self.hit_counts = array("I", [hit_counts[ln] for ln in self.line_numbers])
+
+    @classmethod
+    def from_report_file(cls, report_file) -> "ColumnarReportFile":
+        line_numbers = {coverage_type: [] for coverage_type in COVERAGE_TYPES}
+        session_line_numbers = {}
+        for ln, coverage, sessions in raw_lines(report_file):
+            coverage_type = line_type(coverage)
+            if coverage_type not in line_numbers:
+                continue
+            line_numbers[coverage_type].append(ln)
+            for session_id, session_coverage in sessions:
+                session_type = line_type(session_coverage)
+                if session_type not in line_numbers:
+                    continue
+                if session_id not in session_line_numbers:
+                    session_line_numbers[session_id] = {
+                        coverage_type: [] for coverage_type in COVERAGE_TYPES
+                    }
+                session_line_numbers[session_id][session_type].append(ln)
+
+        return cls(
+            report_file.name,
+            *(line_numbers_to_mask(line_numbers[t]) for t in COVERAGE_TYPES),
+            sessions={
+                session_id: tuple(
+                    line_numbers_to_mask(session_lines[t]) for t in COVERAGE_TYPES
+                )
+                for session_id, session_lines in session_line_numbers.items()
+            },
+        )
+
+    def __len__(self):
+        return len(self.line_numbers)
+
+    @property
+    def coverage_mask(self) -> int:
+        return self.hits | self.misses | self.partials
+
+    def line_type(self, ln: int) -> Optional[LineType]:
+        bit = 1 << ln
+        if self.hits & bit:
+            return LineType.hit
+        if self.partials & bit:
+            return LineType.partial
+        if self.misses & bit:
+            return LineType.miss
+        return None
+
+    @property
+    def totals(self) -> ReportTotals:
+        return self._totals(self.hits, self.misses, self.partials)
+
+    def _totals(self, hits: int, misses: int, partials: int) -> ReportTotals:
+        totals = ReportTotals.default_totals()
+        totals.files = 1
+        totals.hits = popcount(hits)
+        totals.misses = popcount(misses)
+        totals.partials = popcount(partials)
+        totals.lines = totals.hits + totals.misses + totals.partials
+        totals.coverage = coverage_ratio(totals.hits, totals.lines)
+        return totals
+
+    def filter(self, session_ids: Iterable[int]) -> "ColumnarReportFile":
+        """
+        Only the coverage of the given sessions.  Coverage types are merged with
+        the same precedence `shared.utils.merge` gives them: a hit in any of the
+        sessions wins, then a partial, then a miss.
+        """
+        hits = misses = partials = 0
+        sessions = {}
+        for session_id in session_ids:
+            masks = self.sessions.get(session_id)
+            if masks is None:
+                continue
+            sessions[session_id] = masks
+            hits |= masks[0]
+            misses |= masks[1]
+            partials |= masks[2]
+        partials &= ~hits
+        misses &= ~(hits | partials)
+        return ColumnarReportFile(self.name, hits, misses, partials, sessions)
+
+    def patch_totals(self, line_numbers: Iterable[int]) -> ReportTotals:
+        """
+        Totals of the given (e.g. added in a diff) lines.
+        """
+        patch = line_numbers_to_mask(line_numbers)
+        return self._totals(
+            self.hits & patch, self.misses & patch, self.partials & patch
+        )
+
+    def _changed_mask(self, base: "ColumnarReportFile") -> int:
+        return (
+            self.coverage_mask
+            & base.coverage_mask
+            & (
+                (self.hits ^ base.hits)
+                | (self.misses ^ base.misses)
+                | (self.partials ^ base.partials)
+            )
+        )
+
+    def changed_lines(self, base: "ColumnarReportFile") -> array:
+        """
+        Line numbers covered in both files whose coverage type differs.  This is
+        only meaningful for files whose lines line up, i.e. without a diff.
+        """
+        return mask_to_line_numbers(self._changed_mask(base))
+
+    def change_summary(self, base: "ColumnarReportFile") -> dict[str, int]:
+        """
+        Net change in hits, misses and partials between `base` and this file
+        over `changed_lines` (see `CreateChangeSummaryVisitor`).
+        """
+        changed = self._changed_mask(base)
+
+        def count(mask: int) -> int:
+            return popcount(mask & changed)
+
+        return {
+            "hits": count(self.hits) - count(base.hits),
+            "misses": count(self.misses) - count(base.misses),
+            "partials": count(self.partials) - count(base.partials),
+        }
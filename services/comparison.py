@@ -1,16 +1,21 @@
-import asyncio
 import copy
 import functools
 import json
 import logging
+import math
+import operator
+from bisect import bisect_right
 from collections import Counter
-from dataclasses import dataclass, field
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Callable, List, Optional
 
 import minio
 import pytz
 from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.db.models import Prefetch
 from django.utils.functional import cached_property
 from shared.helpers.yaml import walk
@@ -23,8 +28,11 @@ from core.models import Commit
 from reports.models import CommitReport, ReportDetails
 from services import ServiceException
 from services.archive import ArchiveService
+from services.cache import LocalLRUCache, TwoTierCache
+from services.columnar import line_type_masks, popcount, shift_mask
 from services.redis_configuration import get_redis_connection
 from services.repo_providers import RepoProviderService
+from services.source import fetch_source
 from utils.config import get_config
 
 log = logging.getLogger(__name__)
@@ -153,6 +161,30 @@ class FileComparisonTraverseManager:
         if self.src:
             return self.src[self.head_ln - 1]
 
+    def unchanged_lines(self) -> int:
+        """
+        Number of lines, starting at the current ones, that are outside of the diff
+        - the ones before the next segment or, if there are no segments left, until
+        the end of the traversal.  Those lines only differ by their numbers, so
+        they're visited in bulk (see `FileComparisonVisitor.visit_unchanged`).
+        """
+        if min(self.base_ln, self.head_ln) < 1:
+            return 0
+
+        if self.segments:
+            header = self.segments[0]["header"]
+            count = min(
+                _lines_until(self.base_ln, int(header[0]), int(header[1] or 1)),
+                _lines_until(self.head_ln, int(header[2]), int(header[3] or 1)),
+            )
+            # both counters being past the segment is left to `pop_line`
+            return 0 if count == math.inf else count
+        if self.src:
+            return max(len(self.src) - self.head_ln + 1, 0)
+        return max(
+            self.head_file_eof - self.head_ln, self.base_file_eof - self.base_ln, 0
+        )
+
     def apply(self, visitors):
         """
         Traverses the lines in a file comparison while accounting for the diff.
@@ -164,6 +196,28 @@ class FileComparisonTraverseManager:
         visitors -- A list of visitors applied to each line.
         """
         while not self.traverse_finished():
+            count = self.unchanged_lines()
+            values = None
+            if self.src and count:
+                values = self.src[self.head_ln - 1 : self.head_ln - 1 + count]
+                if len(values) < count:
+                    # past the end of the source: let `pop_line` deal with it
+                    count = 0
+            if count:
+                for visitor in visitors:
+                    # plain callables are visited line by line
+                    visit_unchanged = (
+                        visitor.visit_unchanged
+                        if isinstance(visitor, FileComparisonVisitor)
+                        else functools.partial(
+                            FileComparisonVisitor.visit_unchanged, visitor
+                        )
+                    )
+                    visit_unchanged(self.base_ln, self.head_ln, count, values)
+                self.base_ln += count
+                self.head_ln += count
+                continue
+
             line_value = self.pop_line()
             is_diff = self.traversing_diff()
 
@@ -190,6 +244,18 @@ class FileComparisonTraverseManager:
                 self.segments.pop(0)
 
 
+def _lines_until(ln: int, start: int, length: int) -> float:
+    """
+    Number of lines from `ln` until the `length` lines starting at `start`
+    (infinite if they're already behind).
+    """
+    if start <= ln < start + length:
+        return 0
+    if ln < start:
+        return start - ln
+    return math.inf
+
+
 class FileComparisonVisitor:
     """
     Abstract class with a convenience method for getting lines amongst
@@ -236,17 +302,37 @@ class FileComparisonVisitor:
     def __call__(self, base_ln, head_ln, value, is_diff):
         pass
 
+    def visit_unchanged(self, base_ln, head_ln, count, values):
+        """
+        Visits `count` consecutive lines outside of the diff, starting at
+        `base_ln` and `head_ln`.  `values` are the lines of `src` (`None` when
+        traversing without it).  Visitors can override this to handle all the
+        lines at once.
+        """
+        for offset in range(count):
+            self(
+                base_ln + offset,
+                head_ln + offset,
+                values[offset] if values is not None else None,
+                False,
+            )
+
 
 class CreateLineComparisonVisitor(FileComparisonVisitor):
     """
     A visitor that creates LineComparisons, and stores the
     result in self.lines. Only operates on lines that have
     code-values derived from segments or src in FileComparisonTraverseManager.
+    Lines outside of the diff are only created when accessed (see `LineComparisons`).
     """
 
     def __init__(self, base_file, head_file):
         self.base_file, self.head_file = base_file, head_file
-        self.lines = []
+        self.lines = LineComparisons(self)
+
+    def visit_unchanged(self, base_ln, head_ln, count, values):
+        if values is not None:
+            self.lines.append_unchanged(base_ln, head_ln, values)
 
     def __call__(self, base_ln, head_ln, value, is_diff):
         if value is None:
@@ -305,6 +391,43 @@ class CreateChangeSummaryVisitor(FileComparisonVisitor):
 
         self._update_summary(base_line, head_line)
 
+    @cached_property
+    def _line_type_masks(self):
+        return line_type_masks(self.base_file), line_type_masks(self.head_file)
+
+    def visit_unchanged(self, base_ln, head_ln, count, values):
+        """
+        Same as visiting each line, with bitmaps of the lines by coverage type.
+        """
+        base_masks, head_masks = self._line_type_masks
+        lines = ((1 << count) - 1) << head_ln
+        if values is not None:
+            for offset, value in enumerate(values):
+                if value and value[0] in ["+", "-"]:
+                    lines &= ~(1 << (head_ln + offset))
+
+        base, head = {}, {}
+        for coverage_type in self.coverage_type_map:
+            base[coverage_type] = lines & shift_mask(
+                base_masks.get(coverage_type, 0), head_ln - base_ln
+            )
+            head[coverage_type] = lines & head_masks.get(coverage_type, 0)
+
+        changed = functools.reduce(operator.or_, base.values()) & functools.reduce(
+            operator.or_, head.values()
+        )
+        changed &= functools.reduce(
+            operator.or_, (base[t] ^ head[t] for t in self.coverage_type_map)
+        )
+        if not changed:
+            return
+
+        for coverage_type, name in self.coverage_type_map.items():
+            removed = popcount(base[coverage_type] & changed)
+            added = popcount(head[coverage_type] & changed)
+            if removed or added:
+                self.summary[name] += added - removed
+
 
 class LineComparison:
     def __init__(self, base_line, head_line, base_ln, head_ln, value, is_diff):
@@ -377,6 +500,110 @@ class LineComparison:
             return ids
 
 
+class LineComparisons(Sequence):
+    """
+    The lines of a `CreateLineComparisonVisitor`.  The `LineComparison`s of the
+    runs of lines outside of the diff (see `FileComparisonVisitor.visit_unchanged`)
+    are only created when accessed, so files with a few changes don't create a
+    `LineComparison` for each of their lines.
+    """
+
+    def __init__(self, visitor):
+        self.visitor = visitor
+        # index of the first line of each entry, and the entries - either
+        # a `LineComparison` or a `(base_ln, head_ln, values)` run
+        self._starts = []
+        self._entries = []
+        self._length = 0
+        self._created = {}
+
+    def append(self, line: LineComparison):
+        self._starts.append(self._length)
+        self._entries.append(line)
+        self._length += 1
+
+    def append_unchanged(self, base_ln: int, head_ln: int, values: List[str]):
+        if not values:
+            return
+        self._starts.append(self._length)
+        self._entries.append((base_ln, head_ln, values))
+        self._length += len(values)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("line comparison index out of range")
+
+        entry_index = bisect_right(self._starts, index) - 1
+        entry = self._entries[entry_index]
+        if isinstance(entry, LineComparison):
+            return entry
+
+        line = self._created.get(index)
+        if line is None:
+            base_ln, head_ln, values = entry
+            offset = index - self._starts[entry_index]
+            base_line, head_line = self.visitor._get_lines(
+                base_ln + offset, head_ln + offset
+            )
+            line = self._created[index] = LineComparison(
+                base_line=base_line,
+                head_line=head_line,
+                base_ln=base_ln + offset,
+                head_ln=head_ln + offset,
+                value=values[offset],
+                is_diff=False,
+            )
+        return line
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LineComparisons)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    @cached_property
+    def changed_indexes(self) -> List[int]:
+        """
+        Indexes of the lines whose coverage changed or that were added or removed
+        (see `Segment.segments`).  Runs of unchanged lines are checked with
+        bitmaps of their lines by coverage type.
+        """
+        base_masks = line_type_masks(self.visitor.base_file)
+        head_masks = line_type_masks(self.visitor.head_file)
+        coverage_types = set(base_masks) | set(head_masks)
+
+        indexes = []
+        for start, entry in zip(self._starts, self._entries):
+            if isinstance(entry, LineComparison):
+                if (
+                    entry.coverage["base"] != entry.coverage["head"]
+                    or entry.added
+                    or entry.removed
+                ):
+                    indexes.append(start)
+                continue
+
+            base_ln, head_ln, values = entry
+            lines = ((1 << len(values)) - 1) << head_ln
+            changed = 0
+            for coverage_type in coverage_types:
+                base_mask = shift_mask(
+                    base_masks.get(coverage_type, 0), head_ln - base_ln
+                )
+                changed |= (base_mask ^ head_masks.get(coverage_type, 0)) & lines
+            while changed:
+                lowest = changed & -changed
+                indexes.append(start + lowest.bit_length() - 1 - head_ln)
+                changed ^= lowest
+        return indexes
+
+
 class Segment:
     """
     A segment represents a contiguous subset of lines in a file where either
@@ -394,14 +621,16 @@ class Segment:
         lines = file_comparison.lines
 
         # line numbers of interest (i.e. coverage changed or code changed)
-        line_numbers = []
-        for idx, line in enumerate(lines):
-            if (
-                line.coverage["base"] != line.coverage["head"]
-                or line.added
-                or line.removed
-            ):
-                line_numbers.append(idx)
+        line_numbers = getattr(lines, "changed_indexes", None)
+        if line_numbers is None:
+            line_numbers = []
+            for idx, line in enumerate(lines):
+                if (
+                    line.coverage["base"] != line.coverage["head"]
+                    or line.added
+                    or line.removed
+                ):
+                    line_numbers.append(idx)
 
         segmented_lines = []
         if len(line_numbers) > 0:
@@ -626,6 +855,44 @@ class FileComparison:
         return Segment.segments(self)
 
 
+git_comparison_cache = TwoTierCache(
+    name="git_comparison",
+    local_max_bytes=settings.GIT_COMPARISON_CACHE_LOCAL_MAX_BYTES,
+    redis_ttl=settings.GIT_COMPARISON_CACHE_REDIS_TTL,
+    redis_max_bytes=settings.GIT_COMPARISON_CACHE_REDIS_MAX_BYTES,
+)
+
+
+def fetch_git_comparison(adapter, repoid: int, base_sha: str, head_sha: str) -> dict:
+    """
+    Fetches the comparison between two commits from the git provider.
+
+    The comparison between two fixed shas never changes so, when
+    `GIT_COMPARISON_CACHE_ENABLED` is set, it's cached (compressed in Redis,
+    see `TwoTierCache`) and concurrent fetches of the same pair share a single
+    provider call.  A fresh dict is returned every time since callers mutate it
+    (e.g. `Report.apply_diff` stores totals in the diff).
+    """
+
+    def fetch() -> dict:
+        return async_to_sync(adapter.get_compare)(base_sha, head_sha)
+
+    if not settings.GIT_COMPARISON_CACHE_ENABLED:
+        return fetch()
+
+    data = git_comparison_cache.get_or_set(
+        f"{repoid}/{base_sha}/{head_sha}", lambda: json.dumps(fetch()).encode()
+    )
+    return json.loads(data)
+
+
+# downloads the report chunks of comparisons concurrently (see `Comparison.load`)
+comparison_executor = ThreadPoolExecutor(
+    max_workers=settings.COMPARISON_EXECUTOR_MAX_WORKERS,
+    thread_name_prefix="comparison",
+)
+
+
 class Comparison(object):
     def __init__(self, user, base_commit, head_commit):
         # TODO: rename to owner
@@ -633,9 +900,40 @@ class Comparison(object):
         self._base_commit = base_commit
         self._head_commit = head_commit
 
+    def load(self):
+        """
+        Starts downloading the base and head report chunks in `comparison_executor`
+        and fetches the git comparison meanwhile, so that the storage and provider
+        I/O overlap instead of happening one after the other as each is first
+        accessed.  The reports are still built lazily, and their database queries
+        run on the calling thread.
+        """
+        self.load_reports()
+        self.git_comparison
+
+    def load_reports(self):
+        """
+        Starts downloading the base and head report chunks in `comparison_executor`
+        (see `load`), without fetching anything from the git provider.
+        """
+        if self.__dict__.get("_reports_loaded"):
+            return
+        self._reports_loaded = True
+
+        # same order as `validate` so the same error is raised for missing commits
+        commits = {
+            "head_report_without_diff": self.head_commit,
+            "base_report": self.base_commit,
+        }
+        for report, commit in commits.items():
+            if report not in self.__dict__:
+                report_service.prefetch_report_chunks(commit, comparison_executor)
+
     def validate(self):
+        self.load_reports()
         # make sure head and base reports exist (will throw an error if not)
-        self.head_report
+        # without fetching the git comparison
+        self.head_report_without_diff
         self.base_report
 
     @cached_property
@@ -666,13 +964,12 @@ class Comparison(object):
             adapter = RepoProviderService().get_adapter(
                 owner=self.user, repo=self.base_commit.repository
             )
-            file_content = async_to_sync(adapter.get_source)(
-                file_name, self.head_commit.commitid
-            )["content"]
-            # make sure the file is str utf-8
-            if type(file_content) is not str:
-                file_content = str(file_content, "utf-8")
-            src = file_content.splitlines()
+            src = fetch_source(
+                adapter,
+                self.head_commit.repository_id,
+                self.head_commit.commitid,
+                file_name,
+            ).splitlines()
         else:
             src = []
 
@@ -684,9 +981,25 @@ class Comparison(object):
             bypass_max_diff=bypass_max_diff,
         )
 
-    @property
+    @cached_property
+    def provider_adapter(self):
+        return RepoProviderService().get_adapter(self.user, self.base_commit.repository)
+
+    def _fetch_git_comparison(self, base_sha, head_sha):
+        repoid = self.base_commit.repository.repoid
+        return fetch_git_comparison(self.provider_adapter, repoid, base_sha, head_sha)
+
+    @cached_property
     def git_comparison(self):
-        return self._fetch_comparison_and_reverse_comparison[0]
+        return self._fetch_git_comparison(
+            self.base_commit.commitid, self.head_commit.commitid
+        )
+
+    @cached_property
+    def reverse_git_comparison(self):
+        return self._fetch_git_comparison(
+            self.head_commit.commitid, self.base_commit.commitid
+        )
 
     @cached_property
     def base_report(self):
@@ -699,22 +1012,30 @@ class Comparison(object):
                 raise e
 
     @cached_property
-    def head_report(self):
+    def head_report_without_diff(self):
+        """
+        The head report, for what doesn't depend on the diff (e.g. its sessions)
+        since it doesn't need the git comparison.  It's the same object as
+        `head_report`, to which the diff is applied in place.
+        """
         try:
-            report = report_service.build_report_from_commit(self.head_commit)
+            return report_service.build_report_from_commit(self.head_commit)
         except minio.error.S3Error as e:
             if e.code == "NoSuchKey":
                 raise MissingComparisonReport("Missing head report")
             else:
                 raise e
 
+    @cached_property
+    def head_report(self):
+        report = self.head_report_without_diff
         report.apply_diff(self.git_comparison["diff"])
         return report
 
     @cached_property
     def has_different_number_of_head_and_base_sessions(self):
         self.validate()
-        head_sessions = self.head_report.sessions
+        head_sessions = self.head_report_without_diff.sessions
         base_sessions = self.base_report.sessions
         # We're treating this case as false since considering CFF's complicates the logic
         if self._has_cff_sessions(head_sessions) or self._has_cff_sessions(
@@ -757,28 +1078,6 @@ class Comparison(object):
         commits_queryset.exclude(deleted=True)
         return commits_queryset
 
-    @cached_property
-    def _fetch_comparison_and_reverse_comparison(self):
-        """
-        Fetches comparison and reverse comparison concurrently, then
-        caches the result. Returns (comparison, reverse_comparison).
-        """
-        adapter = RepoProviderService().get_adapter(
-            self.user, self.base_commit.repository
-        )
-        comparison_coro = adapter.get_compare(
-            self.base_commit.commitid, self.head_commit.commitid
-        )
-
-        reverse_comparison_coro = adapter.get_compare(
-            self.head_commit.commitid, self.base_commit.commitid
-        )
-
-        async def runnable():
-            return await asyncio.gather(comparison_coro, reverse_comparison_coro)
-
-        return async_to_sync(runnable)()
-
     def flag_comparison(self, flag_name):
         return FlagComparison(self, flag_name)
 
@@ -797,7 +1096,7 @@ class Comparison(object):
         We compare with 1 because torngit injects the base commit into the commits
         array because reasons.
         """
-        return len(self._fetch_comparison_and_reverse_comparison[1]["commits"]) > 1
+        return len(self.reverse_git_comparison["commits"]) > 1
 
 
 class FlagComparison(object):
@@ -821,8 +1120,32 @@ class FlagComparison(object):
         return self.head_report.apply_diff(git_comparison["diff"])
 
 
+def slotted(cls):
+    """
+    Class decorator that gives a dataclass `__slots__`, like the `slots=True`
+    of `dataclass` (which requires python 3.10).
+    """
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in (*field_names, "__dict__", "__weakref__")
+    }
+    cls_dict["__slots__"] = field_names
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+@slotted
 @dataclass
 class ImpactedFile:
+    """
+    A file impacted by a commit comparison (see `ComparisonReport`).
+
+    There's one of these per file of a comparison and they're shared between
+    requests by `comparison_report_cache`, so they're slotted to keep them
+    small and must not be modified.
+    """
+
     @dataclass
     class Totals(ReportTotals):
         def __post_init__(self):
@@ -860,7 +1183,7 @@ class ImpactedFile:
             else None,
         )
 
-    @cached_property
+    @property
     def has_diff(self) -> bool:
         """
         Returns `True` if the file has any additions or removals in the diff
@@ -874,7 +1197,7 @@ class ImpactedFile:
             or self.file_was_removed_by_diff
         )
 
-    @cached_property
+    @property
     def has_changes(self) -> bool:
         """
         Returns `True` if the file has any unexpected changes
@@ -884,14 +1207,14 @@ class ImpactedFile:
             and len(self.unexpected_line_changes) > 0
         )
 
-    @cached_property
+    @property
     def misses_count(self) -> int:
         total_misses = 0
         total_misses += self._direct_misses_count
         total_misses += self._unintended_misses_count
         return total_misses
 
-    @cached_property
+    @property
     def _unintended_misses_count(self) -> int:
         """
         Returns the misses count for a unintended impacted file
@@ -908,7 +1231,7 @@ class ImpactedFile:
 
         return misses
 
-    @cached_property
+    @property
     def _direct_misses_count(self) -> int:
         """
         Returns the misses count for a direct impacted file
@@ -923,7 +1246,7 @@ class ImpactedFile:
 
         return misses
 
-    @cached_property
+    @property
     def patch_coverage(self) -> Optional[Totals]:
         """
         Sums of hits, misses and partials in the diff
@@ -941,7 +1264,7 @@ class ImpactedFile:
 
             return ImpactedFile.Totals(hits=hits, misses=misses, partials=partials)
 
-    @cached_property
+    @property
     def change_coverage(self) -> Optional[float]:
         if (
             self.base_coverage
@@ -951,12 +1274,57 @@ class ImpactedFile:
         ):
             return float(self.head_coverage.coverage - self.base_coverage.coverage)
 
-    @cached_property
+    @property
     def file_name(self):
         parts = self.head_name.split("/")
         return parts[-1]
 
 
+class ParsedComparison:
+    """
+    The impacted files of a commit comparison, indexed by `head_name`.
+
+    Data derived from the files (e.g. sort keys) can be memoized here with
+    `memoize` so that it's computed once per comparison rather than once per
+    request - instances are shared through `comparison_report_cache`.
+    """
+
+    __slots__ = ("files", "files_by_head_name", "size", "_memoized")
+
+    def __init__(self, files: tuple[ImpactedFile, ...], size: int = 0):
+        self.files = files
+        # size of the comparison's JSON, which the parsed files are proportional to
+        self.size = size
+        self.files_by_head_name = {}
+        for file in files:
+            # same as a linear search: first file wins
+            self.files_by_head_name.setdefault(file.head_name, file)
+        self._memoized = {}
+
+    def memoize(self, name: str, compute: Callable[[], Any]) -> Any:
+        value = self._memoized.get(name)
+        if value is None:
+            value = self._memoized[name] = compute()
+        return value
+
+
+# `ComparisonReport.parsed_data` by cache key (bounded by the size of their JSON)
+# and, optionally, the raw comparisons in Redis so that other processes can skip
+# the download
+comparison_report_cache = LocalLRUCache(
+    max_bytes=settings.COMPARISON_REPORT_CACHE_LOCAL_MAX_BYTES,
+    sizeof=lambda parsed: parsed.size,
+)
+raw_comparison_report_cache = TwoTierCache(
+    name="comparison_report",
+    # parsed comparisons are cached in-process instead
+    local_max_bytes=0,
+    redis_enabled=settings.COMPARISON_REPORT_CACHE_REDIS_ENABLED,
+    redis_ttl=settings.COMPARISON_REPORT_CACHE_REDIS_TTL,
+    redis_max_bytes=settings.COMPARISON_REPORT_CACHE_REDIS_MAX_BYTES,
+)
+
+
 @dataclass
 class ComparisonReport(object):
     """
@@ -972,15 +1340,13 @@ class ComparisonReport(object):
         if not self.commit_comparison.report_storage_path:
             return []
 
-        comparison_data = self._fetch_raw_comparison_data()
-        return [
-            ImpactedFile.create(**data) for data in comparison_data.get("files", [])
-        ]
+        return list(self.parsed_data.files)
 
     def impacted_file(self, path: str) -> Optional[ImpactedFile]:
-        for file in self.files:
-            if file.head_name == path:
-                return file
+        if not self.commit_comparison.report_storage_path:
+            return None
+
+        return self.parsed_data.files_by_head_name.get(path)
 
     @cached_property
     def impacted_files(self) -> List[ImpactedFile]:
@@ -994,6 +1360,64 @@ class ComparisonReport(object):
     def impacted_files_with_direct_changes(self) -> List[ImpactedFile]:
         return [file for file in self.files if file.has_diff or not file.has_changes]
 
+    def memoize(self, name: str, compute: Callable[[], Any]) -> Any:
+        """
+        Data derived from `files`, memoized per comparison (see `ParsedComparison`).
+        """
+        if not self.commit_comparison.report_storage_path:
+            return compute()
+        return self.parsed_data.memoize(name, compute)
+
+    @cached_property
+    def cache_key(self) -> str:
+        """
+        The worker recomputes comparisons in place, so the time the comparison
+        was last updated is part of the key.
+        """
+        updated_at = self.commit_comparison.updated_at
+        return "/".join(
+            (
+                self.commit_comparison.report_storage_path,
+                str(updated_at.timestamp()) if updated_at else "none",
+            )
+        )
+
+    @cached_property
+    def parsed_data(self) -> ParsedComparison:
+        """
+        When `COMPARISON_REPORT_CACHE_ENABLED` is set this is shared by all the
+        instances (in this process) for the same comparison.
+        """
+        if not settings.COMPARISON_REPORT_CACHE_ENABLED:
+            return self._parse(self._fetch_raw_comparison_data())
+
+        cached = comparison_report_cache.get(self.cache_key)
+        if cached is not None:
+            return cached
+
+        raw_data = raw_comparison_report_cache.get(self.cache_key)
+        if raw_data is not None:
+            comparison_data = json.loads(raw_data)
+        else:
+            comparison_data = self._fetch_raw_comparison_data()
+            if not comparison_data:
+                # don't cache storage errors
+                return self._parse(comparison_data)
+            raw_data = json.dumps(comparison_data).encode()
+            raw_comparison_report_cache.set(self.cache_key, raw_data)
+
+        parsed = self._parse(comparison_data, size=len(raw_data))
+        comparison_report_cache.set(self.cache_key, parsed)
+        return parsed
+
+    def _parse(self, comparison_data: dict, size: int = 0) -> ParsedComparison:
+        return ParsedComparison(
+            tuple(
+                ImpactedFile.create(**data) for data in comparison_data.get("files", [])
+            ),
+            size=size,
+        )
+
     def _fetch_raw_comparison_data(self) -> dict:
         """
         Fetches the raw comparison data from storage
@@ -1,5 +1,7 @@
+import json
 import re
 from collections import defaultdict
+from collections.abc import Sequence
 from dataclasses import dataclass
 from functools import cached_property
 from typing import Iterable, List, Optional, Union
@@ -71,6 +73,10 @@ class Dir(PathNode):
 
     @cached_property
     def totals(self):
+        if isinstance(self.children, PathTreeChildren):
+            # already rolled up when the path tree was built
+            return self.children.node.totals
+
         # A dir's totals are sum of its children's totals
         totals = ReportTotals.default_totals()
         for child in self.children:
@@ -115,6 +121,158 @@ class PrefixedPath:
             return name
 
 
+class PathTreeNode:
+    """
+    Node in a `PathTree`.  Files have no `children`, directories have
+    the totals of all the files below them.
+    """
+
+    __slots__ = ("totals", "children")
+
+    def __init__(self, totals: ReportTotals, children: Optional[dict] = None):
+        self.totals = totals
+        self.children = children
+
+    @property
+    def is_file(self) -> bool:
+        return self.children is None
+
+
+class PathTreeChildren(Sequence):
+    """
+    The children of a `Dir` built from a `PathTree`.  They're only materialized
+    when accessed so that listing a directory doesn't build its whole subtree.
+    """
+
+    def __init__(self, node: PathTreeNode, full_path: str):
+        self.node = node
+        self.full_path = full_path
+
+    @cached_property
+    def _items(self) -> List[PathNode]:
+        return path_tree_nodes(self.node, self.full_path)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self.node.children)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(self._items)
+
+
+def path_tree_nodes(node: PathTreeNode, prefix: str) -> List[Union[File, Dir]]:
+    results = []
+    for name, child in node.children.items():
+        full_path = f"{prefix}/{name}" if prefix else name
+        if child.is_file:
+            results.append(File(full_path=full_path, totals=child.totals))
+        else:
+            results.append(
+                Dir(full_path=full_path, children=PathTreeChildren(child, full_path))
+            )
+    return results
+
+
+class PathTree:
+    """
+    Trie of the files in a report where every directory holds the totals of
+    all the files below it.  It's built once per report (and flag filter) so
+    that listing a directory only touches the children of that directory.
+    """
+
+    # bump this whenever the format of `serialize` changes
+    FORMAT_VERSION = 1
+
+    def __init__(self, root: PathTreeNode, files: List[str]):
+        self.root = root
+        self.files = files
+
+    @classmethod
+    def build(cls, report: Report, files: Iterable[str]) -> "PathTree":
+        root = PathTreeNode(ReportTotals.default_totals(), {})
+        files = list(files)
+        for full_path in files:
+            totals = report.get(full_path).totals
+            *dirnames, filename = full_path.split("/")
+            node = root
+            _add_totals(node.totals, totals)
+            for dirname in dirnames:
+                child = node.children.get(dirname)
+                if child is None or child.is_file:
+                    child = PathTreeNode(ReportTotals.default_totals(), {})
+                    node.children[dirname] = child
+                node = child
+                _add_totals(node.totals, totals)
+            node.children[filename] = PathTreeNode(totals)
+        return cls(root, files)
+
+    def find(self, path: Optional[str]) -> Optional[PathTreeNode]:
+        node = self.root
+        if not path:
+            return node
+        for name in path.split("/"):
+            if node.is_file:
+                return None
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def totals(self, path: str) -> Optional[ReportTotals]:
+        node = self.find(path)
+        return node.totals if node else None
+
+    def directory(self, path: Optional[str]) -> List[Union[File, Dir]]:
+        """
+        The files and directories directly under `path`.
+        """
+        node = self.find(path)
+        if node is None or node.is_file:
+            return []
+        return path_tree_nodes(node, path or "")
+
+    def serialize(self) -> bytes:
+        return json.dumps(
+            {"files": self.files, "root": _encode_node(self.root)},
+            cls=report_service.ReportCacheEncoder,
+        ).encode()
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "PathTree":
+        data = json.loads(data)
+        return cls(_decode_node(data["root"]), data["files"])
+
+
+def _add_totals(target: ReportTotals, totals: ReportTotals):
+    target.lines += totals.lines or 0
+    target.hits += totals.hits or 0
+    target.partials += totals.partials or 0
+    target.misses += totals.misses or 0
+
+
+def _encode_node(node: PathTreeNode) -> list:
+    if node.is_file:
+        return [node.totals.astuple()]
+    return [
+        node.totals.astuple(),
+        {name: _encode_node(child) for name, child in node.children.items()},
+    ]
+
+
+def _decode_node(data: list) -> PathTreeNode:
+    totals = ReportTotals(*data[0])
+    if len(data) == 1:
+        return PathTreeNode(totals)
+    return PathTreeNode(
+        totals, {name: _decode_node(child) for name, child in data[1].items()}
+    )
+
+
 def is_subpath(full_path: str, subpath: str):
     if not subpath:
         return True
@@ -158,24 +316,12 @@ class ReportPaths:
         self.unfiltered_report = report
         self.filter_flags = filter_flags
         self.prefix = path or ""
+        self.search_term = search_term
 
         # Filter report if flags exist
         if self.filter_flags:
             self.report = self.report.filter(flags=self.filter_flags)
 
-        self._paths = [
-            PrefixedPath(full_path=full_path, prefix=self.prefix)
-            for full_path in self.files
-            if is_subpath(full_path, self.prefix)
-        ]
-
-        if search_term:
-            self._paths = [
-                path
-                for path in self.paths
-                if search_term.lower() in path.relative_path.lower()
-            ]
-
     @cached_property
     def files(self) -> List[str]:
         if self.filter_flags:
@@ -185,9 +331,41 @@ class ReportPaths:
             return files
         return self.report.files
 
+    @cached_property
+    def tree(self) -> PathTree:
+        """
+        The path tree of the (possibly flag-filtered) report.  Trees are memoized
+        on the unfiltered report per set of flags, see `report_derived_data`.
+        """
+        flags_key = ",".join(sorted(self.filter_flags))
+        return report_service.report_derived_data(
+            self.unfiltered_report,
+            f"paths/v{PathTree.FORMAT_VERSION}/{flags_key}",
+            build=lambda: PathTree.build(self.report, self.files),
+            serialize=PathTree.serialize,
+            deserialize=PathTree.deserialize,
+        )
+
     def _filter_commit_report(self) -> None:
         self.report = self.report.filter(flags=self.filter_flags)
 
+    @cached_property
+    def _paths(self) -> List[PrefixedPath]:
+        paths = [
+            PrefixedPath(full_path=full_path, prefix=self.prefix)
+            for full_path in self.tree.files
+            if is_subpath(full_path, self.prefix)
+        ]
+
+        if self.search_term:
+            paths = [
+                path
+                for path in paths
+                if self.search_term.lower() in path.relative_path.lower()
+            ]
+
+        return paths
+
     @property
     def paths(self):
         return self._paths
@@ -205,13 +383,15 @@ class ReportPaths:
         """
         Return a single directory (specified by `path`) of mixed file/directory results.
         """
-        return self._single_directory_recursive(self.paths)
+        if self.search_term:
+            return self._single_directory_recursive(self.paths)
+        return self.tree.directory(self.prefix)
 
     def _totals(self, path: PrefixedPath) -> ReportTotals:
         """
         Returns the report totals for a given prefixed path.
         """
-        return self.report.get(path.full_path).totals
+        return self.tree.totals(path.full_path)
 
     def _single_directory_recursive(
         self, paths: Iterable[PrefixedPath]
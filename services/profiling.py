@@ -21,9 +21,17 @@ class CriticalFile:
 
 
 class ProfilingSummary:
-    def __init__(self, repo: Repository, commit_sha: Optional[str] = None):
+    def __init__(
+        self,
+        repo: Repository,
+        commit_sha: Optional[str] = None,
+        commit: Optional[Commit] = None,
+    ):
         self.repo = repo
         self.commit_sha = commit_sha
+        # the commit of `commit_sha` if it's already been fetched, its report
+        # (`Commit.full_report`) is then shared with the other users of the instance
+        self.commit = commit
 
     def latest_profiling_commit(self) -> Optional[ProfilingCommit]:
         """
@@ -80,8 +88,11 @@ class ProfilingSummary:
         ):
             return []
         commit_sha = self.commit_sha or profiling_commit.commit_sha
-        commit = Commit.objects.get(commitid=commit_sha)
-        report = report_service.build_report_from_commit(commit)
+        if self.commit is not None and self.commit.commitid == commit_sha:
+            report = self.commit.full_report
+        else:
+            commit = Commit.objects.get(commitid=commit_sha)
+            report = report_service.build_report_from_commit(commit)
         if report is None:
             return []
         critical_files_paths = repo_yaml["profiling"]["critical_files_paths"]
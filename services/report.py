@@ -1,20 +1,30 @@
+import contextvars
+import json
 import logging
-from typing import List, Optional
+from collections import defaultdict
+from concurrent.futures import Executor
+from dataclasses import replace
+from decimal import Decimal
+from typing import Any, Callable, List, Optional
 
 from django.conf import settings
-from django.db.models import Prefetch, Q
+from django.db.models import Prefetch
 from django.utils.functional import cached_property
 from shared.helpers.flag import Flag
 from shared.reports.readonly import ReadOnlyReport as SharedReadOnlyReport
 from shared.reports.resources import Report
 from shared.reports.types import ReportFileSummary, ReportTotals
 from shared.storage.exceptions import FileNotInStorageError
+from shared.utils.ReportEncoder import ReportEncoder
 from shared.utils.sessions import Session, SessionType
 
 from core.models import Commit
 from reports.models import AbstractTotals, CommitReport, ReportDetails, ReportSession
 from services.archive import ArchiveService
+from services.cache import TwoTierCache
+from services.columnar import ColumnarReportFile
 from utils.config import RUN_ENV
+from utils.model_utils import prefetch_archive_fields
 
 log = logging.getLogger(__name__)
 
@@ -24,6 +34,20 @@ class ReportMixin:
         for f in self.files:
             yield self.get(f)
 
+    def columnar_file(self, path: str) -> Optional[ColumnarReportFile]:
+        """
+        Opt-in columnar representation of a file in the report (see
+        `services.columnar`), built at most once per report instance.
+        """
+        report_file = self.get(path)
+        if report_file is None:
+            return None
+        return report_derived_data(
+            self,
+            f"columnar/{path}",
+            build=lambda: ColumnarReportFile.from_report_file(report_file),
+        )
+
     @cached_property
     def flags(self):
         """returns dict(:name=<Flag>)"""
@@ -58,24 +82,71 @@ def build_report(chunks, files, sessions, totals, report_class=None):
     )
 
 
-def build_report_from_commit(commit: Commit, report_class=None):
+def build_report_from_commit(
+    commit: Commit, report_class=None, paths: Optional[List[str]] = None
+):
     """
     Builds a `shared.reports.resources.Report` from a given commit.
 
     Chunks are fetched from archive storage and the rest of the data is sourced
     from various `reports_*` tables in the database.
+
+    When `paths` is given only the chunks for those files are fetched (see
+    `ArchiveService.read_chunks_for_files`) and the report only contains those
+    files. Sessions and report totals are still the ones of the whole report.
+
+    When `REPORT_CACHE_ENABLED` is set, the fetched data is cached (see `report_cache`)
+    so that subsequent builds of the same commit skip storage and most of the queries.
+    The returned report then has a `cache_key` attribute under which data derived
+    from it can be cached as well.
     """
+    if settings.REPORT_CACHE_ENABLED:
+        # see `prefetch_report_chunks`
+        cache_key = vars(commit).pop("_report_cache_key", None)
+        if cache_key is None:
+            cache_key = report_cache_key(commit)
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            # see `prefetch_commit_reports`
+            vars(commit).pop("_commit_report", None)
+            chunks, files, sessions, totals = deserialize_report_data(cached)
+            report = build_report(
+                chunks, files, sessions, totals, report_class=report_class
+            )
+            report.cache_key = cache_key
+            return report
+
+    if paths is not None:
+        report_data = fetch_report_data_for_paths(commit, paths)
+        if report_data is None:
+            return None
+        return build_report(*report_data, report_class=report_class)
+
+    report_data = fetch_report_data(commit)
+    if report_data is None:
+        return None
+
+    chunks, files, sessions, totals = report_data
+    report = build_report(chunks, files, sessions, totals, report_class=report_class)
+    if settings.REPORT_CACHE_ENABLED:
+        report_cache.set(
+            cache_key, serialize_report_data(chunks, files, sessions, totals)
+        )
+        # lets derived data (e.g. `services.path.PathTree`) be cached alongside
+        report.cache_key = cache_key
+    return report
 
-    # TODO: this can be removed once confirmed working well on prod
-    new_report_builder_enabled = (
-        RUN_ENV == "DEV"
-        or RUN_ENV == "STAGING"
-        or RUN_ENV == "TESTING"
-        or commit.repository_id in settings.REPORT_BUILDER_REPO_IDS
-    )
 
-    commit_report = fetch_commit_report(commit)
-    if commit_report and new_report_builder_enabled:
+def fetch_report_metadata(commit: Commit) -> Optional[tuple]:
+    """
+    Fetches everything but the chunks needed to build a report for the given commit.
+    Returns a `(files, sessions, totals)` tuple or `None` if there's no report.
+    """
+    commit_report = None
+    if new_report_builder_enabled(commit):
+        commit_report = fetch_commit_report(commit)
+
+    if commit_report:
         files = build_files(commit_report)
         sessions = build_sessions(commit_report)
         try:
@@ -90,9 +161,21 @@ def build_report_from_commit(commit: Commit, report_class=None):
         sessions = commit.report["sessions"]
         totals = commit.totals
 
+    return files, sessions, totals
+
+
+def fetch_report_data(commit: Commit) -> Optional[tuple]:
+    """
+    Fetches the data needed to build a report for the given commit.
+    Returns a `(chunks, files, sessions, totals)` tuple or `None` if there's no report.
+    """
+    metadata = fetch_report_metadata(commit)
+    if metadata is None:
+        return None
+    files, sessions, totals = metadata
+
     try:
-        chunks = ArchiveService(commit.repository).read_chunks(commit.commitid)
-        return build_report(chunks, files, sessions, totals, report_class=report_class)
+        chunks = read_report_chunks(commit)
     except FileNotInStorageError:
         log.warning(
             "File for chunks not found in storage",
@@ -103,23 +186,214 @@ def build_report_from_commit(commit: Commit, report_class=None):
         )
         return None
 
+    return chunks, files, sessions, totals
 
-def fetch_commit_report(commit: Commit) -> Optional[CommitReport]:
+
+def prefetch_report_chunks(commit: Commit, executor: Executor):
     """
-    Fetch a single `CommitReport` for the given commit.
-    All the necessary report relations are prefetched.
+    Starts downloading the chunks of the commit's report on `executor` so that
+    a later `build_report_from_commit(commit)` on the same commit instance doesn't
+    have to wait for storage.  Only the storage I/O happens off this thread - the
+    database queries of the build still run on the calling thread.
     """
-    return (
-        commit.reports.prefetch_related(
-            Prefetch(
-                "sessions",
-                queryset=ReportSession.objects.prefetch_related("flags").select_related(
-                    "uploadleveltotals"
-                ),
+    if "_chunks_future" in vars(commit):
+        return
+    if settings.REPORT_CACHE_ENABLED:
+        # computed once for both the prefetch and the build
+        commit._report_cache_key = report_cache_key(commit)
+        if report_cache.get(commit._report_cache_key):
+            # the build won't need the chunks
+            return
+
+    archive_service = ArchiveService(commit.repository)
+    # copies the context so the read is still counted by `ArchiveReadCountMiddleware`
+    commit._chunks_future = executor.submit(
+        contextvars.copy_context().run, archive_service.read_chunks, commit.commitid
+    )
+
+
+def read_report_chunks(commit: Commit) -> str:
+    future = vars(commit).pop("_chunks_future", None)
+    if future is not None:
+        return future.result()
+    return ArchiveService(commit.repository).read_chunks(commit.commitid)
+
+
+def fetch_report_data_for_paths(commit: Commit, paths: List[str]) -> Optional[tuple]:
+    """
+    Same as `fetch_report_data` but only fetches the chunks of the given paths.
+    Files are renumbered to point into the partial chunks.
+    """
+    metadata = fetch_report_metadata(commit)
+    if metadata is None:
+        return None
+    all_files, sessions, totals = metadata
+
+    files = {}
+    file_indexes = []
+    for path in paths:
+        file_summary = all_files.get(path)
+        if file_summary is None:
+            continue
+        if isinstance(file_summary, ReportFileSummary):
+            file_indexes.append(file_summary.file_index)
+            files[path] = replace(file_summary, file_index=len(files))
+        else:
+            # legacy `commit.report` format: [file_index, file_totals, ...]
+            file_indexes.append(file_summary[0])
+            files[path] = [len(files), *file_summary[1:]]
+
+    try:
+        chunks = ArchiveService(commit.repository).read_chunks_for_files(
+            commit.commitid, file_indexes
+        )
+    except FileNotInStorageError:
+        log.warning(
+            "File for chunks not found in storage",
+            extra=dict(
+                commit=commit.commitid,
+                repo=commit.repository_id,
             ),
         )
-        .select_related("reportdetails", "reportleveltotals")
-        .first()
+        return None
+
+    return chunks, files, sessions, totals
+
+
+def new_report_builder_enabled(commit: Commit) -> bool:
+    # TODO: this can be removed once confirmed working well on prod
+    return (
+        RUN_ENV == "DEV"
+        or RUN_ENV == "STAGING"
+        or RUN_ENV == "TESTING"
+        or commit.repository_id in settings.REPORT_BUILDER_REPO_IDS
+    )
+
+
+report_cache = TwoTierCache(
+    name="report",
+    local_max_bytes=settings.REPORT_CACHE_LOCAL_MAX_BYTES,
+    redis_enabled=settings.REPORT_CACHE_REDIS_ENABLED,
+    redis_ttl=settings.REPORT_CACHE_REDIS_TTL,
+    redis_max_bytes=settings.REPORT_CACHE_REDIS_MAX_BYTES,
+)
+
+# bump this whenever the format of `serialize_report_data` changes
+REPORT_CACHE_FORMAT_VERSION = 1
+
+
+def report_cache_key(commit: Commit) -> str:
+    """
+    Cache key for the report of the given commit.
+
+    The worker updates the commit and its `ReportDetails` every time it writes
+    new chunks or sessions, so those timestamps are part of the key and
+    any cached entry is implicitly invalidated when the report changes.
+    """
+    details_updated_at = commit.reports.values_list(
+        "reportdetails__updated_at", flat=True
+    ).first()
+    version = ":".join(
+        str(timestamp.timestamp()) if timestamp else "none"
+        for timestamp in (commit.updatestamp, details_updated_at)
+    )
+    builder = "db" if new_report_builder_enabled(commit) else "legacy"
+    return "/".join(
+        (
+            str(commit.repository_id),
+            commit.commitid,
+            f"v4.{REPORT_CACHE_FORMAT_VERSION}",
+            builder,
+            version,
+        )
+    )
+
+
+class ReportCacheEncoder(ReportEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        if isinstance(obj, Session):
+            return obj._encode()
+        return super().default(obj)
+
+
+def serialize_report_data(chunks: str, files, sessions, totals) -> bytes:
+    """
+    Compact serialized form of the report data: a single JSON line with the
+    files, sessions and totals followed by the raw chunks.
+    """
+    if isinstance(totals, ReportTotals):
+        totals = {"report_totals": totals.astuple()}
+    header = json.dumps(
+        {"files": files, "sessions": sessions, "totals": totals},
+        cls=ReportCacheEncoder,
+    )
+    return header.encode() + b"\n" + chunks.encode()
+
+
+def deserialize_report_data(data: bytes) -> tuple:
+    header, chunks = data.split(b"\n", 1)
+    header = json.loads(header)
+    totals = header["totals"]
+    if isinstance(totals, dict) and "report_totals" in totals:
+        totals = ReportTotals(*totals["report_totals"])
+        if totals.coverage is not None:
+            totals.coverage = Decimal(totals.coverage)
+    return chunks.decode(), header["files"], header["sessions"], totals
+
+
+def commit_reports_for_building(queryset):
+    """
+    Prefetches all the relations of the `CommitReport`s in `queryset` needed to
+    build their reports.
+    """
+    return queryset.prefetch_related(
+        Prefetch(
+            "sessions",
+            queryset=ReportSession.objects.prefetch_related("flags").select_related(
+                "uploadleveltotals"
+            ),
+        ),
+    ).select_related("reportdetails", "reportleveltotals")
+
+
+def fetch_commit_report(commit: Commit) -> Optional[CommitReport]:
+    """
+    Fetch a single `CommitReport` for the given commit.
+    All the necessary report relations are prefetched so that building the report
+    takes a constant number of queries regardless of the number of uploads.
+    """
+    if "_commit_report" in vars(commit):
+        # see `prefetch_commit_reports`
+        return vars(commit).pop("_commit_report")
+    return commit_reports_for_building(commit.reports).first()
+
+
+def prefetch_commit_reports(commits: List[Commit]):
+    """
+    Fetches the `CommitReport`s of all the given commits (see `fetch_commit_report`)
+    at once, so that building their reports doesn't query them one commit at a time.
+    The legacy `Commit.report` of the commits without one is fetched in bulk too.
+    """
+    to_fetch = [
+        commit
+        for commit in commits
+        if new_report_builder_enabled(commit) and "_commit_report" not in vars(commit)
+    ]
+    if to_fetch:
+        commit_reports = {}
+        queryset = CommitReport.objects.filter(commit_id__in=[c.pk for c in to_fetch])
+        for commit_report in commit_reports_for_building(queryset).order_by("pk"):
+            # same as `first()` on each commit's reports
+            commit_reports.setdefault(commit_report.commit_id, commit_report)
+        for commit in to_fetch:
+            commit._commit_report = commit_reports.get(commit.pk)
+
+    # see `fetch_report_metadata`
+    prefetch_archive_fields(
+        [commit for commit in commits if vars(commit).get("_commit_report") is None],
+        "report",
     )
 
 
@@ -155,7 +429,7 @@ def build_session(upload: ReportSession) -> Session:
     return Session(
         id=upload.id,
         totals=upload_totals,
-        time=upload.created_at.timestamp,
+        time=upload.created_at.timestamp(),
         archive=upload.storage_path,
         flags=flags,
         provider=upload.provider,
@@ -181,9 +455,11 @@ def build_sessions(commit_report: CommitReport) -> dict[int, Session]:
     carryforward_sessions = {}
     uploaded_flags = set()
 
-    for upload in commit_report.sessions.filter(
-        Q(state="complete") | Q(state="processed")
-    ):
+    # filtering in Python (instead of `.filter(...)`) keeps using the sessions,
+    # flags and totals prefetched by `fetch_commit_report`
+    for upload in commit_report.sessions.all():
+        if upload.state not in ("complete", "processed"):
+            continue
         session = build_session(upload)
         if session.session_type == SessionType.carriedforward:
             carryforward_sessions[upload.order_number] = session
@@ -249,14 +525,104 @@ def sessions_with_specific_flags(
 
 
 def files_in_sessions(commit_report: Report, session_ids: List[int]) -> List[str]:
-    return [
-        file.name
-        for file in commit_report
-        if any(
-            [
-                any([session.id in session_ids for session in line.sessions])
-                for line in file
-                if line
-            ]
-        )
-    ]
+    index = session_files_index(commit_report)
+    files = set().union(*(index.get(session_id, ()) for session_id in session_ids))
+    return [name for name in commit_report.files if name in files]
+
+
+def session_files_index(commit_report: Report) -> dict[int, set[str]]:
+    """
+    Maps every session id to the names of the files that session has coverage for.
+    See `report_derived_data` for how the index is memoized.
+    """
+    return report_derived_data(
+        commit_report,
+        "session_files/v1",
+        build=lambda: build_session_files_index(commit_report),
+        serialize=lambda index: json.dumps(
+            {session_id: sorted(files) for session_id, files in index.items()}
+        ).encode(),
+        deserialize=lambda data: {
+            int(session_id): set(files)
+            for session_id, files in json.loads(data).items()
+        },
+    )
+
+
+def build_session_files_index(commit_report: Report) -> dict[int, set[str]]:
+    """
+    The session ids of a file are taken from its `ReportFileSummary.session_totals`
+    when available, otherwise the lines of the file are scanned once.
+    """
+    index = defaultdict(set)
+    file_summaries = getattr(commit_report, "_files", None) or {}
+    for name in commit_report.files:
+        session_ids = session_ids_from_summary(file_summaries.get(name))
+        if session_ids is None:
+            report_file = commit_report.get(name)
+            if report_file is None:
+                continue
+            session_ids = {
+                session.id for line in report_file if line for session in line.sessions
+            }
+        for session_id in session_ids:
+            index[session_id].add(name)
+    return dict(index)
+
+
+def session_ids_from_summary(file_summary) -> Optional[set[int]]:
+    if isinstance(file_summary, (list, tuple)):
+        # legacy `commit.report` format: [file_index, file_totals, session_totals, ...]
+        session_totals = file_summary[2] if len(file_summary) > 2 else None
+    else:
+        session_totals = getattr(file_summary, "session_totals", None)
+    if isinstance(session_totals, dict):
+        # {"meta": {...}, "<session_id>": totals, ...}
+        session_ids = {
+            int(session_id)
+            for session_id, totals in session_totals.items()
+            if session_id != "meta" and totals
+        }
+    elif isinstance(session_totals, (list, tuple)):
+        # indexed by session id
+        session_ids = {
+            session_id for session_id, totals in enumerate(session_totals) if totals
+        }
+    else:
+        return None
+    # an empty summary is indistinguishable from a missing one
+    return session_ids or None
+
+
+def report_derived_data(
+    report: Report,
+    name: str,
+    build: Callable[[], Any],
+    serialize: Optional[Callable[[Any], bytes]] = None,
+    deserialize: Optional[Callable[[bytes], Any]] = None,
+) -> Any:
+    """
+    Returns data derived from `report`, building it with `build()` at most once
+    per report instance.  When `serialize`/`deserialize` are given and the report
+    came from `build_report_from_commit` with caching enabled the data is also
+    stored in `report_cache` next to the report itself (and invalidated with it).
+    """
+    memo = vars(report).setdefault("_derived_data", {})
+    if name in memo:
+        return memo[name]
+
+    cache_key = None
+    if serialize and settings.REPORT_CACHE_ENABLED:
+        report_key = getattr(report, "cache_key", None)
+        if isinstance(report_key, str):
+            cache_key = f"{report_key}/{name}"
+            cached = report_cache.get(cache_key)
+            if cached is not None:
+                memo[name] = deserialize(cached)
+                return memo[name]
+
+    data = build()
+    if cache_key:
+        report_cache.set(cache_key, serialize(data))
+    memo[name] = data
+    return data
@@ -0,0 +1,41 @@
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from services.cache import TwoTierCache
+
+source_cache = TwoTierCache(
+    name="source",
+    local_max_bytes=settings.SOURCE_CACHE_LOCAL_MAX_BYTES,
+    redis_enabled=settings.SOURCE_CACHE_REDIS_ENABLED,
+    redis_ttl=settings.SOURCE_CACHE_REDIS_TTL,
+    redis_max_bytes=settings.SOURCE_CACHE_REDIS_MAX_BYTES,
+)
+
+
+def source_cache_key(repoid: int, commitid: str, path: str) -> str:
+    return f"{repoid}/{commitid}/{path}"
+
+
+def fetch_source(adapter, repoid: int, commitid: str, path: str) -> str:
+    """
+    Fetches the content of the file at `path` in the given commit from the git
+    provider.
+
+    The content of a file at a fixed sha never changes so, when
+    `SOURCE_CACHE_ENABLED` is set, it's cached (compressed in Redis, see
+    `TwoTierCache`) and concurrent fetches of the same file share a single
+    provider call.
+    """
+
+    def fetch() -> bytes:
+        content = async_to_sync(adapter.get_source)(path, commitid)["content"]
+        if type(content) is str:
+            content = content.encode("utf-8")
+        return content
+
+    if not settings.SOURCE_CACHE_ENABLED:
+        return fetch().decode("utf-8")
+
+    return source_cache.get_or_set(
+        source_cache_key(repoid, commitid, path), fetch
+    ).decode("utf-8")
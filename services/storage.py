@@ -1,6 +1,8 @@
 import logging
 from datetime import timedelta
 
+from minio.error import S3Error
+from shared.storage.exceptions import FileNotInStorageError
 from shared.storage.minio import MinioStorageService
 
 from utils.config import get_config
@@ -51,3 +53,31 @@ class StorageService(MinioStorageService):
     def create_presigned_get(self, bucket, path, expires):
         expires = timedelta(seconds=expires)
         return self.minio_client.presigned_get_object(bucket, path, expires)
+
+    def get_file_stat(self, bucket, path):
+        try:
+            return self.minio_client.stat_object(bucket, path)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                raise FileNotInStorageError(f"File {path} does not exist in {bucket}")
+            raise e
+
+    def read_file_range(self, bucket, path, offset, length) -> bytes:
+        """
+        Reads `length` bytes of the file starting at `offset` (ranged GET).
+        """
+        if length <= 0:
+            return b""
+        try:
+            response = self.minio_client.get_object(
+                bucket, path, offset=offset, length=length
+            )
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                raise FileNotInStorageError(f"File {path} does not exist in {bucket}")
+            raise e
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
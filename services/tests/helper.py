@@ -0,0 +1,57 @@
+import random
+
+from shared.reports.resources import ReportFile
+
+
+def random_line(rng: random.Random) -> list:
+    coverage = rng.choice([0, 1, 1, 1, "1/2"])
+    return [coverage, None, [[0, coverage]], None, None]
+
+
+def synthetic_file_pair(rng: random.Random, num_lines: int, hunks: int, changes: int):
+    """
+    Returns `(base_file, head_file, segments, src)` for a file of `num_lines`
+    lines with `hunks` diff segments and `changes` lines whose coverage changed
+    outside of them.
+    """
+    base_lines = [random_line(rng) for _ in range(num_lines)]
+    base_src = [f"line {index}" for index in range(num_lines)]
+
+    head_lines, src, segments = [], [], []
+    base_ln = 1
+    for start in sorted(rng.sample(range(1, num_lines - 10), hunks)):
+        if start < base_ln:
+            continue
+        while base_ln < start:
+            head_lines.append(base_lines[base_ln - 1])
+            src.append(base_src[base_ln - 1])
+            base_ln += 1
+
+        removed, added = rng.randint(0, 3), rng.randint(1, 3)
+        head_start = len(head_lines) + 1
+        lines = []
+        for _ in range(removed):
+            lines.append(f"-{base_src[base_ln - 1]}")
+            base_ln += 1
+        for index in range(added):
+            lines.append(f"+added {index}")
+            head_lines.append(random_line(rng))
+            src.append(f"added {index}")
+        segments.append(
+            {
+                "header": [str(start), str(removed), str(head_start), str(added)],
+                "lines": lines,
+            }
+        )
+
+    head_lines.extend(base_lines[base_ln - 1 :])
+    src.extend(base_src[base_ln - 1 :])
+    for index in rng.sample(range(len(head_lines)), changes):
+        head_lines[index] = random_line(rng)
+
+    return (
+        ReportFile("file.py", lines=base_lines),
+        ReportFile("file.py", lines=head_lines),
+        segments,
+        src,
+    )
@@ -1,13 +1,21 @@
+import gzip
 import json
 from pathlib import Path
 from time import time
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
+import zstandard
 from django.test import TestCase
 from shared.storage import MinioStorageService
 
 from core.tests.factories import RepositoryFactory
-from services.archive import ArchiveService
+from services.archive import (
+    ArchiveService,
+    build_chunks_index,
+    decompress,
+    start_archive_read_counter,
+)
+from services.storage import StorageService
 
 current_file = Path(__file__)
 
@@ -117,3 +125,169 @@ class TestWriteData(object):
             gzipped=False,
             reduced_redundancy=False,
         )
+
+
+class TestChunksIndex(object):
+    chunks = (
+        '{"labels_index": {}}\n<<<<< end_of_header >>>>>\n'
+        "{}\n[1, null, [[0, 1]]]\n<<<<< end_of_chunk >>>>>\n"
+        "{}\n[0, null, [[0, 0]]]\n[1, null, [[0, 1]]]\n<<<<< end_of_chunk >>>>>\n"
+        "{}\n[1, null, [[0, 1]]]"
+    )
+
+    def test_build_chunks_index(self):
+        data = self.chunks.encode()
+        index = build_chunks_index(data, "etag")
+        assert index["etag"] == "etag"
+        assert data[slice(*index["header"])] == b'{"labels_index": {}}'
+        assert [data[slice(*offsets)] for offsets in index["chunks"]] == [
+            b"{}\n[1, null, [[0, 1]]]",
+            b"{}\n[0, null, [[0, 0]]]\n[1, null, [[0, 1]]]",
+            b"{}\n[1, null, [[0, 1]]]",
+        ]
+
+    def test_build_chunks_index_no_header(self):
+        data = b"{}\n[1, null, [[0, 1]]]\n<<<<< end_of_chunk >>>>>\n{}"
+        index = build_chunks_index(data, "etag")
+        assert index["header"] is None
+        assert [data[slice(*offsets)] for offsets in index["chunks"]] == [
+            b"{}\n[1, null, [[0, 1]]]",
+            b"{}",
+        ]
+
+    def _mock_storage(self, mocker, etag="etag"):
+        data = self.chunks.encode()
+        mocker.patch.object(
+            StorageService,
+            "get_file_stat",
+            return_value=Mock(etag=etag, metadata={}),
+        )
+        read_file = mocker.patch.object(StorageService, "read_file", return_value=data)
+        read_file_range = mocker.patch.object(
+            StorageService,
+            "read_file_range",
+            side_effect=lambda bucket, path, offset, length: data[
+                offset : offset + length
+            ],
+        )
+        return read_file, read_file_range
+
+    def test_read_chunks_for_files_builds_index(self, mocker, db):
+        read_file, read_file_range = self._mock_storage(mocker)
+        mocker.patch.object(ArchiveService, "read_chunks_index", return_value=None)
+        write_chunks_index = mocker.patch.object(ArchiveService, "write_chunks_index")
+
+        archive_service = ArchiveService(RepositoryFactory())
+        chunks = archive_service.read_chunks_for_files("abc", [2, 0])
+        assert chunks == (
+            '{"labels_index": {}}\n<<<<< end_of_header >>>>>\n'
+            "{}\n[1, null, [[0, 1]]]\n<<<<< end_of_chunk >>>>>\n"
+            "{}\n[1, null, [[0, 1]]]"
+        )
+        assert read_file.call_count == 1
+        assert not read_file_range.called
+        write_chunks_index.assert_called_once_with(
+            "abc", build_chunks_index(self.chunks.encode(), "etag")
+        )
+
+    def test_read_chunks_for_files_uses_index(self, mocker, db):
+        read_file, read_file_range = self._mock_storage(mocker)
+        mocker.patch.object(
+            ArchiveService,
+            "read_chunks_index",
+            return_value=build_chunks_index(self.chunks.encode(), "etag"),
+        )
+        write_chunks_index = mocker.patch.object(ArchiveService, "write_chunks_index")
+
+        archive_service = ArchiveService(RepositoryFactory())
+        chunks = archive_service.read_chunks_for_files("abc", [1])
+        assert chunks == (
+            '{"labels_index": {}}\n<<<<< end_of_header >>>>>\n'
+            "{}\n[0, null, [[0, 0]]]\n[1, null, [[0, 1]]]"
+        )
+        assert not read_file.called
+        # header + 1 chunk
+        assert read_file_range.call_count == 2
+        assert not write_chunks_index.called
+
+    def test_read_chunks_for_files_stale_index(self, mocker, db):
+        read_file, read_file_range = self._mock_storage(mocker, etag="new-etag")
+        mocker.patch.object(
+            ArchiveService,
+            "read_chunks_index",
+            return_value=build_chunks_index(b"{}", "old-etag"),
+        )
+        write_chunks_index = mocker.patch.object(ArchiveService, "write_chunks_index")
+
+        archive_service = ArchiveService(RepositoryFactory())
+        chunks = archive_service.read_chunks_for_files("abc", [0])
+        assert chunks == (
+            '{"labels_index": {}}\n<<<<< end_of_header >>>>>\n'
+            "{}\n[1, null, [[0, 1]]]"
+        )
+        assert read_file.call_count == 1
+        assert not read_file_range.called
+        assert write_chunks_index.call_args[0][1]["etag"] == "new-etag"
+
+
+class TestReadFile(object):
+    data = b'{"files": [1, 2, 3]}'
+
+    def test_decompress(self):
+        assert decompress(self.data) == self.data
+        assert decompress(gzip.compress(self.data)) == self.data
+        assert decompress(zstandard.ZstdCompressor().compress(self.data)) == self.data
+
+    def test_decompress_zstd_stream_without_content_size(self):
+        compressor = zstandard.ZstdCompressor(write_content_size=False)
+        compressed = compressor.compress(self.data)
+        assert decompress(compressed) == self.data
+
+    def test_read_file_returns_bytes(self, mocker, db):
+        mocker.patch.object(
+            StorageService, "read_file", return_value=gzip.compress(self.data)
+        )
+        archive_service = ArchiveService(RepositoryFactory())
+        data = archive_service.read_file("path")
+        assert data == self.data
+        assert json.loads(data) == {"files": [1, 2, 3]}
+
+    def test_read_chunks_decodes(self, mocker, db):
+        chunks = "{}\n[1, null, [[0, 1]]]"
+        mocker.patch.object(
+            StorageService,
+            "read_file",
+            return_value=zstandard.ZstdCompressor().compress(chunks.encode()),
+        )
+        archive_service = ArchiveService(RepositoryFactory())
+        assert archive_service.read_chunks("abc") == chunks
+
+    def test_read_chunks_for_files_compressed(self, mocker, db):
+        chunks = "{}\n[1, null, [[0, 1]]]\n<<<<< end_of_chunk >>>>>\n{}"
+        mocker.patch.object(
+            StorageService,
+            "get_file_stat",
+            return_value=Mock(etag="etag", metadata={}),
+        )
+        mocker.patch.object(
+            StorageService, "read_file", return_value=gzip.compress(chunks.encode())
+        )
+        mocker.patch.object(ArchiveService, "read_chunks_index", return_value=None)
+        write_chunks_index = mocker.patch.object(ArchiveService, "write_chunks_index")
+
+        archive_service = ArchiveService(RepositoryFactory())
+        assert archive_service.read_chunks_for_files("abc", [0]) == (
+            "{}\n[1, null, [[0, 1]]]"
+        )
+        # offsets into the decompressed data are useless for ranged reads
+        assert not write_chunks_index.called
+
+    def test_read_file_counted(self, mocker, db):
+        mocker.patch.object(StorageService, "read_file", return_value=self.data)
+        archive_service = ArchiveService(RepositoryFactory())
+
+        counter = start_archive_read_counter()
+        archive_service.read_file("path")
+        archive_service.read_file("path")
+        assert counter.reads == 2
+        assert counter.bytes == 2 * len(self.data)
@@ -0,0 +1,166 @@
+import threading
+import time
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError
+
+from services.cache import LocalLRUCache, SingleFlight, TwoTierCache
+
+
+class TestLocalLRUCache(object):
+    def test_get_set(self):
+        cache = LocalLRUCache(max_bytes=100)
+        assert cache.get("a") is None
+        cache.set("a", b"12345")
+        assert cache.get("a") == b"12345"
+        assert cache.current_bytes == 5
+
+    def test_evicts_least_recently_used_when_over_budget(self):
+        evictions = []
+        cache = LocalLRUCache(max_bytes=10, on_evict=evictions.append)
+        cache.set("a", b"1234")
+        cache.set("b", b"1234")
+        cache.get("a")
+        cache.set("c", b"1234")
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.current_bytes == 8
+        assert evictions == [1]
+
+    def test_skips_values_larger_than_budget(self):
+        cache = LocalLRUCache(max_bytes=4)
+        cache.set("a", b"12345")
+        assert len(cache) == 0
+        assert cache.current_bytes == 0
+
+    def test_replace_existing_key(self):
+        cache = LocalLRUCache(max_bytes=100)
+        cache.set("a", b"12345")
+        cache.set("a", b"12")
+        assert cache.get("a") == b"12"
+        assert cache.current_bytes == 2
+
+    def test_sizeof(self):
+        cache = LocalLRUCache(max_bytes=4, sizeof=len)
+        cache.set("a", ["some", "object"])
+        cache.set("b", ["another", "one"])
+        cache.set("c", ["more"])
+        assert "a" not in cache
+        assert len(cache) == 2
+        assert cache.current_bytes == 3
+
+
+class TestSingleFlight(object):
+    def test_concurrent_calls_share_one_call(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return "result"
+
+        leader = threading.Thread(
+            target=lambda: results.append(single_flight.do("key", fn))
+        )
+        leader.start()
+        started.wait()
+        followers = [
+            threading.Thread(target=lambda: results.append(single_flight.do("key", fn)))
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        # followers are waiting on the leader's call
+        while len(single_flight._calls["key"].done._cond._waiters) < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ["result"] * 4
+        assert single_flight._calls == {}
+
+    def test_errors_are_raised(self):
+        single_flight = SingleFlight()
+
+        def fn():
+            raise ValueError()
+
+        with pytest.raises(ValueError):
+            single_flight.do("key", fn)
+        assert single_flight._calls == {}
+        assert single_flight.do("key", lambda: 1) == 1
+
+
+class TestTwoTierCache(object):
+    def _cache(self, redis=None, **kwargs):
+        return TwoTierCache(
+            name="test",
+            local_max_bytes=kwargs.get("local_max_bytes", 1000),
+            redis_ttl=60,
+            redis_max_bytes=kwargs.get("redis_max_bytes", 1000),
+            redis_connection=redis or fakeredis.FakeStrictRedis(),
+        )
+
+    def test_miss_then_local_hit(self):
+        cache = self._cache()
+        assert cache.get("key") is None
+        cache.set("key", b"value")
+        assert cache.get("key") == b"value"
+        assert cache.stats["miss"] == 1
+        assert cache.stats["local.hit"] == 1
+
+    def test_redis_tier_shared_between_processes(self):
+        redis = fakeredis.FakeStrictRedis()
+        cache = self._cache(redis=redis)
+        other_cache = self._cache(redis=redis)
+        cache.set("key", b"value")
+        assert redis.ttl("cache/test/key") == 60
+        assert other_cache.get("key") == b"value"
+        assert other_cache.stats["redis.hit"] == 1
+        # populated the local tier of the other process
+        assert other_cache.local.get("key") == b"value"
+
+    def test_redis_max_bytes(self):
+        redis = fakeredis.FakeStrictRedis()
+        cache = self._cache(redis=redis, redis_max_bytes=5)
+        cache.set("key", b"a value that does not compress below five bytes")
+        assert redis.get("cache/test/key") is None
+        assert cache.get("key") is not None
+
+    def test_redis_errors_are_misses(self):
+        redis = fakeredis.FakeStrictRedis()
+        cache = self._cache(redis=redis)
+        with patch.object(redis, "get", side_effect=ConnectionError()):
+            with patch.object(redis, "set", side_effect=ConnectionError()):
+                cache.set("key", b"value")
+                cache.local.clear()
+                assert cache.get("key") is None
+        assert cache.stats["miss"] == 1
+
+    def test_evictions_are_counted(self):
+        cache = self._cache(local_max_bytes=5)
+        cache.set("a", b"12345")
+        cache.set("b", b"12345")
+        assert cache.stats["eviction"] == 1
+
+    def test_get_or_set(self):
+        redis = fakeredis.FakeStrictRedis()
+        cache = self._cache(redis=redis)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return b"value"
+
+        assert cache.get_or_set("key", compute) == b"value"
+        assert cache.get_or_set("key", compute) == b"value"
+        assert calls == [1]
+        assert redis.get("cache/test/key") is not None
@@ -0,0 +1,123 @@
+from django.test import TestCase
+from shared.reports.resources import Report, ReportFile
+from shared.utils.merge import LineType
+from shared.utils.sessions import Session
+
+from services.columnar import (
+    ColumnarReportFile,
+    line_numbers_to_mask,
+    mask_to_line_numbers,
+    popcount,
+)
+from services.comparison import CreateChangeSummaryVisitor
+from services.report import SerializableReport
+
+
+def head_lines():
+    return [
+        [1, None, [[0, 1]], None, None],
+        [0, None, [[0, 0], [1, 0]], None, None],
+        ["1/2", "b", [[0, "1/2"], [1, 0]], None, None],
+        [1, None, [[0, 0], [1, 1]], None, None],
+        "",
+        [1, None, [[1, 1]], None, None],
+    ]
+
+
+def base_lines():
+    return [
+        [0, None, [[0, 0]], None, None],
+        [0, None, [[0, 0]], None, None],
+        [1, None, [[0, 1]], None, None],
+        [1, None, [[0, 1]], None, None],
+    ]
+
+
+def assert_same_counts(totals, expected):
+    assert (totals.lines, totals.hits, totals.misses, totals.partials) == (
+        expected.lines,
+        expected.hits,
+        expected.misses,
+        expected.partials,
+    )
+
+
+class ColumnarReportFileTests(TestCase):
+    def setUp(self):
+        self.report = Report()
+        self.report.add_session(Session(flags=["flag-a"]))
+        self.report.add_session(Session(flags=["flag-b"]))
+        self.report.append(ReportFile("file.py", lines=head_lines()))
+        self.file = ColumnarReportFile.from_report_file(self.report.get("file.py"))
+
+    def test_masks(self):
+        assert line_numbers_to_mask([]) == 0
+        assert line_numbers_to_mask([1, 3, 9]) == 0b1000001010
+        assert list(mask_to_line_numbers(0b1000001010)) == [1, 3, 9]
+        assert list(mask_to_line_numbers(0)) == []
+        assert popcount(0b1000001010) == 3
+        assert popcount(0) == 0
+
+    def test_columns(self):
+        assert len(self.file) == 5
+        assert list(self.file.line_numbers) == [1, 2, 3, 4, 6]
+        assert list(self.file.coverage_types) == [
+            LineType.hit.value,
+            LineType.miss.value,
+            LineType.partial.value,
+            LineType.hit.value,
+            LineType.hit.value,
+        ]
+        assert list(self.file.hit_counts) == [1, 0, 0, 1, 1]
+        assert self.file.line_type(3) == LineType.partial
+        assert self.file.line_type(5) is None
+
+    def test_totals(self):
+        totals = self.file.totals
+        assert_same_counts(totals, self.report.get("file.py").totals)
+        assert totals.lines == 5
+        assert totals.hits == 3
+        assert totals.coverage == "60.00000"
+
+    def test_filter(self):
+        filtered = self.file.filter([0])
+        assert_same_counts(
+            filtered.totals,
+            self.report.filter(flags=["flag-a"]).get("file.py").totals,
+        )
+        assert list(filtered.line_numbers) == [1, 2, 3, 4]
+        assert filtered.line_type(4) == LineType.miss
+
+        assert_same_counts(
+            self.file.filter([0, 1]).totals, self.report.get("file.py").totals
+        )
+        assert len(self.file.filter([42])) == 0
+
+    def test_patch_totals(self):
+        totals = self.file.patch_totals([1, 2, 5])
+        assert totals.lines == 2
+        assert totals.hits == 1
+        assert totals.misses == 1
+
+    def test_change_summary_matches_visitor(self):
+        base_file = ReportFile("file.py", lines=base_lines())
+        head_file = ReportFile("file.py", lines=head_lines())
+        visitor = CreateChangeSummaryVisitor(base_file, head_file)
+        for ln in range(1, 7):
+            visitor(ln, ln, " ", False)
+
+        base = ColumnarReportFile.from_report_file(base_file)
+        head = ColumnarReportFile.from_report_file(head_file)
+        summary = head.change_summary(base)
+        assert {key: value for key, value in summary.items() if value} == {
+            key: value for key, value in visitor.summary.items() if value
+        }
+        assert list(head.changed_lines(base)) == [1, 3]
+
+    def test_report_columnar_file(self):
+        report = SerializableReport()
+        report.append(ReportFile("file.py", lines=head_lines()))
+        columnar_file = report.columnar_file("file.py")
+        assert columnar_file.totals.hits == 3
+        assert report.columnar_file("file.py") is columnar_file
+        assert report.columnar_file("missing.py") is None
@@ -1,14 +1,16 @@
 import asyncio
 import enum
 import json
+import random
 from collections import Counter
 from datetime import datetime
 from unittest.mock import PropertyMock, patch
 
+import fakeredis
 import minio
 import pytest
 import pytz
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from shared.reports.resources import ReportFile
 from shared.reports.types import ReportTotals
 from shared.utils.merge import LineType
@@ -20,6 +22,7 @@ from core.models import Commit
 from core.tests.factories import CommitFactory, PullFactory, RepositoryFactory
 from reports.models import ReportDetails
 from reports.tests.factories import CommitReportFactory
+from services.cache import LocalLRUCache, TwoTierCache
 from services.comparison import (
     CommitComparisonService,
     Comparison,
@@ -28,12 +31,16 @@ from services.comparison import (
     CreateLineComparisonVisitor,
     FileComparison,
     FileComparisonTraverseManager,
+    FileComparisonVisitor,
     ImpactedFile,
     LineComparison,
+    LineComparisons,
     MissingComparisonReport,
     PullRequestComparison,
+    fetch_git_comparison,
 )
 from services.report import SerializableReport
+from services.tests.helper import synthetic_file_pair
 
 # Pulled from core.tests.factories.CommitFactory files.
 # Contents don't actually matter, it's just for providing a format
@@ -72,6 +79,31 @@ class LineNumberCollector:
         self.line_numbers.append((base_ln, head_ln))
 
 
+class UnchangedLinesCollector(FileComparisonVisitor):
+    """
+    A visitor for testing the lines visited in bulk.
+    """
+
+    def __init__(self):
+        self.line_numbers = []
+        self.unchanged = []
+
+    def __call__(self, base_ln, head_ln, value, is_diff):
+        self.line_numbers.append((base_ln, head_ln))
+
+    def visit_unchanged(self, base_ln, head_ln, count, values):
+        self.unchanged.append((base_ln, head_ln, count, values))
+
+
+class LineByLineTraverseManager(FileComparisonTraverseManager):
+    """
+    Visits every line with `__call__`, as before lines were visited in bulk.
+    """
+
+    def unchanged_lines(self):
+        return 0
+
+
 class FileComparisonTraverseManagerTests(TestCase):
     def test_no_diff_results_in_no_line_number_adjustments(self):
         manager = FileComparisonTraverseManager(head_file_eof=3, base_file_eof=3)
@@ -266,6 +298,111 @@ class FileComparisonTraverseManagerTests(TestCase):
         manager.apply([visitor])
         assert visitor.line_numbers == [(1, 1), (2, 2), (3, None), (None, 3)]
 
+    def test_lines_outside_of_diff_are_visited_in_bulk(self):
+        src = [f"line {ln}" for ln in range(1, 11)]
+        segments = [{"header": ["4", "1", "4", "1"], "lines": ["-line 4", "+line 4"]}]
+        manager = FileComparisonTraverseManager(
+            head_file_eof=11, base_file_eof=11, segments=segments, src=src
+        )
+
+        visitor = UnchangedLinesCollector()
+        manager.apply([visitor])
+        assert visitor.unchanged == [
+            (1, 1, 3, ["line 1", "line 2", "line 3"]),
+            (5, 5, 6, src[4:]),
+        ]
+        assert visitor.line_numbers == [(4, None), (None, 4)]
+
+    def test_lines_outside_of_diff_are_visited_in_bulk_without_src(self):
+        manager = FileComparisonTraverseManager(head_file_eof=4, base_file_eof=6)
+
+        visitor = UnchangedLinesCollector()
+        manager.apply([visitor])
+        assert visitor.unchanged == [(1, 1, 5, None)]
+        assert visitor.line_numbers == []
+
+
+class FileComparisonTraverseEquivalenceTests(TestCase):
+    """
+    Visiting the lines outside of the diff in bulk gives the same results as
+    visiting them one by one.
+    """
+
+    def traverse(self, manager_class, base_file, head_file, segments, src):
+        change_summary_visitor = CreateChangeSummaryVisitor(base_file, head_file)
+        create_lines_visitor = CreateLineComparisonVisitor(base_file, head_file)
+        manager_class(
+            head_file_eof=head_file.eof,
+            base_file_eof=base_file.eof,
+            segments=segments,
+            src=src,
+        ).apply([change_summary_visitor, create_lines_visitor])
+
+        with patch(
+            "services.comparison.FileComparison.lines", new_callable=PropertyMock
+        ) as lines:
+            lines.return_value = create_lines_visitor.lines
+            segments = FileComparison(base_file, head_file).segments
+
+        def line_fields(line):
+            return (
+                line.number,
+                line.coverage,
+                line.value,
+                line.is_diff,
+                line.base_line,
+                line.head_line,
+            )
+
+        return (
+            change_summary_visitor.summary,
+            [line_fields(line) for line in create_lines_visitor.lines],
+            [[line_fields(line) for line in s.lines] for s in segments],
+        )
+
+    def assert_equivalent(self, base_file, head_file, segments, src):
+        expected = self.traverse(
+            LineByLineTraverseManager, base_file, head_file, segments, src
+        )
+        result = self.traverse(
+            FileComparisonTraverseManager, base_file, head_file, segments, src
+        )
+        assert result == expected
+
+    def test_equivalent_with_diff_and_src(self):
+        for seed in range(10):
+            rng = random.Random(seed)
+            self.assert_equivalent(*synthetic_file_pair(rng, 500, 8, 20))
+
+    def test_equivalent_with_src_only(self):
+        for seed in range(10):
+            rng = random.Random(seed)
+            base_file, head_file, _, src = synthetic_file_pair(rng, 500, 0, 20)
+            self.assert_equivalent(base_file, head_file, [], src)
+
+    def test_equivalent_with_diff_only(self):
+        for seed in range(10):
+            rng = random.Random(seed)
+            base_file, head_file, segments, _ = synthetic_file_pair(rng, 500, 8, 20)
+            self.assert_equivalent(base_file, head_file, segments, None)
+
+    def test_equivalent_without_diff_or_src(self):
+        for seed in range(10):
+            rng = random.Random(seed)
+            base_file, head_file, _, _ = synthetic_file_pair(rng, 500, 0, 20)
+            self.assert_equivalent(base_file, head_file, [], None)
+
+    def test_equivalent_with_lines_out_of_line(self):
+        # the diff isn't reflected in the files' lines
+        rng = random.Random(0)
+        base_file, _, segments, src = synthetic_file_pair(rng, 500, 8, 0)
+        _, head_file, _, _ = synthetic_file_pair(rng, 500, 8, 0)
+        self.assert_equivalent(base_file, head_file, segments, src)
+
+    def test_equivalent_with_large_file(self):
+        rng = random.Random(0)
+        self.assert_equivalent(*synthetic_file_pair(rng, 20_000, 20, 50))
+
 
 class CreateLineComparisonVisitorTests(TestCase):
     def setUp(self):
@@ -325,6 +462,56 @@ class CreateLineComparisonVisitorTests(TestCase):
         assert visitor.lines[1].head_line is None
 
 
+class LineComparisonsTests(TestCase):
+    def setUp(self):
+        self.base_file = ReportFile(
+            "file1", lines=[[0, "", [], 0, 0], [1, "", [], 0, 0], [1, "", [], 0, 0]]
+        )
+        self.head_file = ReportFile(
+            "file1",
+            lines=[
+                [0, "", [], 0, 0],
+                [0, "", [], 0, 0],
+                [1, "", [], 0, 0],
+                [1, "", [], 0, 0],
+            ],
+        )
+        visitor = CreateLineComparisonVisitor(self.base_file, self.head_file)
+        visitor.visit_unchanged(1, 1, 2, ["line 1", "line 2"])
+        visitor(None, 3, "+line 3", True)
+        visitor.visit_unchanged(3, 4, 1, ["line 4"])
+        self.lines = visitor.lines
+
+    def test_lines_are_created_when_accessed(self):
+        assert len(self.lines) == 4
+        assert self.lines._created == {}
+
+        line = self.lines[1]
+        assert line.value == "line 2"
+        assert line.number == {"base": 2, "head": 2}
+        assert line.base_line == self.base_file._lines[1]
+        assert line.head_line == self.head_file._lines[1]
+        assert line.is_diff is False
+        assert self.lines[1] is line
+        assert list(self.lines._created) == [1]
+
+    def test_indexing(self):
+        assert self.lines[2].value == "+line 3"
+        assert self.lines[-1].number == {"base": 3, "head": 4}
+        assert [line.value for line in self.lines[1:3]] == ["line 2", "+line 3"]
+        assert [line.value for line in self.lines] == [
+            "line 1",
+            "line 2",
+            "+line 3",
+            "line 4",
+        ]
+        with pytest.raises(IndexError):
+            self.lines[4]
+
+    def test_changed_indexes(self):
+        assert self.lines.changed_indexes == [1, 2]
+
+
 class CreateChangeSummaryVisitorTests(TestCase):
     def setUp(self):
         self.head_file = ReportFile("file1", lines=[[1, "", [], 0, 0]])
@@ -350,6 +537,24 @@ class CreateChangeSummaryVisitorTests(TestCase):
         visitor(1, 1, "", True)
         assert visitor.summary == {"hits": -1, "partials": 1}
 
+    def test_visit_unchanged(self):
+        base_file = ReportFile(
+            "file1",
+            lines=[[0, "", [], 0, 0], [1, "", [], 0, 0], [1, "", [], 0, 0], None],
+        )
+        head_file = ReportFile(
+            "file1",
+            lines=[None, [1, "", [], 0, 0], ["1/2", "", [], 0, 0], [1, "", [], 0, 0]],
+        )
+        visitor = CreateChangeSummaryVisitor(base_file, head_file)
+        visitor.visit_unchanged(1, 2, 3, None)
+        assert visitor.summary == {"misses": -1, "hits": 0, "partials": 1}
+
+    def test_visit_unchanged_skips_changed_lines(self):
+        visitor = CreateChangeSummaryVisitor(self.base_file, self.head_file)
+        visitor.visit_unchanged(1, 1, 1, ["+"])
+        assert visitor.summary == {}
+
 
 class LineComparisonTests(TestCase):
     def test_number_shows_number_from_base_and_head(self):
@@ -907,8 +1112,12 @@ class ComparisonTests(TestCase):
         assert self.comparison.totals["head"] == head_report.totals
         assert self.comparison.totals["diff"] is diff_totals
 
+    @patch(
+        "services.comparison.Comparison.head_report_without_diff",
+        new_callable=PropertyMock,
+    )
     def test_head_and_base_reports_have_cff_sessions(
-        self, base_report_mock, head_report_mock, _
+        self, head_report_mock, base_report_mock, *_
     ):
         # Only relevant files keys to the session object
         head_report_sessions = {"0": {"st": "carriedforward"}}
@@ -921,8 +1130,12 @@ class ComparisonTests(TestCase):
         fc = self.comparison.has_different_number_of_head_and_base_sessions
         assert fc == False
 
+    @patch(
+        "services.comparison.Comparison.head_report_without_diff",
+        new_callable=PropertyMock,
+    )
     def test_head_and_base_reports_have_different_number_of_reports(
-        self, base_report_mock, head_report_mock, _
+        self, head_report_mock, base_report_mock, *_
     ):
         # Only relevant files keys to the session object
         head_report_sessions = {"0": {"st": "uploaded"}, "1": {"st": "uploaded"}}
@@ -935,8 +1148,12 @@ class ComparisonTests(TestCase):
         fc = self.comparison.has_different_number_of_head_and_base_sessions
         assert fc == True
 
+    @patch(
+        "services.comparison.Comparison.head_report_without_diff",
+        new_callable=PropertyMock,
+    )
     def test_head_and_base_reports_have_same_number_of_reports(
-        self, base_report_mock, head_report_mock, _
+        self, head_report_mock, base_report_mock, *_
     ):
         # Only relevant files keys to the session object
         head_report_sessions = {"0": {"st": "uploaded"}}
@@ -1335,6 +1552,130 @@ class ComparisonHasUnmergedBaseCommitsTests(TestCase):
         assert self.comparison.has_unmerged_base_commits is False
 
 
+class FetchGitComparisonTests(TestCase):
+    class MockAdapter:
+        def __init__(self):
+            self.calls = []
+
+        async def get_compare(self, base, head):
+            self.calls.append((base, head))
+            return {"diff": {"files": {}}, "commits": [{"commitid": head}]}
+
+    def setUp(self):
+        self.adapter = FetchGitComparisonTests.MockAdapter()
+        self.cache = TwoTierCache(
+            name="git_comparison",
+            local_max_bytes=1024 * 1024,
+            redis_ttl=60,
+            redis_max_bytes=1024 * 1024,
+            redis_connection=fakeredis.FakeStrictRedis(),
+        )
+
+    def test_not_cached_by_default(self):
+        fetch_git_comparison(self.adapter, 1, "base", "head")
+        fetch_git_comparison(self.adapter, 1, "base", "head")
+        assert self.adapter.calls == [("base", "head"), ("base", "head")]
+
+    @override_settings(GIT_COMPARISON_CACHE_ENABLED=True)
+    def test_cached(self):
+        with patch("services.comparison.git_comparison_cache", self.cache):
+            comparison = fetch_git_comparison(self.adapter, 1, "base", "head")
+            # callers mutate the comparison (e.g. `Report.apply_diff`)
+            comparison["diff"]["totals"] = {}
+
+            assert fetch_git_comparison(self.adapter, 1, "base", "head") == {
+                "diff": {"files": {}},
+                "commits": [{"commitid": "head"}],
+            }
+            fetch_git_comparison(self.adapter, 1, "head", "base")
+            fetch_git_comparison(self.adapter, 2, "base", "head")
+
+        assert self.adapter.calls == [
+            ("base", "head"),
+            ("head", "base"),
+            ("base", "head"),
+        ]
+        assert self.cache.stats["local.hit"] == 1
+
+    @override_settings(GIT_COMPARISON_CACHE_ENABLED=True)
+    @patch("services.repo_providers.RepoProviderService.get_adapter")
+    def test_comparison_uses_cache(self, get_adapter_mock):
+        get_adapter_mock.return_value = self.adapter
+        owner = OwnerFactory()
+        base, head = CommitFactory(author=owner), CommitFactory(author=owner)
+        with patch("services.comparison.git_comparison_cache", self.cache):
+            Comparison(user=owner, base_commit=base, head_commit=head).git_comparison
+            comparison = Comparison(user=owner, base_commit=base, head_commit=head)
+            assert comparison.git_comparison["commits"] == [{"commitid": head.commitid}]
+            assert comparison.has_unmerged_base_commits is False
+        assert len(self.adapter.calls) == 2
+
+
+@patch("services.report.prefetch_report_chunks")
+@patch("services.repo_providers.RepoProviderService.get_adapter")
+class ComparisonLoadTests(TestCase):
+    def setUp(self):
+        self.adapter = FetchGitComparisonTests.MockAdapter()
+        self.owner = OwnerFactory()
+        self.base = CommitFactory(author=self.owner)
+        self.head = CommitFactory(author=self.owner)
+        self.comparison = Comparison(
+            user=self.owner, base_commit=self.base, head_commit=self.head
+        )
+
+    def test_reverse_comparison_is_fetched_lazily(
+        self, get_adapter_mock, prefetch_report_chunks_mock
+    ):
+        get_adapter_mock.return_value = self.adapter
+        self.comparison.git_comparison
+        assert self.adapter.calls == [(self.base.commitid, self.head.commitid)]
+
+        assert self.comparison.has_unmerged_base_commits is False
+        assert self.adapter.calls == [
+            (self.base.commitid, self.head.commitid),
+            (self.head.commitid, self.base.commitid),
+        ]
+        get_adapter_mock.assert_called_once()
+
+    def test_load(self, get_adapter_mock, prefetch_report_chunks_mock):
+        get_adapter_mock.return_value = self.adapter
+        self.comparison.load()
+        self.comparison.load()
+
+        assert [
+            call.args[0] for call in prefetch_report_chunks_mock.call_args_list
+        ] == [self.head, self.base]
+        assert self.adapter.calls == [(self.base.commitid, self.head.commitid)]
+
+    @patch("services.report.build_report_from_commit")
+    def test_validate_doesnt_fetch_git_comparison(
+        self,
+        build_report_from_commit_mock,
+        get_adapter_mock,
+        prefetch_report_chunks_mock,
+    ):
+        get_adapter_mock.return_value = self.adapter
+        self.comparison.validate()
+
+        assert prefetch_report_chunks_mock.call_count == 2
+        assert self.adapter.calls == []
+
+    @patch("services.report.build_report_from_commit")
+    def test_load_skips_built_reports(
+        self,
+        build_report_from_commit_mock,
+        get_adapter_mock,
+        prefetch_report_chunks_mock,
+    ):
+        get_adapter_mock.return_value = self.adapter
+        build_report_from_commit_mock.return_value = None
+        self.comparison.base_report
+        self.comparison.load()
+
+        prefetch_report_chunks_mock.assert_called_once()
+        assert prefetch_report_chunks_mock.call_args.args[0] == self.head
+
+
 class SegmentTests(TestCase):
     def _report_lines(self, hits):
         return [
@@ -1715,6 +2056,62 @@ class ComparisonReportTest(TestCase):
             "fileD",
         ]
 
+    @patch("services.archive.ArchiveService.read_file")
+    def test_impacted_file_lookups(self, read_file):
+        read_file.return_value = mock_data_from_archive
+        assert self.comparison_report.impacted_file("fileA").head_name == "fileA"
+        assert self.comparison_report.impacted_file("fileB").head_name == "fileB"
+        assert self.comparison_report.impacted_file("missing") is None
+        assert self.comparison_report_without_storage.impacted_file("fileA") is None
+        read_file.assert_called_once()
+
+    @override_settings(COMPARISON_REPORT_CACHE_ENABLED=True)
+    @patch("services.archive.ArchiveService.read_file")
+    def test_impacted_files_cached(self, read_file):
+        read_file.return_value = mock_data_from_archive
+        local_cache = LocalLRUCache(
+            max_bytes=1024 * 1024, sizeof=lambda parsed: parsed.size
+        )
+        redis_cache = TwoTierCache(
+            name="comparison_report",
+            local_max_bytes=0,
+            redis_ttl=60,
+            redis_max_bytes=1024 * 1024,
+            redis_connection=fakeredis.FakeStrictRedis(),
+        )
+        with patch("services.comparison.comparison_report_cache", local_cache), patch(
+            "services.comparison.raw_comparison_report_cache", redis_cache
+        ):
+            files = ComparisonReport(self.comparison).impacted_files
+            cached_files = ComparisonReport(self.comparison).impacted_files
+            assert [file.head_name for file in files] == ["fileA", "fileB"]
+            assert all(a is b for a, b in zip(files, cached_files))
+            assert read_file.call_count == 1
+
+            # other processes share the raw comparison
+            local_cache.clear()
+            comparison_report = ComparisonReport(self.comparison)
+            assert comparison_report.impacted_file("fileB") == files[1]
+            assert read_file.call_count == 1
+            assert redis_cache.stats["redis.hit"] == 1
+
+            # the worker recomputed the comparison
+            self.comparison.save()
+            ComparisonReport(self.comparison).impacted_files
+            assert read_file.call_count == 2
+
+            read_file.side_effect = Exception()
+            self.comparison.save()
+            assert ComparisonReport(self.comparison).impacted_files == []
+            assert len(local_cache) == 2
+
+    def test_impacted_file_is_slotted(self):
+        file = ImpactedFile.create(
+            head_name="file", base_coverage=None, head_coverage=None
+        )
+        assert not hasattr(file, "__dict__")
+        assert file.file_name == "file"
+
     def test_file_has_diff(self):
         file = ImpactedFile(
             **{
@@ -1,7 +1,8 @@
 from unittest.mock import patch
 
+import fakeredis
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from shared.reports.resources import Report, ReportFile, ReportLine
 from shared.reports.types import ReportTotals
 from shared.torngit.exceptions import TorngitClientGeneralError
@@ -9,9 +10,12 @@ from shared.utils.sessions import Session
 
 from codecov_auth.tests.factories import OwnerFactory
 from core.tests.factories import CommitFactory
+from services.cache import TwoTierCache
 from services.path import (
     Dir,
     File,
+    PathTree,
+    PathTreeChildren,
     PrefixedPath,
     ReportPaths,
     dashboard_commit_file_url,
@@ -274,6 +278,109 @@ class TestReportPathsNested(TestCase):
         ]
 
 
+class TestPathTree(TestCase):
+    def setUp(self):
+        files = {
+            "dir/file1.py": file_data1,
+            "dir/subdir/file2.py": file_data2,
+            "dir/subdir/dir1/file3.py": file_data3,
+            "other.py": file_data3,
+        }
+        self.report = SerializableReport(files=files)
+        self.tree = PathTree.build(self.report, self.report.files)
+
+    def test_rollup_totals(self):
+        assert self.tree.root.totals.lines == 40
+        assert self.tree.root.totals.hits == 22
+        assert self.tree.totals("dir/subdir").lines == 20
+        assert self.tree.totals("dir/subdir").hits == 11
+        assert self.tree.totals("dir/subdir/file2.py") == totals2
+        assert self.tree.totals("dir/missing") is None
+
+    def test_directory(self):
+        items = self.tree.directory("dir")
+        assert [item.full_path for item in items] == ["dir/file1.py", "dir/subdir"]
+
+        subdir = items[1]
+        assert isinstance(subdir.children, PathTreeChildren)
+        # children are only built when accessed
+        assert "_items" not in vars(subdir.children)
+        assert subdir.hits == 11
+        assert "_items" not in vars(subdir.children)
+        assert subdir.children == [
+            File(full_path="dir/subdir/file2.py", totals=totals2),
+            Dir(
+                full_path="dir/subdir/dir1",
+                children=[
+                    File(full_path="dir/subdir/dir1/file3.py", totals=totals3),
+                ],
+            ),
+        ]
+
+    def test_directory_root_and_unknown(self):
+        assert [item.full_path for item in self.tree.directory("")] == [
+            "dir",
+            "other.py",
+        ]
+        assert self.tree.directory("wrong") == []
+        assert self.tree.directory("other.py") == []
+
+    def test_serialize(self):
+        tree = PathTree.deserialize(self.tree.serialize())
+        assert tree.files == self.tree.files
+        assert tree.directory("dir") == self.tree.directory("dir")
+        assert tree.totals("dir/subdir/dir1/file3.py").hits == 3
+
+    def test_report_paths_memoizes_tree_per_flags(self):
+        report = Report()
+        session_a_id, _ = report.add_session(Session(flags=["flag-a"]))
+        session_b_id, _ = report.add_session(Session(flags=["flag-b"]))
+        file_a = ReportFile("foo/file1.py")
+        file_a.append(1, ReportLine.create(coverage=1, sessions=[[session_a_id, 1]]))
+        report.append(file_a)
+        file_b = ReportFile("bar/file2.py")
+        file_b.append(1, ReportLine.create(coverage=1, sessions=[[session_b_id, 1]]))
+        report.append(file_b)
+
+        with patch.object(PathTree, "build", wraps=PathTree.build) as build_mock:
+            ReportPaths(report).single_directory()
+            ReportPaths(report, path="foo").single_directory()
+            assert build_mock.call_count == 1
+
+            paths = ReportPaths(report, filter_flags=["flag-a"])
+            assert paths.single_directory() == [
+                Dir(
+                    full_path="foo",
+                    children=[
+                        File(
+                            full_path="foo/file1.py",
+                            totals=paths.report.get("foo/file1.py").totals,
+                        )
+                    ],
+                )
+            ]
+            ReportPaths(report, filter_flags=["flag-a"]).single_directory()
+            assert build_mock.call_count == 2
+
+    @override_settings(REPORT_CACHE_ENABLED=True)
+    def test_report_paths_cached_tree(self):
+        cache = TwoTierCache(
+            name="report",
+            local_max_bytes=1024 * 1024,
+            redis_ttl=60,
+            redis_max_bytes=1024 * 1024,
+            redis_connection=fakeredis.FakeStrictRedis(),
+        )
+        self.report.cache_key = "1/abc/v4.1/db/1:2"
+        with patch("services.report.report_cache", cache):
+            expected = ReportPaths(self.report, path="dir").single_directory()
+            assert cache.get("1/abc/v4.1/db/1:2/paths/v1/") is not None
+
+            report = SerializableReport(files={})
+            report.cache_key = "1/abc/v4.1/db/1:2"
+            assert ReportPaths(report, path="dir").single_directory() == expected
+
+
 class MockedProviderAdapter:
     async def list_files(self, *args, **kwargs):
         return []
@@ -293,6 +293,26 @@ class ProfilingSummaryTests(TestCase):
         )
         mocked_reportservice.assert_called()
 
+    @patch("services.report.build_report_from_commit")
+    @patch("services.profiling.UserYaml.get_final_yaml")
+    def test_critical_files_from_yaml_commit_report(
+        self, mocked_useryaml, mocked_reportservice
+    ):
+        commit = CommitFactory(repository=self.repo)
+        mocked_useryaml.return_value = dict(
+            profiling=dict(critical_files_paths=["src/critical"])
+        )
+        mock_report = MagicMock()
+        mock_report.files = ["some_file.txt", "src/critical/very_important.json"]
+        mocked_reportservice.return_value = mock_report
+
+        # the report of the given commit is reused
+        commit.full_report
+        service = ProfilingSummary(self.repo, commit_sha=commit.commitid, commit=commit)
+        critical_files_from_yaml = service._get_critical_files_from_yaml()
+        assert critical_files_from_yaml == ["src/critical/very_important.json"]
+        mocked_reportservice.assert_called_once_with(commit)
+
     @patch("services.report.build_report_from_commit")
     @patch("services.profiling.UserYaml.get_final_yaml")
     @patch("services.profiling.ProfilingSummary.summary_data")
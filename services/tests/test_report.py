@@ -1,18 +1,35 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from pathlib import Path
 from unittest.mock import patch
 
-from django.test import TestCase
+import fakeredis
+from django.test import TestCase, override_settings
 from shared.reports.resources import Report, ReportFile, ReportLine
 from shared.storage.exceptions import FileNotInStorageError
 from shared.utils.sessions import Session
 
-from core.tests.factories import CommitFactory, CommitWithReportFactory
-from reports.tests.factories import UploadFactory, UploadFlagMembershipFactory
+from core.tests.factories import (
+    CommitFactory,
+    CommitWithReportFactory,
+    RepositoryFactory,
+)
+from reports.tests.factories import (
+    UploadFactory,
+    UploadFlagMembershipFactory,
+    UploadLevelTotalsFactory,
+)
+from services.cache import TwoTierCache
 from services.report import (
+    SerializableReport,
     build_report,
     build_report_from_commit,
+    build_session_files_index,
     files_belonging_to_flags,
+    prefetch_commit_reports,
+    prefetch_report_chunks,
+    session_files_index,
 )
 
 current_file = Path(__file__)
@@ -170,6 +187,25 @@ class ReportServiceTest(TestCase):
         res = build_report_from_commit(commit)
         assert len(res.sessions) == 2
 
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_query_budget(self, read_chunks_mock):
+        f = open(current_file.parent / "samples" / "chunks.txt", "r")
+        read_chunks_mock.return_value = f.read()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+        commit_report = commit.reports.first()
+        flag = commit.repository.flags.get(flag_name="unittests")
+
+        for order_number in range(2, 22):
+            upload = UploadFactory(report=commit_report, order_number=order_number)
+            UploadLevelTotalsFactory(report_session=upload)
+            UploadFlagMembershipFactory(report_session=upload, flag=flag)
+        UploadFactory(report=commit_report, order_number=22, state="error")
+
+        # commit report (with details and totals), sessions (with totals) and flags
+        with self.assertNumQueries(3):
+            res = build_report_from_commit(commit)
+        assert len(res.sessions) == 22
+
     @patch("services.archive.ArchiveService.read_chunks")
     def test_build_report_from_commit_null_session_totals(self, read_chunks_mock):
         f = open(current_file.parent / "samples" / "chunks.txt", "r")
@@ -354,6 +390,176 @@ class ReportServiceTest(TestCase):
             [1, 2, 1, 1, 0, "50.00000", 0, 0, 0, 0, 0, 0, 0],
         ]
 
+    @patch("services.archive.ArchiveService.read_chunks_for_files")
+    def test_build_report_from_commit_with_paths(self, read_chunks_for_files_mock):
+        with open(current_file.parent / "samples" / "chunks.txt", "r") as f:
+            chunks = f.read().split("\n<<<<< end_of_chunk >>>>>\n")
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+        # file_index 2 is "awesome/__init__.py" in the factory report details
+        read_chunks_for_files_mock.return_value = chunks[2]
+
+        res = build_report_from_commit(
+            commit, paths=["awesome/__init__.py", "missing.py"]
+        )
+        read_chunks_for_files_mock.assert_called_once_with("abf6d4d", [2])
+        assert res.files == ["awesome/__init__.py"]
+        file_report = res.get("awesome/__init__.py")
+        assert tuple(file_report.totals) == (
+            0,
+            10,
+            8,
+            2,
+            0,
+            "80.00000",
+            0,
+            0,
+            0,
+            0,
+            0,
+            0,
+            0,
+        )
+        assert len(list(file_report.lines)) == 10
+
+    @override_settings(REPORT_CACHE_ENABLED=True)
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_cached(self, read_chunks_mock):
+        f = open(current_file.parent / "samples" / "chunks.txt", "r")
+        read_chunks_mock.return_value = f.read()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+
+        cache = TwoTierCache(
+            name="report",
+            local_max_bytes=10 * 1024 * 1024,
+            redis_ttl=60,
+            redis_max_bytes=10 * 1024 * 1024,
+            redis_connection=fakeredis.FakeStrictRedis(),
+        )
+        with patch("services.report.report_cache", cache):
+            res = build_report_from_commit(commit)
+            cached_res = build_report_from_commit(commit)
+            assert read_chunks_mock.call_count == 1
+            assert cache.stats["miss"] == 1
+            assert cache.stats["local.hit"] == 1
+
+            assert cached_res is not res
+            assert cached_res.files == res.files
+            assert list(cached_res.totals) == list(res.totals)
+            assert cached_res.sessions.keys() == res.sessions.keys()
+            for file in res.file_reports():
+                cached_file = cached_res.get(file.name)
+                assert list(cached_file.totals) == list(file.totals)
+                assert list(cached_file.lines) == list(file.lines)
+
+            # shared tier is used by other processes
+            cache.local.clear()
+            build_report_from_commit(commit)
+            assert read_chunks_mock.call_count == 1
+            assert cache.stats["redis.hit"] == 1
+
+            # a new upload being processed changes the cache key
+            commit.save()
+            build_report_from_commit(commit)
+            assert read_chunks_mock.call_count == 2
+
+    @override_settings(REPORT_CACHE_ENABLED=True)
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_cached_prefetched(self, read_chunks_mock):
+        f = open(current_file.parent / "samples" / "chunks.txt", "r")
+        read_chunks_mock.return_value = f.read()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+
+        cache = TwoTierCache(
+            name="report",
+            local_max_bytes=10 * 1024 * 1024,
+            redis_ttl=60,
+            redis_max_bytes=10 * 1024 * 1024,
+            redis_connection=fakeredis.FakeStrictRedis(),
+        )
+        with patch("services.report.report_cache", cache):
+            build_report_from_commit(commit)
+
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                prefetch_report_chunks(commit, executor)
+            assert "_chunks_future" not in vars(commit)
+            prefetch_commit_reports([commit])
+
+            # the cache key computed by the prefetch is reused
+            with self.assertNumQueries(0):
+                res = build_report_from_commit(commit)
+            assert len(res.files) == 3
+            assert read_chunks_mock.call_count == 1
+            # the unused prefetched commit report isn't kept around
+            assert "_commit_report" not in vars(commit)
+
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_prefetched_chunks(self, read_chunks_mock):
+        f = open(current_file.parent / "samples" / "chunks.txt", "r")
+        read_chunks_mock.return_value = f.read()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            prefetch_report_chunks(commit, executor)
+            prefetch_report_chunks(commit, executor)
+            res = build_report_from_commit(commit)
+        assert read_chunks_mock.call_count == 1
+        assert len(res.files) == 3
+
+        # the prefetched chunks are only used once
+        build_report_from_commit(commit)
+        assert read_chunks_mock.call_count == 2
+
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_prefetched_commit_reports(self, read_chunks_mock):
+        f = open(current_file.parent / "samples" / "chunks.txt", "r")
+        read_chunks_mock.return_value = f.read()
+        commits = [
+            CommitWithReportFactory.create(commitid="abf6d4d"),
+            CommitWithReportFactory.create(commitid="cde5f1a"),
+            CommitFactory(commitid="f1e2d3c"),
+        ]
+
+        # commit reports (with details and totals), sessions (with totals) and flags
+        with self.assertNumQueries(3):
+            prefetch_commit_reports(commits)
+        with self.assertNumQueries(0):
+            reports = [build_report_from_commit(commit) for commit in commits[:2]]
+        assert [len(report.files) for report in reports] == [3, 3]
+        assert len(reports[0].sessions) == 2
+
+        # the prefetched commit reports are only used once
+        with self.assertNumQueries(3):
+            build_report_from_commit(commits[0])
+
+    @patch("utils.model_utils.ArchiveService")
+    def test_prefetch_commit_reports_legacy_reports(self, archive_service_mock):
+        read_file_mock = archive_service_mock.return_value.read_file
+        read_file_mock.side_effect = lambda path: json.dumps({"path": path})
+        repository = RepositoryFactory()
+        for commitid in ("abf6d4d", "cde5f1a", "f1e2d3c"):
+            CommitFactory(
+                repository=repository,
+                commitid=commitid,
+                _report=None,
+                _report_storage_path=f"{commitid}.json",
+            )
+        # as in commit listings
+        commits = list(repository.commits.defer("_report").order_by("commitid"))
+
+        # commit reports and the deferred report columns of all the commits
+        with self.assertNumQueries(2):
+            prefetch_commit_reports(commits)
+        assert read_file_mock.call_count == 3
+        archive_service_mock.assert_called_once_with(repository=repository)
+
+        with self.assertNumQueries(0):
+            assert [commit.report for commit in commits] == [
+                {"path": "abf6d4d.json"},
+                {"path": "cde5f1a.json"},
+                {"path": "f1e2d3c.json"},
+            ]
+        assert read_file_mock.call_count == 3
+
     def test_files_belonging_to_flags_with_one_flag(self):
         commit_report = flags_report()
         flags = ["flag-a"]
@@ -381,3 +587,39 @@ class ReportServiceTest(TestCase):
         files = files_belonging_to_flags(commit_report=commit_report, flags=flags)
         assert len(files) == 0
         assert files == []
+
+    def test_files_belonging_to_flags_uses_index(self):
+        commit_report = flags_report()
+        with patch(
+            "services.report.build_session_files_index",
+            wraps=build_session_files_index,
+        ) as build_mock:
+            files_belonging_to_flags(commit_report=commit_report, flags=["flag-a"])
+            files = files_belonging_to_flags(
+                commit_report=commit_report, flags=["flag-b", "flag-c"]
+            )
+            assert build_mock.call_count == 1
+        assert files == ["bar/file2.py", "another/file3.py"]
+
+    def test_session_files_index_from_session_totals(self):
+        totals = [0, 3, 2, 1, 0, "66.66667", 0, 0, 0, 0, 0, 0, 0]
+        commit_report = SerializableReport(
+            files={
+                "file1.py": [0, totals, [None, totals], None],
+                "file2.py": [1, totals, [totals, totals], None],
+            }
+        )
+        with patch.object(commit_report, "get") as get_mock:
+            assert session_files_index(commit_report) == {
+                0: {"file2.py"},
+                1: {"file1.py", "file2.py"},
+            }
+            get_mock.assert_not_called()
+
+    def test_session_files_index_from_lines(self):
+        commit_report = flags_report()
+        assert session_files_index(commit_report) == {
+            0: {"foo/file1.py"},
+            1: {"bar/file2.py"},
+            2: {"another/file3.py"},
+        }
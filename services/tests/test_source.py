@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+import fakeredis
+from django.test import TestCase, override_settings
+
+from services.cache import TwoTierCache
+from services.source import fetch_source
+
+
+class MockAdapter:
+    def __init__(self, content=b"line 1\nline 2\n"):
+        self.content = content
+        self.calls = []
+
+    async def get_source(self, path, commitid):
+        self.calls.append((path, commitid))
+        return {"content": self.content, "commitid": commitid}
+
+
+class FetchSourceTests(TestCase):
+    def setUp(self):
+        self.adapter = MockAdapter()
+
+        cache_patcher = patch(
+            "services.source.source_cache",
+            TwoTierCache(
+                name="source",
+                local_max_bytes=1024 * 1024,
+                redis_ttl=60,
+                redis_max_bytes=1024 * 1024,
+                redis_connection=fakeredis.FakeStrictRedis(),
+            ),
+        )
+        self.cache = cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+    def test_not_cached_by_default(self):
+        assert fetch_source(self.adapter, 1, "abc", "file.py") == "line 1\nline 2\n"
+        assert fetch_source(self.adapter, 1, "abc", "file.py") == "line 1\nline 2\n"
+        assert self.adapter.calls == [("file.py", "abc"), ("file.py", "abc")]
+
+    @override_settings(SOURCE_CACHE_ENABLED=True)
+    def test_cached_by_repo_commit_and_path(self):
+        assert fetch_source(self.adapter, 1, "abc", "file.py") == "line 1\nline 2\n"
+        assert fetch_source(self.adapter, 1, "abc", "file.py") == "line 1\nline 2\n"
+        fetch_source(self.adapter, 1, "abc", "other.py")
+        fetch_source(self.adapter, 1, "def", "file.py")
+        fetch_source(self.adapter, 2, "abc", "file.py")
+
+        assert self.adapter.calls == [
+            ("file.py", "abc"),
+            ("other.py", "abc"),
+            ("file.py", "def"),
+            ("file.py", "abc"),
+        ]
+        assert self.cache.stats["local.hit"] == 1
+
+    @override_settings(SOURCE_CACHE_ENABLED=True)
+    def test_cached_in_redis(self):
+        fetch_source(self.adapter, 1, "abc", "file.py")
+        self.cache.local.clear()
+
+        assert fetch_source(self.adapter, 1, "abc", "file.py") == "line 1\nline 2\n"
+        assert self.adapter.calls == [("file.py", "abc")]
+        assert self.cache.stats["redis.hit"] == 1
+
+    @override_settings(SOURCE_CACHE_ENABLED=True)
+    def test_str_content(self):
+        self.adapter.content = "line 1\nline 2\n"
+        assert fetch_source(self.adapter, 1, "abc", "file.py") == "line 1\nline 2\n"
+        assert fetch_source(self.adapter, 1, "abc", "file.py") == "line 1\nline 2\n"
@@ -5,8 +5,12 @@ from shared.storage.exceptions import FileNotInStorageError
 from shared.utils.ReportEncoder import ReportEncoder
 
 from core.models import Commit
-from core.tests.factories import CommitFactory
-from utils.model_utils import ArchiveField, ArchiveFieldInterface
+from core.tests.factories import CommitFactory, PullFactory, RepositoryFactory
+from utils.model_utils import (
+    ArchiveField,
+    ArchiveFieldInterface,
+    prefetch_archive_fields,
+)
 
 
 class TestArchiveField(object):
@@ -134,3 +138,78 @@ class TestArchiveField(object):
         mock_archive_service.return_value.delete_file.assert_called_with(
             "path/to/old/data"
         )
+
+    def test_prefetch_archive_fields(self, db, mocker):
+        mock_read_file = mocker.MagicMock(
+            side_effect=lambda path: json.dumps({"path": path})
+        )
+        mock_archive_service = mocker.patch("utils.model_utils.ArchiveService")
+        mock_archive_service.return_value.read_file = mock_read_file
+        commit = CommitFactory()
+        instances = [
+            self.ClassWithArchiveField(commit, None, "gcs_path_1"),
+            self.ClassWithArchiveField(commit, None, "gcs_path_2"),
+            self.ClassWithArchiveField(commit, "db_value", None),
+            self.ClassWithArchiveField(commit, None, "gcs_path_3"),
+        ]
+
+        res = prefetch_archive_fields(instances, "archive_field", max_workers=2)
+        assert res == instances
+        assert mock_read_file.call_count == 3
+        # 1 archive service per repository
+        mock_archive_service.assert_called_once_with(repository=commit.repository)
+
+        assert [instance.archive_field for instance in instances] == [
+            {"path": "gcs_path_1"},
+            {"path": "gcs_path_2"},
+            "db_value",
+            {"path": "gcs_path_3"},
+        ]
+        # values were cached - no more reads
+        assert mock_read_file.call_count == 3
+
+        # already cached values are not fetched again
+        prefetch_archive_fields(instances, "archive_field")
+        assert mock_read_file.call_count == 3
+
+    def test_prefetch_archive_fields_file_not_in_storage(self, db, mocker):
+        mock_read_file = mocker.MagicMock(side_effect=FileNotInStorageError())
+        mock_archive_service = mocker.patch("utils.model_utils.ArchiveService")
+        mock_archive_service.return_value.read_file = mock_read_file
+        commit = CommitFactory()
+        instance = self.ClassWithArchiveField(commit, None, "gcs_path")
+
+        prefetch_archive_fields([instance], "archive_field")
+        assert instance.archive_field == None
+
+    def test_prefetch_archive_fields_deferred(
+        self, db, mocker, django_assert_num_queries
+    ):
+        mock_read_file = mocker.MagicMock(
+            side_effect=lambda path: json.dumps({"path": path})
+        )
+        mock_archive_service = mocker.patch("utils.model_utils.ArchiveService")
+        mock_archive_service.return_value.read_file = mock_read_file
+        repository = RepositoryFactory()
+        for pullid in range(3):
+            PullFactory(
+                repository=repository,
+                pullid=pullid,
+                _flare=None,
+                _flare_storage_path=f"flare_{pullid}",
+            )
+
+        pulls = list(repository.pull_requests.defer("_flare").order_by("pullid"))
+        # the deferred flare column of all the pulls
+        with django_assert_num_queries(1):
+            prefetch_archive_fields(pulls, "flare")
+        assert mock_read_file.call_count == 3
+        mock_archive_service.assert_called_once_with(repository=repository)
+
+        with django_assert_num_queries(0):
+            assert [pull.flare for pull in pulls] == [
+                {"path": "flare_0"},
+                {"path": "flare_1"},
+                {"path": "flare_2"},
+            ]
+        assert mock_read_file.call_count == 3